@@ -0,0 +1,21 @@
+# backend/backfill_geocode.py
+# Jalankan SEKALI untuk mengisi latitude/longitude yang masih kosong
+# (supplies & users) memakai gazetteer lokal Jakarta.
+#   python backfill_geocode.py            -> update database
+#   python backfill_geocode.py --dry-run  -> hanya hitung, tanpa update
+import sys
+from services.geocoding import backfill_missing_coordinates
+
+dry_run = "--dry-run" in sys.argv
+
+try:
+    print(backfill_missing_coordinates("supplies", "location", dry_run=dry_run))
+    print("✅ Backfill supplies selesai!")
+except Exception as e:
+    print(f"❌ Gagal backfill supplies: {e}")
+
+try:
+    print(backfill_missing_coordinates("users", "address", dry_run=dry_run))
+    print("✅ Backfill users selesai!")
+except Exception as e:
+    print(f"❌ Gagal backfill users: {e}")
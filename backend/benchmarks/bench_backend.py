@@ -0,0 +1,92 @@
+"""
+Benchmark hot path logistics & analytics dengan data sintetis.
+
+Supabase diganti FakeSupabase (in-memory), jadi yang terukur adalah kerja
+Python di services/ + biaya filter/salin baris oleh data source palsu
+(baris "fetch supplies" = baseline biaya data source saja).
+
+Jalankan dari folder backend:
+    python -m benchmarks.bench_backend                 # 10k & 100k
+    python -m benchmarks.bench_backend --sizes 1000000 # 1M (butuh RAM ~3 GB)
+"""
+import argparse
+import contextlib
+import io
+import os
+import statistics
+import tempfile
+import time
+
+from benchmarks.fake_supabase import install
+
+# Harus sebelum import services: ganti modul `database` & jangan sentuh cache asli
+db = install()
+os.environ.setdefault("KOLOSAL_API_KEY", "benchmark")
+os.environ.setdefault("GEOCODE_CACHE_PATH", os.path.join(tempfile.gettempdir(), "bench_geocode_cache.json"))
+
+from benchmarks.synthetic import populate, ORIGIN
+from services import logistics
+from services.analytics import get_kitchen_analytics, get_vendor_analytics
+
+DEFAULT_SIZES = [10_000, 100_000]
+REPEAT = 5
+KEYWORDS = ["bayam", "bawang merah", "cabe", "telur", "ikan"]
+
+def _quiet(fn, *args, **kwargs):
+    # Service mencetak log tiap request; dibuang supaya output benchmark bersih
+    with contextlib.redirect_stdout(io.StringIO()):
+        return fn(*args, **kwargs)
+
+def _timed(fn, repeat=REPEAT):
+    """Return: (median ms, min ms) dari `repeat` kali eksekusi."""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        _quiet(fn)
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples), min(samples)
+
+def _search_all(limit=None, radius_km=None):
+    for kw in KEYWORDS:
+        result = logistics.search_suppliers(kw, ORIGIN[0], ORIGIN[1], limit=limit, radius_km=radius_km)
+        assert not isinstance(result, dict), result
+
+def run_size(n):
+    db.reset()
+    info = populate(db, n)
+    print(f"\n=== {info['supplies']:,} supplies | {info['orders']:,} orders | {info['users']:,} users ===")
+
+    rows = []
+    rows.append(("fetch supplies (baseline)", _timed(lambda: db.table("supplies").select("*").execute(), repeat=3)))
+
+    # Jalur index in-process (default)
+    logistics.SUPPLY_INDEX_ENABLED = True
+    rows.append(("supply index rebuild", _timed(logistics.rebuild_supply_index, repeat=1)))
+    per_kw = len(KEYWORDS)
+    rows.append((f"search index top-20 (x{per_kw})", _timed(lambda: _search_all(limit=20))))
+    rows.append((f"search index r=5km (x{per_kw})", _timed(lambda: _search_all(radius_km=5))))
+    rows.append((f"search index all (x{per_kw})", _timed(lambda: _search_all(), repeat=3)))
+
+    # Jalur query DB langsung (bounding box + haversine batch)
+    logistics.SUPPLY_INDEX_ENABLED = False
+    rows.append((f"search db top-20 (x{per_kw})", _timed(lambda: _search_all(limit=20), repeat=3)))
+    rows.append((f"search db r=5km (x{per_kw})", _timed(lambda: _search_all(radius_km=5), repeat=3)))
+    logistics.SUPPLY_INDEX_ENABLED = True
+
+    rows.append(("get_kitchen_analytics", _timed(get_kitchen_analytics, repeat=3)))
+    rows.append(("get_vendor_analytics", _timed(lambda: get_vendor_analytics(info["vendor_id"]))))
+
+    print(f"{'case':<32} | {'median (ms)':>12} | {'min (ms)':>10}")
+    print("-" * 60)
+    for name, (median, best) in rows:
+        print(f"{name:<32} | {median:>12.2f} | {best:>10.2f}")
+
+def run(sizes=None):
+    for n in sizes or DEFAULT_SIZES:
+        run_size(n)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark logistics & analytics (data sintetis)")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES,
+                        help="Jumlah baris supplies per run (mis. 10000 100000 1000000)")
+    run(parser.parse_args().sizes)
@@ -0,0 +1,52 @@
+"""
+Benchmark: haversine skalar (loop Python) vs haversine_batch (NumPy).
+
+Jalankan dari folder backend:
+    python -m benchmarks.bench_haversine
+"""
+import random
+import time
+
+from services.geo import haversine_distance, haversine_batch
+
+SIZES = [1_000, 10_000, 100_000]
+REPEAT = 5
+
+# Titik asal: Monas (Jakarta Pusat)
+ORIGIN = (-6.175392, 106.827153)
+
+def _random_points(n, seed=42):
+    rng = random.Random(seed)
+    lats = [ORIGIN[0] + rng.uniform(-0.3, 0.3) for _ in range(n)]
+    longs = [ORIGIN[1] + rng.uniform(-0.3, 0.3) for _ in range(n)]
+    return lats, longs
+
+def _best_of(fn, repeat=REPEAT):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def run():
+    print(f"{'N':>8} | {'scalar (ms)':>12} | {'batch (ms)':>11} | {'speedup':>8}")
+    print("-" * 50)
+    for n in SIZES:
+        lats, longs = _random_points(n)
+
+        scalar = _best_of(lambda: [
+            haversine_distance(ORIGIN[0], ORIGIN[1], la, lo) for la, lo in zip(lats, longs)
+        ])
+        batch = _best_of(lambda: haversine_batch(ORIGIN[0], ORIGIN[1], lats, longs))
+
+        # Sanity check: hasil harus sama
+        ref = [haversine_distance(ORIGIN[0], ORIGIN[1], la, lo) for la, lo in zip(lats, longs)]
+        got = haversine_batch(ORIGIN[0], ORIGIN[1], lats, longs)
+        max_err = max(abs(a - b) for a, b in zip(ref, got.tolist()))
+        assert max_err < 1e-9, f"Selisih terlalu besar: {max_err}"
+
+        print(f"{n:>8} | {scalar * 1000:>12.2f} | {batch * 1000:>11.2f} | {scalar / batch:>7.1f}x")
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,122 @@
+"""
+Benchmark: parsing output Claude cara lama (regex / replace + json.loads)
+vs JsonStreamExtractor (services/llm_json.py) pada respons menu yang panjang.
+
+Jalankan dari folder backend:
+    python -m benchmarks.bench_llm_json
+    python -m benchmarks.bench_llm_json --recipes 10 100 1000 --chunk 8
+
+- one-shot : seluruh teks sudah diterima, parse sekali.
+- stream   : teks datang per `--chunk` karakter (mirip token). Cara lama harus
+             mencoba regex + json.loads ulang pada seluruh buffer tiap potongan
+             (baru berhasil di akhir); extractor membaca tiap karakter sekali dan
+             mengeluarkan resep begitu lengkap.
+"""
+import argparse
+import json
+import re
+import statistics
+import time
+
+from services.llm_json import JsonStreamExtractor, extract_json
+
+REPEAT = 5
+# Cara lama O(n^2) saat streaming: dilewati kalau teks lebih panjang dari ini
+LEGACY_STREAM_MAX_CHARS = 200_000
+
+def legacy_regex(content):
+    """kitchen.generate_menu_recommendation (lama): regex greedy + json.loads."""
+    json_match = re.search(r'\{.*\}|\[.*\]', content, re.DOTALL)
+    return json.loads(json_match.group(0)) if json_match else None
+
+def legacy_replace(content):
+    """vision / calculate_meal_expiry (lama): buang ```json lalu json.loads (gagal kalau ada prosa)."""
+    try:
+        return json.loads(content.replace("```json", "").replace("```", "").strip())
+    except json.JSONDecodeError:
+        return None
+
+def make_response(n_recipes, prose=True):
+    recipes = [{
+        "menu_name": f"Tumis Bayam Tahu {i}",
+        "description": "Tumisan sederhana, kaya zat besi. Pakai \"bawang\" {secukupnya}, aduk rata.",
+        "ingredients": ["Bayam", "Tahu Putih", "Bawang Merah", "Bawang Putih"],
+        "ingredients_needed": ["Bayam 5 kg", "Tahu 100 potong", "Bawang Merah 0.5 kg"],
+        "cooking_steps": [f"Langkah {s}: potong, tumis [api sedang], sajikan." for s in range(1, 6)],
+        "nutrition": {"calories": "350 kcal", "protein": "18g", "carbs": "20g", "fats": "12g"},
+        "reason": "Murah, bergizi, praktis dan lokal.",
+    } for i in range(n_recipes)]
+    body = json.dumps({"recommendations": recipes}, ensure_ascii=False, indent=2)
+    if not prose:
+        return body
+    return f"Baik, berikut rekomendasi menunya:\n```json\n{body}\n```\nSemoga membantu, Chef!"
+
+def _median_ms(fn, repeat=REPEAT):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+def _chunks(text, size):
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+def stream_legacy(chunks):
+    buffer = ""
+    for chunk in chunks:
+        buffer += chunk
+        try:
+            result = legacy_regex(buffer)
+        except json.JSONDecodeError:
+            continue
+        if result is not None:
+            return len(buffer)  # karakter diterima sebelum ada data yang bisa dipakai
+    return None
+
+def stream_extractor(chunks):
+    extractor = JsonStreamExtractor()
+    first_item_at = None
+    received = 0
+    for chunk in chunks:
+        received += len(chunk)
+        if extractor.feed(chunk) and first_item_at is None:
+            first_item_at = received
+    extractor.result()
+    return first_item_at
+
+def run(recipe_counts, chunk_size):
+    print(f"{'recipes':>8} | {'chars':>9} | {'regex (ms)':>10} | {'replace (ms)':>12} | {'extractor (ms)':>14} |"
+          f" {'stream old (ms)':>15} | {'stream new (ms)':>15} | {'1st usable old/new (chars)':>27}")
+    print("-" * 130)
+    for n in recipe_counts:
+        text = make_response(n)
+        plain = make_response(n, prose=False)
+        expected = json.loads(plain)
+        assert legacy_regex(text) == expected
+        assert extract_json(text) == expected
+        assert legacy_replace(text) is None  # prosa di luar fence -> cara lama gagal
+
+        regex_ms = _median_ms(lambda: legacy_regex(text))
+        replace_ms = _median_ms(lambda: legacy_replace(plain))
+        extractor_ms = _median_ms(lambda: extract_json(text))
+
+        chunks = _chunks(text, chunk_size)
+        new_stream_ms = _median_ms(lambda: stream_extractor(chunks), repeat=3)
+        first_new = stream_extractor(chunks)
+        if len(text) <= LEGACY_STREAM_MAX_CHARS:
+            old_stream_ms = f"{_median_ms(lambda: stream_legacy(chunks), repeat=1):>15.1f}"
+            first_old = stream_legacy(chunks)
+        else:
+            old_stream_ms, first_old = f"{'skip':>15}", len(text)
+
+        print(f"{n:>8} | {len(text):>9,} | {regex_ms:>10.2f} | {replace_ms:>12.2f} | {extractor_ms:>14.2f} |"
+              f" {old_stream_ms} | {new_stream_ms:>15.1f} | {f'{first_old:,} / {first_new:,}':>27}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark ekstraksi JSON dari output AI")
+    parser.add_argument("--recipes", type=int, nargs="+", default=[5, 50, 500],
+                        help="Jumlah resep per respons (panjang teks)")
+    parser.add_argument("--chunk", type=int, default=8, help="Ukuran potongan stream (karakter)")
+    args = parser.parse_args()
+    run(args.recipes, args.chunk)
@@ -0,0 +1,101 @@
+"""
+Benchmark: resize_image lama (decode penuh + LANCZOS) vs resize_image sekarang
+(JPEG draft decode, filter murah untuk sumber besar, EXIF transpose, skip re-encode).
+
+Jalankan dari folder backend:
+    python -m benchmarks.bench_resize --corpus /path/ke/foto-hp   # foto asli (jpg/jpeg/png)
+    python -m benchmarks.bench_resize                             # korpus sintetis 12 MP
+
+Tanpa --corpus, dibuat foto sintetis ukuran kamera HP (4000x3000, sebagian
+dengan tag EXIF orientation=6 seperti foto portrait) + PNG dan JPEG kecil.
+"""
+import argparse
+import contextlib
+import io
+import os
+import statistics
+import time
+from pathlib import Path
+
+from PIL import Image, ImageFilter
+
+from benchmarks.fake_supabase import install
+
+# services.vision ikut import clients/database; tidak perlu koneksi asli di sini
+install()
+os.environ.setdefault("KOLOSAL_API_KEY", "benchmark")
+
+from services.vision import resize_image
+
+REPEAT = 3
+EXTENSIONS = {".jpg", ".jpeg", ".png"}
+
+def legacy_resize(image_bytes, max_size=(1024, 1024)):
+    """Implementasi lama: decode resolusi penuh, LANCZOS, selalu encode ulang."""
+    image = Image.open(io.BytesIO(image_bytes))
+    if image.mode == 'RGBA':
+        image = image.convert('RGB')
+    image.thumbnail(max_size, Image.Resampling.LANCZOS)
+    buffer = io.BytesIO()
+    image.save(buffer, format="JPEG", quality=85)
+    return buffer.getvalue()
+
+def _synthetic_photo(size, seed, orientation=None, fmt="JPEG"):
+    # Noise + blur: tekstur mirip foto (tidak terkompres sekecil warna polos)
+    channels = [Image.effect_noise(size, 40 + 10 * i + seed).filter(ImageFilter.GaussianBlur(3)) for i in range(3)]
+    image = Image.merge("RGB", channels)
+    buffer = io.BytesIO()
+    if fmt == "JPEG":
+        exif = Image.Exif()
+        if orientation:
+            exif[0x0112] = orientation
+        image.save(buffer, format="JPEG", quality=92, exif=exif.tobytes())
+    else:
+        image.convert("RGBA").save(buffer, format=fmt)
+    return buffer.getvalue()
+
+def synthetic_corpus():
+    print("🧪 Membuat korpus sintetis (foto 12 MP)...")
+    return [
+        ("hp_landscape_1.jpg", _synthetic_photo((4000, 3000), 1)),
+        ("hp_landscape_2.jpg", _synthetic_photo((4000, 3000), 2)),
+        ("hp_portrait_exif6.jpg", _synthetic_photo((4000, 3000), 3, orientation=6)),
+        ("hp_8mp.jpg", _synthetic_photo((3264, 2448), 4)),
+        ("screenshot.png", _synthetic_photo((1920, 1080), 5, fmt="PNG")),
+        ("wa_small.jpg", _synthetic_photo((960, 720), 6)),
+    ]
+
+def load_corpus(directory):
+    files = sorted(p for p in Path(directory).iterdir() if p.suffix.lower() in EXTENSIONS)
+    return [(p.name, p.read_bytes()) for p in files]
+
+def _median_ms(fn, data):
+    samples = []
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            out = fn(data)
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples), out
+
+def run(corpus):
+    print(f"{'file':<24} | {'legacy (ms)':>11} | {'new (ms)':>9} | {'speedup':>7} | {'output':>11} | {'bytes':>8}")
+    print("-" * 86)
+    total_old = total_new = 0.0
+    for name, data in corpus:
+        old_ms, _ = _median_ms(legacy_resize, data)
+        new_ms, out = _median_ms(resize_image, data)
+        total_old += old_ms
+        total_new += new_ms
+        with Image.open(io.BytesIO(out)) as result:
+            dims = f"{result.width}x{result.height}"
+            assert max(result.size) <= 1024, f"{name}: hasil terlalu besar {dims}"
+        print(f"{name:<24} | {old_ms:>11.1f} | {new_ms:>9.1f} | {old_ms / new_ms:>6.1f}x | {dims:>11} | {len(out):>8}")
+    print("-" * 86)
+    print(f"{'TOTAL':<24} | {total_old:>11.1f} | {total_new:>9.1f} | {total_old / total_new:>6.1f}x |")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark preprocessing gambar (resize_image)")
+    parser.add_argument("--corpus", help="Folder berisi foto asli (jpg/jpeg/png)")
+    args = parser.parse_args()
+    run(load_corpus(args.corpus) if args.corpus else synthetic_corpus())
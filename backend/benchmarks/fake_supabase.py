@@ -0,0 +1,281 @@
+"""
+Pengganti Supabase di memori untuk benchmark.
+
+Meniru sebagian kecil query builder supabase-py yang dipakai di services/
+(select + embed relasi, eq/in_/ilike/gte/lte/is_, order, range, limit,
+single, insert/update/delete), cukup supaya hot path Python bisa diukur
+tanpa jaringan.
+
+Pakai dengan memanggil install() SEBELUM mengimpor services:
+    from benchmarks.fake_supabase import install
+    db = install()
+    from services.analytics import get_kitchen_analytics
+"""
+import itertools
+import sys
+import types
+
+# Nama relasi di select("..., supplies(item_name)") -> kolom foreign key
+FOREIGN_KEYS = {
+    "supplies": "supply_id",
+    "users": "user_id",
+}
+
+class FakeResponse:
+    def __init__(self, data):
+        self.data = data
+
+def _parse_select(columns):
+    """
+    "*, supplies(item_name, unit)" -> (["*"], {"supplies": ["item_name", "unit"]})
+    """
+    fields, embeds = [], {}
+    depth, token = 0, ""
+    for ch in columns + ",":
+        if ch == "(":
+            depth += 1
+        elif ch == ")":
+            depth -= 1
+        if ch == "," and depth == 0:
+            token = token.strip()
+            if "(" in token:
+                name, inner = token.split("(", 1)
+                embeds[name.strip()] = [c.strip() for c in inner.rstrip(")").split(",")]
+            elif token:
+                fields.append(token)
+            token = ""
+        else:
+            token += ch
+    return fields, embeds
+
+def _project(row, fields):
+    if "*" in fields:
+        return dict(row)
+    return {f: row.get(f) for f in fields}
+
+class FakeQuery:
+
+    def __init__(self, db, table):
+        self.db = db
+        self.table = table
+        self.op = "select"
+        self.fields, self.embeds = ["*"], {}
+        self.filters = []
+        self.eq_filter = None
+        self.order_by = None
+        self.window = None
+        self.max_rows = None
+        self.one = False
+        self.payload = None
+
+    # --- SELECT & FILTER ---
+    def select(self, columns="*", **kwargs):
+        self.fields, self.embeds = _parse_select(columns)
+        return self
+
+    def eq(self, column, value):
+        # Filter eq pertama memakai hash index kolom (seperti index di Postgres)
+        if self.eq_filter is None:
+            self.eq_filter = (column, value)
+        else:
+            self.filters.append(lambda r: r.get(column) == value)
+        return self
+
+    def neq(self, column, value):
+        self.filters.append(lambda r: r.get(column) != value)
+        return self
+
+    def in_(self, column, values):
+        values = set(values)
+        self.filters.append(lambda r: r.get(column) in values)
+        return self
+
+    def gt(self, column, value):
+        self.filters.append(lambda r: r.get(column) is not None and r.get(column) > value)
+        return self
+
+    def gte(self, column, value):
+        self.filters.append(lambda r: r.get(column) is not None and r.get(column) >= value)
+        return self
+
+    def lt(self, column, value):
+        self.filters.append(lambda r: r.get(column) is not None and r.get(column) < value)
+        return self
+
+    def lte(self, column, value):
+        self.filters.append(lambda r: r.get(column) is not None and r.get(column) <= value)
+        return self
+
+    def is_(self, column, value):
+        if value in (None, "null"):
+            self.filters.append(lambda r: r.get(column) is None)
+        else:
+            self.filters.append(lambda r: r.get(column) is not None)
+        return self
+
+    def ilike(self, column, pattern):
+        needle = pattern.strip("%").lower()
+        self.filters.append(lambda r: needle in (r.get(column) or "").lower())
+        return self
+
+    def order(self, column, desc=False):
+        self.order_by = (column, desc)
+        return self
+
+    def range(self, start, end):
+        self.window = (start, end + 1)
+        return self
+
+    def limit(self, n):
+        self.max_rows = n
+        return self
+
+    def single(self):
+        self.one = True
+        return self
+
+    # --- WRITE ---
+    def insert(self, payload):
+        self.op, self.payload = "insert", payload
+        return self
+
+    def update(self, payload):
+        self.op, self.payload = "update", payload
+        return self
+
+    def delete(self):
+        self.op = "delete"
+        return self
+
+    # --- EXECUTE ---
+    def _matching(self):
+        if self.eq_filter is not None:
+            rows = self.db.lookup(self.table, *self.eq_filter)
+        else:
+            rows = self.db.rows(self.table)
+        for check in self.filters:
+            rows = [r for r in rows if check(r)]
+        return rows
+
+    def _embed(self, row, out):
+        for name, columns in self.embeds.items():
+            fk = FOREIGN_KEYS.get(name, f"{name.rstrip('s')}_id")
+            target = self.db.get(name, row.get(fk))
+            out[name] = _project(target, columns) if target is not None else None
+        return out
+
+    def execute(self):
+        if self.op == "insert":
+            payload = self.payload if isinstance(self.payload, list) else [self.payload]
+            return FakeResponse(self.db.insert(self.table, payload))
+
+        rows = self._matching()
+        if self.op == "update":
+            for row in rows:
+                row.update(self.payload)
+            self.db.invalidate(self.table)
+            return FakeResponse([dict(r) for r in rows])
+        if self.op == "delete":
+            self.db.delete(self.table, rows)
+            return FakeResponse([dict(r) for r in rows])
+
+        if self.order_by is not None:
+            column, desc = self.order_by
+            # Tabel disimpan urut id, jadi order("id") tidak perlu sort ulang
+            if column != "id" or desc:
+                rows = sorted(rows, key=lambda r: (r.get(column) is None, r.get(column)), reverse=desc)
+        if self.window is not None:
+            rows = rows[self.window[0]:self.window[1]]
+        if self.max_rows is not None:
+            rows = rows[:self.max_rows]
+
+        data = [self._embed(r, _project(r, self.fields)) for r in rows]
+        if self.one:
+            return FakeResponse(data[0] if data else None)
+        return FakeResponse(data)
+
+class FakeSupabase:
+    """
+    Tabel = list dict (urut id) + hash index per kolom yang dibangun saat dipakai.
+    """
+
+    def __init__(self):
+        self._tables = {}
+        self._by_id = {}
+        self._indexes = {}
+        self._ids = {}
+
+    def table(self, name):
+        return FakeQuery(self, name)
+
+    def rows(self, table):
+        return self._tables.setdefault(table, [])
+
+    def get(self, table, row_id):
+        return self._by_id.get(table, {}).get(row_id)
+
+    def lookup(self, table, column, value):
+        if column == "id":
+            row = self.get(table, value)
+            return [row] if row is not None else []
+        index = self._indexes.get((table, column))
+        if index is None:
+            index = {}
+            for row in self.rows(table):
+                index.setdefault(row.get(column), []).append(row)
+            self._indexes[(table, column)] = index
+        return index.get(value, [])
+
+    def invalidate(self, table):
+        for key in [k for k in self._indexes if k[0] == table]:
+            del self._indexes[key]
+
+    def insert(self, table, payload):
+        rows = self.rows(table)
+        by_id = self._by_id.setdefault(table, {})
+        counter = self._ids.setdefault(table, itertools.count(1))
+        inserted = []
+        for item in payload:
+            row = dict(item)
+            row.setdefault("id", next(counter))
+            rows.append(row)
+            by_id[row["id"]] = row
+            inserted.append(dict(row))
+        self.invalidate(table)
+        return inserted
+
+    def delete(self, table, doomed):
+        doomed_ids = {r["id"] for r in doomed}
+        self._tables[table] = [r for r in self.rows(table) if r["id"] not in doomed_ids]
+        by_id = self._by_id.get(table, {})
+        for row_id in doomed_ids:
+            by_id.pop(row_id, None)
+        self.invalidate(table)
+
+    def load(self, table, rows):
+        """
+        Bulk load tanpa salinan (untuk mengisi data benchmark; baris wajib punya id).
+        """
+        self._tables[table] = list(rows)
+        self._by_id[table] = {row["id"]: row for row in rows}
+        self._ids[table] = itertools.count(max(self._by_id[table], default=0) + 1)
+        self.invalidate(table)
+
+    def reset(self):
+        self._tables.clear()
+        self._by_id.clear()
+        self._indexes.clear()
+        self._ids.clear()
+
+    def count(self, table):
+        return len(self.rows(table))
+
+def install():
+    """
+    Daftarkan FakeSupabase sebagai modul `database` (dipakai services/clients.py).
+    """
+    db = FakeSupabase()
+    module = types.ModuleType("database")
+    module.supabase = db
+    sys.modules["database"] = module
+    return db
@@ -0,0 +1,218 @@
+"""
+Load test endpoint AI: /api/analyze, /api/recommend-menu, /api/kitchen/cook,
+/api/kitchen/chat. Laporan per endpoint: p50/p95/p99 latency, throughput, error.
+
+Default (in-process): Supabase diganti FakeSupabase + data sintetis, Kolosal
+diganti benchmarks/mock_kolosal.py (dijalankan di thread, KOLOSAL_BASE_URL
+diarahkan ke sana), rate limiter dimatikan, dan app dipanggil lewat ASGI tanpa
+jaringan. Yang terukur: antrian AI, parsing, cache, query DB palsu, dst.
+
+Jalankan dari folder backend:
+    python -m benchmarks.load_ai
+    python -m benchmarks.load_ai --requests 200 --concurrency 32 --latency lognormal:1500,0.4 --rate-limit-rate 0.05
+    python -m benchmarks.load_ai --endpoints chat menu --stream
+
+Ke server yang sudah jalan (mis. uvicorn + KOLOSAL_BASE_URL ke mock_kolosal):
+    python -m benchmarks.load_ai --target http://127.0.0.1:8000 --token <JWT kitchen>
+(limiter 10/menit per IP tetap aktif di sana: 429 dihitung sebagai error)
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+import httpx
+from PIL import Image
+
+from benchmarks.mock_kolosal import add_arguments, config_from_args, serve_in_thread
+from benchmarks.synthetic import ITEM_NAMES
+
+ENDPOINTS = ["analyze", "menu", "cook", "chat"]
+CHAT_MESSAGES = [
+    "Mau masak sayur bayem sama tahu untuk 200 siswa, stok cabe ada?",
+    "Resep ayam goreng yang murah dong",
+    "Bawang merah tinggal sedikit, beli di mana yang paling dekat?",
+    "Halo chef, menu sehat buat besok apa ya?",
+]
+
+def _jpeg(seed, size=(1024, 768)):
+    # Foto unik per request (warna acak) supaya tidak semua kena cache vision
+    rng = random.Random(seed)
+    image = Image.new("RGB", size, tuple(rng.randrange(256) for _ in range(3)))
+    for _ in range(8):
+        x, y = rng.randrange(size[0]), rng.randrange(size[1])
+        image.paste(tuple(rng.randrange(256) for _ in range(3)), (x, y, x + 200, y + 150))
+    buffer = io.BytesIO()
+    image.save(buffer, "JPEG", quality=85)
+    return buffer.getvalue()
+
+def make_request(endpoint, i, supply_ids):
+    """Return: (method, path, kwargs httpx) untuk request ke-i."""
+    rng = random.Random(i)
+    if endpoint == "analyze":
+        return "POST", "/api/analyze", {"files": {"file": (f"stok_{i}.jpg", _jpeg(i), "image/jpeg")}}
+    if endpoint == "menu":
+        return "POST", "/api/recommend-menu", {"json": {"ingredients": rng.sample(ITEM_NAMES, rng.randint(2, 4))}}
+    if endpoint == "cook":
+        ids = [supply_ids[i % len(supply_ids)]] if supply_ids else []
+        return "POST", "/api/kitchen/cook", {"json": {
+            "menu_name": f"Menu Uji {i}", "qty_produced": 100, "ingredients_ids": ids
+        }}
+    if endpoint == "chat":
+        return "POST", "/api/kitchen/chat", {"json": {"message": CHAT_MESSAGES[i % len(CHAT_MESSAGES)]}}
+    if endpoint == "chat-stream":
+        return "POST", "/api/kitchen/chat/stream", {"json": {"message": CHAT_MESSAGES[i % len(CHAT_MESSAGES)]}}
+    if endpoint == "menu-stream":
+        return "POST", "/api/recommend-menu/stream", {"json": {"ingredients": rng.sample(ITEM_NAMES, 3)}}
+    raise ValueError(endpoint)
+
+def _failed(response, streamed):
+    if response.status_code != 200:
+        return True
+    if streamed:
+        return "event: error" in response.text
+    try:
+        body = response.json()
+    except ValueError:
+        return True
+    return isinstance(body, dict) and "error" in body
+
+async def run_endpoint(client, endpoint, n_requests, concurrency, supply_ids, offset=0):
+    """
+    Closed loop: `concurrency` worker mengirim request berturut-turut sampai n_requests habis.
+    """
+    latencies, statuses, errors = [], {}, 0
+    counter = iter(range(offset, offset + n_requests))
+    streamed = endpoint.endswith("-stream")
+
+    async def worker():
+        nonlocal errors
+        for i in counter:
+            method, path, kwargs = make_request(endpoint, i, supply_ids)
+            start = time.perf_counter()
+            try:
+                response = await client.request(method, path, **kwargs)
+                failed = _failed(response, streamed)
+                status = response.status_code
+            except httpx.HTTPError as e:
+                failed, status = True, type(e).__name__
+            latencies.append(time.perf_counter() - start)
+            statuses[status] = statuses.get(status, 0) + 1
+            errors += failed
+
+    start = time.perf_counter()
+    await asyncio.gather(*[worker() for _ in range(concurrency)])
+    elapsed = time.perf_counter() - start
+    return summarize(endpoint, latencies, elapsed, errors, statuses)
+
+def _pct(ordered, q):
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000
+
+def summarize(endpoint, latencies, elapsed, errors, statuses):
+    ordered = sorted(latencies)
+    return {
+        "endpoint": endpoint,
+        "requests": len(latencies),
+        "errors": errors,
+        "statuses": statuses,
+        "p50_ms": _pct(ordered, 0.50),
+        "p95_ms": _pct(ordered, 0.95),
+        "p99_ms": _pct(ordered, 0.99),
+        "mean_ms": statistics.mean(ordered) * 1000,
+        "throughput_rps": len(latencies) / elapsed if elapsed else 0.0,
+    }
+
+def print_report(rows):
+    print(f"\n{'endpoint':<12} | {'req':>5} | {'err':>4} | {'p50 (ms)':>9} | {'p95 (ms)':>9} | {'p99 (ms)':>9} |"
+          f" {'mean (ms)':>9} | {'req/s':>7} | status")
+    print("-" * 100)
+    for r in rows:
+        print(f"{r['endpoint']:<12} | {r['requests']:>5} | {r['errors']:>4} | {r['p50_ms']:>9.1f} | {r['p95_ms']:>9.1f} |"
+              f" {r['p99_ms']:>9.1f} | {r['mean_ms']:>9.1f} | {r['throughput_rps']:>7.1f} | {r['statuses']}")
+
+def setup_in_process(args):
+    """
+    Siapkan app in-process. Return: (httpx.AsyncClient, supply_ids, fungsi ringkasan metrik AI).
+    """
+    _, base_url = serve_in_thread(config_from_args(args))
+    print(f"🧪 Mock Kolosal: {base_url}")
+
+    from benchmarks.fake_supabase import install
+    db = install()
+    # Harus sebelum import main/services: client Kolosal & lokasi file cache dibaca saat import
+    os.environ["KOLOSAL_BASE_URL"] = base_url
+    os.environ["KOLOSAL_API_KEY"] = "mock"
+    tmp = tempfile.mkdtemp(prefix="load_ai_")
+    os.environ.setdefault("GEOCODE_CACHE_PATH", os.path.join(tmp, "geocode_cache.json"))
+    os.environ.setdefault("MEAL_EXPIRY_STORE_PATH", os.path.join(tmp, "meal_expiry.json"))
+
+    from benchmarks.synthetic import populate
+    info = populate(db, args.supplies)
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        import main
+        from security import create_access_token
+    main.limiter.enabled = False
+
+    token = create_access_token({"sub": str(info["kitchen_id"]), "role": "kitchen"})
+    client = httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=main.app), base_url="http://load-test",
+        headers={"Authorization": f"Bearer {token}"}, timeout=args.timeout
+    )
+    supply_ids = [row["id"] for row in db.table("supplies").select("id").execute().data]
+    random.Random(0).shuffle(supply_ids)
+
+    from services.llm import llm_stats
+    return client, supply_ids, llm_stats
+
+async def main_async(args):
+    if args.target:
+        client = httpx.AsyncClient(
+            base_url=args.target, timeout=args.timeout,
+            headers={"Authorization": f"Bearer {args.token}"} if args.token else {}
+        )
+        supply_ids, ai_stats = [], None
+    else:
+        client, supply_ids, ai_stats = setup_in_process(args)
+
+    endpoints = list(args.endpoints)
+    if args.stream:
+        endpoints += [f"{e}-stream" for e in ("menu", "chat") if e in args.endpoints]
+
+    rows = []
+    async with client:
+        for offset, endpoint in enumerate(endpoints):
+            print(f"▶️ {endpoint}: {args.requests} request, concurrency {args.concurrency}", file=sys.stderr)
+            # Log per request dari service dibuang supaya laporan tetap terbaca
+            with contextlib.redirect_stdout(io.StringIO()):
+                rows.append(await run_endpoint(
+                    client, endpoint, args.requests, args.concurrency, supply_ids, offset=offset * args.requests
+                ))
+    print_report(rows)
+
+    if ai_stats is not None:
+        stats = ai_stats()
+        print(f"\nAntrian AI: max_concurrency={stats['max_concurrency']}, singleflight={stats['singleflight']},"
+              f" prompt_cache={stats['prompt_cache']}")
+        for kind, s in stats["kinds"].items():
+            print(f"  {kind:<8} requests={s['requests']} retries={s['retries']} shed={s['shed']} errors={s['errors']}"
+                  f" queue_wait_ms={s['queue_wait_ms']} service_ms={s['service_ms']}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load test endpoint AI dengan mock Kolosal")
+    parser.add_argument("--endpoints", nargs="+", choices=ENDPOINTS, default=ENDPOINTS)
+    parser.add_argument("--stream", action="store_true", help="Tambah versi SSE untuk menu & chat")
+    parser.add_argument("--requests", type=int, default=100, help="Jumlah request per endpoint")
+    parser.add_argument("--concurrency", type=int, default=16, help="Jumlah client paralel")
+    parser.add_argument("--supplies", type=int, default=5000, help="Ukuran katalog sintetis (in-process)")
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--target", help="URL backend yang sudah jalan (lewati mode in-process)")
+    parser.add_argument("--token", help="JWT role kitchen untuk --target")
+    add_arguments(parser)
+    asyncio.run(main_async(parser.parse_args()))
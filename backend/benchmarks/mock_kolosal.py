@@ -0,0 +1,306 @@
+"""
+Server tiruan Kolosal (OpenAI-compatible) untuk load test endpoint AI tanpa
+memakai kredit: POST /v1/chat/completions (biasa & stream=True) dan GET /v1/models.
+
+Jalankan dari folder backend:
+    python -m benchmarks.mock_kolosal --port 9100
+    python -m benchmarks.mock_kolosal --latency lognormal:1500,0.4 --latency vision=lognormal:4000,0.3 \\
+        --error-rate 0.02 --rate-limit-rate 0.05 --retry-after 1
+
+lalu arahkan backend ke server ini:
+    KOLOSAL_BASE_URL=http://127.0.0.1:9100/v1 KOLOSAL_API_KEY=mock uvicorn main:app
+
+- Jenis request (vision, batch, cooked, menu, expiry, chat) dikenali dari isi prompt
+  (lihat ROUTES), lalu dijawab dengan JSON kalengan yang lolos validasi models.py.
+  --responses file.json mengganti jawaban per jenis: {"menu": "...teks...", ...}.
+- Latency: fixed:MS | uniform:LO,HI | normal:MEAN,SD | lognormal:MEDIAN,SIGMA (ms),
+  boleh per jenis dengan awalan "jenis=". Saat stream, token pertama keluar setelah
+  --ttft-ratio x latency, sisanya dibagi rata per potongan.
+- Error: --error-rate (HTTP 500) dan --rate-limit-rate (HTTP 429 + Retry-After).
+- usage.prompt_tokens_details.cached_tokens = awalan terpanjang system message
+  pertama yang sama dengan request sebelumnya (tiruan prompt caching provider).
+- GET /mock/stats: jumlah request per jenis, error yang disuntikkan, dst.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import re
+import threading
+import time
+import uuid
+from collections import Counter, deque
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+CHARS_PER_TOKEN = 4
+IMAGE_TOKENS = 1000
+STREAM_CHUNK_CHARS = 24
+PREFIX_MEMORY = 64  # system message terakhir yang "di-cache"
+
+# Urutan penting: penanda yang lebih spesifik dulu (batch sebelum vision)
+ROUTES = [
+    ("batch", "FOTO stok dagangan sekaligus"),
+    ("vision", "AI Inventory Cerdas"),
+    ("cooked", "foto makanan matang"),
+    ("expiry", "Higiene Sanitasi"),
+    ("menu", "Ahli Gizi dan Koki"),
+    ("chat", "Chef Bekal"),
+]
+
+CANNED = {
+    "vision": {"items": [{
+        "name": "Bawang Merah", "qty": 25, "unit": "Kg", "freshness": "Sangat Segar",
+        "expiry_days": 14, "visual_reasoning": "Kulit kering mengkilap, tidak ada tunas atau bercak."
+    }]},
+    "cooked": {
+        "menu_name": "Nasi Ayam Sayur Bayam", "is_safe": True, "spoilage_signs": [],
+        "nutrition_estimate": {"calories": "620", "protein": "28", "carbs": "80", "fats": "18"},
+        "visual_quality": "Warna cerah, nasi pulen, sayur masih hijau."
+    },
+    "expiry": {
+        "room_temp_hours": 4, "fridge_hours": 24, "risk_factor": "Sedang (berkuah)",
+        "storage_tips": "Dinginkan sebelum ditutup, pisahkan kuah dan isi.",
+        "nutrition": {"calories": "480 kcal", "protein": "22g", "carbs": "60g", "fats": "14g"}
+    },
+    "chat": (
+        "Siap, Chef! Di dapur sudah ada Bayam dan Tahu Putih dengan kualitas segar. "
+        "Yang masih kurang: Bawang Putih dan Cabai Rawit. Bisa beli Bawang Putih di Vendor 12 "
+        "(Jaraknya 0.8 km) dan Cabai Rawit di Vendor 7 (Jaraknya 1.2 km).\n\n"
+        "Resep Tumis Bayam Tahu (100 porsi):\n"
+        "1. Potong tahu dadu lalu goreng setengah matang.\n"
+        "2. Tumis bawang putih dan cabai hingga harum.\n"
+        "3. Masukkan bayam dan tahu, bumbui garam, aduk rata lalu angkat.\n"
+        "Sajikan hangat bersama nasi."
+    ),
+}
+
+def _menu_content(ingredients):
+    recipes = [{
+        "menu_name": f"Tumis {ingredients[i % len(ingredients)]} Spesial {i + 1}",
+        "description": "Menu sederhana, murah dan bergizi untuk makan siang sekolah.",
+        "ingredients": ingredients,
+        "ingredients_needed": [f"{name} 5 kg" for name in ingredients],
+        "cooking_steps": ["Langkah 1: Siapkan bahan.", "Langkah 2: Tumis hingga matang.", "Langkah 3: Sajikan."],
+        "nutrition": {"calories": "450 kcal", "protein": "18g", "carbs": "55g", "fats": "12g"},
+        "reason": "Memakai stok yang ada, praktis dan lokal.",
+    } for i in range(3)]
+    return json.dumps({"recommendations": recipes}, ensure_ascii=False, indent=2)
+
+def _batch_content(photo_count):
+    photos = [{"photo": n, "items": CANNED["vision"]["items"]} for n in range(1, photo_count + 1)]
+    return json.dumps({"photos": photos}, ensure_ascii=False)
+
+def parse_latency(spec):
+    """
+    "lognormal:1500,0.4" -> fungsi tanpa argumen yang mengembalikan latency (detik).
+    """
+    kind, _, args = spec.partition(":")
+    values = [float(v) for v in args.split(",") if v]
+    if kind == "fixed" and len(values) == 1:
+        return lambda: values[0] / 1000
+    if kind == "uniform" and len(values) == 2:
+        return lambda: random.uniform(*values) / 1000
+    if kind == "normal" and len(values) == 2:
+        return lambda: max(0.0, random.gauss(*values)) / 1000
+    if kind == "lognormal" and len(values) == 2:
+        median, sigma = values
+        return lambda: random.lognormvariate(0, sigma) * median / 1000
+    raise ValueError(f"Format latency tidak dikenal: {spec!r}")
+
+class MockConfig:
+
+    def __init__(self, latency=None, ttft_ratio=0.2, error_rate=0.0, rate_limit_rate=0.0,
+                 retry_after=1.0, responses=None, seed=None):
+        self.latency = {"default": parse_latency("lognormal:800,0.3")}
+        for spec in latency or []:
+            kind, sep, rest = spec.partition("=")
+            if sep:
+                self.latency[kind] = parse_latency(rest)
+            else:
+                self.latency["default"] = parse_latency(spec)
+        self.ttft_ratio = ttft_ratio
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.retry_after = retry_after
+        self.responses = responses or {}
+        if seed is not None:
+            random.seed(seed)
+
+    def sample_latency(self, kind):
+        return self.latency.get(kind, self.latency["default"])()
+
+def _texts(messages):
+    for message in messages:
+        content = message.get("content")
+        if isinstance(content, str):
+            yield content
+        elif isinstance(content, list):
+            for part in content:
+                if part.get("type") == "text":
+                    yield part.get("text", "")
+
+def classify(messages):
+    text = "\n".join(_texts(messages))
+    for kind, marker in ROUTES:
+        if marker in text:
+            return kind, text
+    return "other", text
+
+def _prompt_tokens(messages, text):
+    images = sum(
+        1 for message in messages if isinstance(message.get("content"), list)
+        for part in message["content"] if part.get("type") == "image_url"
+    )
+    return len(text) // CHARS_PER_TOKEN + images * IMAGE_TOKENS
+
+def create_app(config):
+    app = FastAPI(title="Mock Kolosal")
+    stats = Counter()
+    recent_prefixes = deque(maxlen=PREFIX_MEMORY)
+    lock = threading.Lock()
+
+    def answer(kind, text):
+        if kind in config.responses:
+            return config.responses[kind]
+        if kind == "menu":
+            match = re.search(r"STOK BAHAN TERSEDIA di gudang: (.*?)\.\n", text)
+            ingredients = [s.strip() for s in match.group(1).split(",")] if match else ["Bayam"]
+            return _menu_content([s for s in ingredients if s] or ["Bayam"])
+        if kind == "batch":
+            match = re.search(r"menerima (\d+) FOTO", text)
+            return _batch_content(int(match.group(1)) if match else 1)
+        canned = CANNED.get(kind, CANNED["chat"])
+        return canned if isinstance(canned, str) else json.dumps(canned, ensure_ascii=False)
+
+    def usage(messages, text, content):
+        prompt_tokens = _prompt_tokens(messages, text)
+        cached = 0
+        first = messages[0] if messages else {}
+        if first.get("role") == "system" and isinstance(first.get("content"), str):
+            with lock:
+                shared = max((len(os.path.commonprefix([first["content"], seen])) for seen in recent_prefixes), default=0)
+                recent_prefixes.append(first["content"])
+            cached = shared // CHARS_PER_TOKEN
+        return {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": len(content) // CHARS_PER_TOKEN,
+            "total_tokens": prompt_tokens + len(content) // CHARS_PER_TOKEN,
+            "prompt_tokens_details": {"cached_tokens": cached},
+        }
+
+    def error_response(kind):
+        roll = random.random()
+        if roll < config.rate_limit_rate:
+            stats["injected_429"] += 1
+            return JSONResponse(
+                {"error": {"message": "Rate limit (mock)", "type": "rate_limit_error"}},
+                status_code=429, headers={"retry-after": f"{config.retry_after:g}"}
+            )
+        if roll < config.rate_limit_rate + config.error_rate:
+            stats["injected_500"] += 1
+            return JSONResponse({"error": {"message": "Internal error (mock)", "type": "server_error"}}, status_code=500)
+        return None
+
+    @app.get("/v1/models")
+    async def list_models():
+        return {"object": "list", "data": [{"id": "Claude Sonnet 4.5", "object": "model", "owned_by": "mock"}]}
+
+    @app.get("/mock/stats")
+    async def mock_stats():
+        return dict(stats)
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        messages = body.get("messages", [])
+        kind, text = classify(messages)
+        stats[f"requests_{kind}"] += 1
+        latency = config.sample_latency(kind)
+
+        error = error_response(kind)
+        if error is not None:
+            await asyncio.sleep(latency * config.ttft_ratio)
+            return error
+
+        content = answer(kind, text)
+        completion_id = f"chatcmpl-mock-{uuid.uuid4().hex[:12]}"
+        created = int(time.time())
+        model = body.get("model", "mock")
+
+        if not body.get("stream"):
+            await asyncio.sleep(latency)
+            return {
+                "id": completion_id, "object": "chat.completion", "created": created, "model": model,
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+                "usage": usage(messages, text, content),
+            }
+
+        stats[f"streams_{kind}"] += 1
+        chunks = [content[i:i + STREAM_CHUNK_CHARS] for i in range(0, len(content), STREAM_CHUNK_CHARS)]
+        per_chunk = latency * (1 - config.ttft_ratio) / max(1, len(chunks))
+
+        def chunk_event(delta, finish_reason=None):
+            payload = {
+                "id": completion_id, "object": "chat.completion.chunk", "created": created, "model": model,
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+            }
+            return f"data: {json.dumps(payload, ensure_ascii=False)}\n\n"
+
+        async def events():
+            await asyncio.sleep(latency * config.ttft_ratio)
+            yield chunk_event({"role": "assistant", "content": ""})
+            for chunk in chunks:
+                yield chunk_event({"content": chunk})
+                await asyncio.sleep(per_chunk)
+            yield chunk_event({}, finish_reason="stop")
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    return app
+
+def serve_in_thread(config, host="127.0.0.1", port=0):
+    """
+    Jalankan server di thread daemon (dipakai load test in-process).
+    Return: (server uvicorn, base_url untuk KOLOSAL_BASE_URL).
+    """
+    server = uvicorn.Server(uvicorn.Config(create_app(config), host=host, port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.01)
+    bound_port = server.servers[0].sockets[0].getsockname()[1]
+    return server, f"http://{host}:{bound_port}/v1"
+
+def add_arguments(parser):
+    parser.add_argument("--latency", action="append", default=[],
+                        help="Distribusi latency, boleh per jenis: lognormal:800,0.3 atau menu=fixed:2000")
+    parser.add_argument("--ttft-ratio", type=float, default=0.2, help="Porsi latency sebelum token pertama (stream)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Peluang HTTP 500")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="Peluang HTTP 429")
+    parser.add_argument("--retry-after", type=float, default=1.0, help="Nilai header Retry-After untuk 429 (detik)")
+    parser.add_argument("--responses", help="File JSON {jenis: teks jawaban} pengganti jawaban kalengan")
+    parser.add_argument("--seed", type=int, help="Seed random (latency & error bisa diulang)")
+
+def config_from_args(args):
+    responses = None
+    if args.responses:
+        with open(args.responses, encoding="utf-8") as f:
+            responses = json.load(f)
+    return MockConfig(
+        latency=args.latency, ttft_ratio=args.ttft_ratio, error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate, retry_after=args.retry_after, responses=responses, seed=args.seed
+    )
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Server tiruan Kolosal (OpenAI-compatible)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9100)
+    add_arguments(parser)
+    args = parser.parse_args()
+    print(f"🧪 Mock Kolosal di http://{args.host}:{args.port}/v1")
+    uvicorn.run(create_app(config_from_args(args)), host=args.host, port=args.port, log_level="warning")
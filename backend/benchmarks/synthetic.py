@@ -0,0 +1,129 @@
+"""
+Generator data sintetis (users, supplies, orders) untuk benchmark.
+
+Bentuk baris mengikuti yang ditulis backend (main.py / test_insert.py):
+angka acak via random.uniform, vendor & kitchen di sekitar Jakarta,
+sebagian kecil stok tanpa GPS (ikut jalur geocoding).
+"""
+import random
+from datetime import date, timedelta
+
+ITEM_NAMES = [
+    "Bayam", "Kangkung", "Sawi Hijau", "Caisim", "Kubis", "Kol", "Wortel", "Bortel",
+    "Tomat", "Timun", "Terong", "Labu Siam", "Jipang", "Kentang", "Singkong",
+    "Bawang Merah", "Brambang", "Bawang Putih", "Bawang Bombay", "Cabai Rawit",
+    "Cabe Merah", "Cabai Keriting", "Jahe", "Kunyit", "Lengkuas", "Serai", "Seledri",
+    "Tauge", "Toge", "Buncis", "Kacang Panjang", "Jagung Manis", "Tahu Putih",
+    "Tempe", "Telur Ayam", "Telor Bebek", "Ayam Potong", "Daging Sapi", "Ikan Lele",
+    "Ikan Tongkol", "Ikan Bandeng", "Udang", "Beras Medium", "Beras Premium",
+    "Minyak Goreng", "Gula Pasir", "Garam", "Pisang", "Pepaya", "Jeruk",
+]
+UNITS = ["Kg", "Ikat", "Pcs", "Liter", "Papan", "Karung"]
+FRESHNESS = ["Sangat Segar", "Segar", "Cukup Segar", "Layu"]
+ORDER_STATUSES = ["pending", "confirmed", "completed"]
+ADDRESSES = [
+    "Pasar Tanah Abang, Jakarta Pusat", "Pasar Senen, Jakarta Pusat", "Pasar Minggu, Jakarta Selatan",
+    "Pasar Kramat Jati, Jakarta Timur", "Pasar Koja, Jakarta Utara", "Pasar Kebon Jeruk, Jakarta Barat",
+    "Jl. Kemang Raya, Mampang Prapatan", "Kec. Cengkareng, Jakbar", "Pasar Induk Cipinang, Jaktim",
+    "Kelapa Gading, Jakarta Utara",
+]
+
+# Titik pusat: Monas (Jakarta Pusat), sebaran ~±30 km
+ORIGIN = (-6.175392, 106.827153)
+SPREAD_DEG = 0.27
+MISSING_GPS_RATIO = 0.05
+
+def _point(rng):
+    return (
+        round(ORIGIN[0] + rng.uniform(-SPREAD_DEG, SPREAD_DEG), 6),
+        round(ORIGIN[1] + rng.uniform(-SPREAD_DEG, SPREAD_DEG), 6),
+    )
+
+def generate_users(n_vendors, n_kitchens, rng):
+    users = []
+    for i in range(n_vendors + n_kitchens):
+        role = "vendor" if i < n_vendors else "kitchen"
+        lat, lon = _point(rng)
+        users.append({
+            "id": i + 1,
+            "full_name": f"{'Vendor' if role == 'vendor' else 'Dapur SPPG'} {i + 1}",
+            "email": f"user{i + 1}@example.com",
+            "username": f"user{i + 1}",
+            "role": role,
+            "phone_number": f"0812{rng.randint(10_000_000, 99_999_999)}",
+            "address": rng.choice(ADDRESSES),
+            "latitude": lat,
+            "longitude": lon,
+        })
+    return users
+
+def generate_supplies(n, vendors, rng):
+    today = date.today()
+    supplies = []
+    for i in range(n):
+        vendor = rng.choice(vendors)
+        expiry_days = rng.randint(0, 14)
+        lat, lon = vendor["latitude"], vendor["longitude"]
+        if rng.random() < MISSING_GPS_RATIO:
+            lat, lon = None, None
+        supplies.append({
+            "id": i + 1,
+            "item_name": rng.choice(ITEM_NAMES),
+            "quantity": rng.randint(1, 200),
+            "unit": rng.choice(UNITS),
+            "quality_status": rng.choice(FRESHNESS),
+            "expiry_days": expiry_days,
+            "expiry_date": (today + timedelta(days=expiry_days)).isoformat(),
+            "photo_url": None,
+            "ai_notes": None,
+            "user_id": vendor["id"],
+            "owner_name": vendor["full_name"],
+            "location": vendor["address"],
+            "latitude": lat,
+            "longitude": lon,
+        })
+    return supplies
+
+def generate_orders(n, supplies, kitchens, rng):
+    orders = []
+    for i in range(n):
+        supply = rng.choice(supplies)
+        kitchen = rng.choice(kitchens)
+        orders.append({
+            "id": i + 1,
+            "supply_id": supply["id"],
+            "qty_ordered": rng.randint(1, 50),
+            "status": rng.choice(ORDER_STATUSES),
+            "buyer_id": kitchen["id"],
+            "buyer_name": kitchen["full_name"],
+            "seller_id": supply["user_id"],
+        })
+    return orders
+
+def populate(db, n_supplies, seed=42):
+    """
+    Isi FakeSupabase dengan n_supplies stok, n_supplies/2 order,
+    1 vendor per 50 stok dan 1 kitchen per 2000 stok (minimal 5).
+    Return: dict ringkasan (jumlah baris + contoh id vendor/kitchen).
+    """
+    rng = random.Random(seed)
+    n_vendors = max(1, n_supplies // 50)
+    n_kitchens = max(5, n_supplies // 2000)
+
+    users = generate_users(n_vendors, n_kitchens, rng)
+    vendors = [u for u in users if u["role"] == "vendor"]
+    kitchens = [u for u in users if u["role"] == "kitchen"]
+    supplies = generate_supplies(n_supplies, vendors, rng)
+    orders = generate_orders(n_supplies // 2, supplies, kitchens, rng)
+
+    db.load("users", users)
+    db.load("supplies", supplies)
+    db.load("orders", orders)
+
+    return {
+        "users": len(users),
+        "supplies": len(supplies),
+        "orders": len(orders),
+        "vendor_id": vendors[0]["id"],
+        "kitchen_id": kitchens[0]["id"],
+    }
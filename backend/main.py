@@ -1,9 +1,15 @@
+import asyncio
+import json
+import threading
 import traceback
+from pathlib import Path
+from contextlib import asynccontextmanager
 from typing import List, Optional
 from datetime import datetime, timezone
 
-from fastapi import FastAPI, UploadFile, File, HTTPException, Request, Depends, status
+from fastapi import FastAPI, UploadFile, File, HTTPException, Request, Depends, Query, status
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from fastapi.concurrency import run_in_threadpool
 
 # --- RATE LIMITER ---
@@ -28,7 +34,8 @@ from security import (
     get_password_hash, 
     verify_password, 
     create_access_token, 
-    get_current_user
+    get_current_user,
+    get_optional_user
 )
 
 from google.oauth2 import id_token
@@ -36,17 +43,43 @@ from google.auth.transport import requests as google_requests
 import os
 
 # --- SERVICES ---
-from services.vision import analyze_market_inventory, analyze_cooked_meal
-from services.kitchen import generate_menu_recommendation, cook_meal, chat_with_chef
-from services.logistics import search_suppliers, search_nearest_sppg
+from services.clients import kolosal_async_client
+from services.llm import llm_stats
+from services.market_snapshot import market_snapshot
+from services.vision import (
+    analyze_market_inventory_async, analyze_market_inventory_batch_async, analyze_cooked_meal_async,
+    resize_image, VISION_BATCH_MAX_FILES
+)
+from services.kitchen import (
+    generate_menu_recommendation_async, cook_meal_async, chat_with_chef_async,
+    stream_menu_recommendation_async, stream_chat_with_chef_async, warm_meal_expiry_store
+)
+from services.logistics import search_suppliers, search_suppliers_page, search_nearest_sppg, index_supplies
+from services.geocoding import geocode_address
+from services.sppg import sppg_registry
+from services.proximity import nearest_sppg_table
+from services.routing import plan_pickup_route
 from services.inventory import calculate_expiry_date, check_expiry_and_notify
-from services.storage import upload_image_to_supabase
+from services.storage import upload_image_to_supabase, upload_bytes_to_supabase
 from services.analytics import get_kitchen_analytics, get_vendor_analytics
 
 # 1. Setup Limiter (Kunci berdasarkan IP Address)
 limiter = Limiter(key_func=get_remote_address)
 
-app = FastAPI(title="Bekal Bangsa API", version="1.0.0")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Startup: muat jaringan SPPG ke KD-tree
+    try:
+        sppg_registry.load()
+    except Exception as e:
+        print(f"⚠️ Gagal memuat SPPG registry saat startup: {e}")
+    # Isi tabel umur simpan masakan di background (tidak menahan startup)
+    threading.Thread(target=warm_meal_expiry_store, daemon=True).start()
+    yield
+    # Shutdown: tutup pool koneksi HTTP ke Kolosal
+    await kolosal_async_client.close()
+
+app = FastAPI(title="Bekal Bangsa API", version="1.0.0", lifespan=lifespan)
 
 # 2. Pasang Limiter & CORS
 app.state.limiter = limiter
@@ -101,6 +134,10 @@ async def register(request: Request, user: UserRegister):
         # 4. Insert ke DB
         res = supabase.table("users").insert(user_data).execute()
         new_user = res.data[0]
+
+        # Vendor baru: hitung SPPG terdekat sekarang (tabel jarak vendor-SPPG)
+        if new_user['role'] == "vendor":
+            nearest_sppg_table.register_vendor(new_user['id'], new_user.get('latitude'), new_user.get('longitude'))
         
         # 5. Auto Login (Generate Token)
         access_token = create_access_token(data={"sub": str(new_user['id']), "role": new_user['role']})
@@ -187,6 +224,13 @@ async def create_supplies(
             if not final_expiry and item.expiry_days:
                 final_expiry = calculate_expiry_date(item.expiry_days)
             
+            # Koordinat: GPS item -> GPS user -> geocoding alamat (deterministik)
+            item_lat = item.latitude or user_info.get('latitude')
+            item_long = item.longitude or user_info.get('longitude')
+            if item_lat is None or item_long is None:
+                point = geocode_address(user_info.get('address'))
+                item_lat, item_long = point['lat'], point['lon']
+
             data_to_insert.append({
                 "item_name": item.name,
                 "quantity": item.qty,
@@ -203,11 +247,12 @@ async def create_supplies(
                 # Denormalisasi data (opsional, biar query gampang)
                 "owner_name": user_info.get('full_name', 'Vendor'), 
                 "location": user_info.get('address', 'Pasar Tradisional'),
-                "latitude": item.latitude or user_info.get('latitude'),
-                "longitude": item.longitude or user_info.get('longitude')
+                "latitude": item_lat,
+                "longitude": item_long
             })
         
         response = supabase.table("supplies").insert(data_to_insert).execute()
+        index_supplies(response.data)
         return {"status": "success", "count": len(items), "data": response.data}
     
     except Exception as e:
@@ -350,6 +395,20 @@ async def get_my_orders(request: Request, current_user: dict = Depends(get_curre
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/api/orders/kitchen/route")
+async def get_pickup_route(request: Request, current_user: dict = Depends(get_current_user)):
+    """
+    Rute pickup untuk semua pesanan 'confirmed' Kitchen ini:
+    order dikelompokkan per lokasi vendor lalu diurutkan jadi satu putaran dari Dapur.
+    """
+    if current_user["role"] != "kitchen":
+        raise HTTPException(status_code=403, detail="Akses ditolak")
+
+    result = await run_in_threadpool(plan_pickup_route, current_user["user_id"])
+    if "error" in result:
+        raise HTTPException(status_code=500, detail=result["error"])
+    return result
+
 @app.post("/api/kitchen/cook")
 async def cook_meal_endpoint(request: Request, req_data: CookRequest, current_user: dict = Depends(get_current_user)):
     """
@@ -360,7 +419,7 @@ async def cook_meal_endpoint(request: Request, req_data: CookRequest, current_us
         
     try:
         # Panggil logic service
-        result = cook_meal(req_data.menu_name, req_data.qty_produced, req_data.ingredients_ids)
+        result = await cook_meal_async(req_data.menu_name, req_data.qty_produced, req_data.ingredients_ids)
         if "error" in result:
              raise HTTPException(status_code=500, detail=result["error"])
         return result
@@ -382,18 +441,49 @@ async def get_cooked_meals(request: Request):
 # 🤖 BAGIAN 4: FITUR PUBLIK & AI
 # ==========================================
 
+def _owner_id(current_user):
+    # Index foto mirip di-scope per user; tanpa login tidak ada pencocokan foto mirip
+    return current_user["user_id"] if current_user else None
+
 @app.post("/api/analyze")
 @limiter.limit("10/minute")
-async def analyze_image(request: Request, file: UploadFile = File(...)):
+async def analyze_image(
+    request: Request, file: UploadFile = File(...), current_user: Optional[dict] = Depends(get_optional_user)
+):
     """
     AI Vision: Analisis Stok Mentah.
     Rate Limit: 10x / menit per IP.
+    Kalau login, hasil foto mirip milik user yang sama bisa dipakai ulang.
     """
     try:
         image_bytes = await file.read()
-        # Jalankan di threadpool biar tidak blocking
-        result = await run_in_threadpool(analyze_market_inventory, image_bytes)
+        # Async end-to-end: resize di thread, panggilan AI tidak makan slot threadpool
+        result = await analyze_market_inventory_async(image_bytes, owner=_owner_id(current_user))
+        return result
+    except Exception as e:
+        traceback.print_exc()
+        raise HTTPException(status_code=500, detail=f"AI Error: {str(e)}")
+
+@app.post("/api/analyze/batch")
+@limiter.limit("10/minute")
+async def analyze_images_batch(
+    request: Request, files: List[UploadFile] = File(...), current_user: Optional[dict] = Depends(get_optional_user)
+):
+    """
+    AI Vision: Analisis banyak foto stok dalam satu request.
+    Hasil semua foto digabung jadi satu daftar barang (tanpa duplikat).
+    """
+    if len(files) > VISION_BATCH_MAX_FILES:
+        raise HTTPException(status_code=400, detail=f"Maksimal {VISION_BATCH_MAX_FILES} foto per request")
+
+    try:
+        images = [await file.read() for file in files]
+        result = await analyze_market_inventory_batch_async(images, owner=_owner_id(current_user))
+        if "error" in result:
+            raise HTTPException(status_code=500, detail=result["error"])
         return result
+    except HTTPException:
+        raise
     except Exception as e:
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=f"AI Error: {str(e)}")
@@ -407,7 +497,7 @@ async def scan_meal(request: Request, file: UploadFile = File(...)):
     """
     try:
         image_bytes = await file.read()
-        result = await run_in_threadpool(analyze_cooked_meal, image_bytes)
+        result = await analyze_cooked_meal_async(image_bytes)
         return result
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -426,17 +516,79 @@ async def upload_file_endpoint(request: Request, file: UploadFile = File(...)):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/api/upload-analyze")
+@limiter.limit("10/minute")
+async def upload_and_analyze(
+    request: Request, file: UploadFile = File(...), current_user: Optional[dict] = Depends(get_optional_user)
+):
+    """
+    Upload foto stok + analisis AI dalam satu request.
+    Gambar dibaca & di-resize SEKALI, lalu upload Storage dan panggilan AI
+    jalan bersamaan. Yang disimpan di Storage adalah versi hasil resize.
+    """
+    try:
+        image_bytes = await file.read()
+        resized_bytes = await run_in_threadpool(resize_image, image_bytes)
+        if not resized_bytes:
+            raise HTTPException(status_code=400, detail="File gambar kosong")
+
+        if resized_bytes is image_bytes:
+            # File asli dipakai apa adanya (biasanya JPEG yang sudah muat, tanpa encode ulang)
+            # -> simpan dengan nama & tipe aslinya
+            upload_name, content_type = file.filename, file.content_type
+        else:
+            upload_name, content_type = f"{Path(file.filename or 'upload').stem}.jpg", "image/jpeg"
+
+        url, result = await asyncio.gather(
+            run_in_threadpool(upload_bytes_to_supabase, resized_bytes, upload_name, content_type),
+            analyze_market_inventory_async(image_bytes, resized_bytes, owner=_owner_id(current_user))
+        )
+        if not url:
+            # Hasil AI sudah masuk cache, jadi retry tidak bayar panggilan AI lagi
+            raise HTTPException(status_code=500, detail="Gagal upload ke Storage")
+        return {**result, "url": url}
+    except HTTPException:
+        raise
+    except Exception as e:
+        traceback.print_exc()
+        raise HTTPException(status_code=500, detail=f"AI Error: {str(e)}")
+
 @app.post("/api/recommend-menu")
 @limiter.limit("10/minute")
 async def recommend_menu_endpoint(request: Request, request_data: MenuRequest):
     """
     AI Text: Rekomendasi Menu dari Stok.
     """
-    result = await run_in_threadpool(generate_menu_recommendation, request_data.ingredients)
+    result = await generate_menu_recommendation_async(request_data.ingredients)
     if "error" in result:
         raise HTTPException(status_code=500, detail=result["error"])
     return result
 
+def _sse_response(events):
+    """
+    Bungkus async generator (event, data) jadi Server-Sent Events.
+    Format tiap pesan: "event: <nama>\ndata: <json>\n\n".
+    """
+    async def body():
+        async for event, data in events:
+            yield f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+    return StreamingResponse(
+        body(),
+        media_type="text/event-stream",
+        # Matikan buffering proxy (nginx) biar token langsung sampai ke browser
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.post("/api/recommend-menu/stream")
+@limiter.limit("10/minute")
+async def recommend_menu_stream_endpoint(request: Request, request_data: MenuRequest):
+    """
+    Versi SSE /api/recommend-menu.
+    Event: `token` (teks mentah), `recipe` (tiap resep begitu lengkap), lalu `done` (hasil penuh) atau `error`.
+    """
+    return _sse_response(stream_menu_recommendation_async(request_data.ingredients))
+
 # ==========================================
 # 🌍 BAGIAN 5: DASHBOARD & PENCARIAN
 # ==========================================
@@ -457,21 +609,51 @@ async def get_all_supplies(request: Request, skip: int = 0, limit: int = 100):
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/suppliers/search")
-async def find_suppliers(request: Request, q: str, lat: float = -6.175392, long: float = 106.827153):
+async def find_suppliers(
+    request: Request,
+    q: str,
+    lat: float = -6.175392,
+    long: float = 106.827153,
+    radius_km: Optional[float] = Query(None, gt=0, description="Batas jarak pencarian (km)"),
+    limit: Optional[int] = Query(None, ge=1, le=500, description="Jumlah supplier (per halaman jika paginate)"),
+    paginate: bool = Query(False, description="Kirim next_cursor untuk halaman berikutnya"),
+    cursor: Optional[str] = Query(None, description="next_cursor dari halaman sebelumnya")
+):
     """
     Cari supplier berdasarkan keyword & lokasi terdekat.
-    """
-    results = search_suppliers(q, lat, long)
+    Opsional: radius_km & limit supaya hanya N supplier terdekat yang dikirim (top-k).
+    Jika paginate=true atau cursor diisi, hasil dipaginasi: pakai next_cursor untuk halaman berikutnya.
+    """
+    if paginate or cursor:
+        try:
+            page = await run_in_threadpool(
+                search_suppliers_page, q, lat, long, limit or 20, radius_km=radius_km, cursor=cursor
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        except Exception as e:
+            print(f"❌ Error DB Search: {e}")
+            raise HTTPException(status_code=500, detail="Gagal mencari data")
+        return {"status": "success", "count": len(page["data"]), "data": page["data"], "next_cursor": page["next_cursor"]}
+
+    # Search sync (index in-process / query DB) -> jalankan di threadpool, bukan di event loop
+    results = await run_in_threadpool(search_suppliers, q, lat, long, limit=limit, radius_km=radius_km)
     if isinstance(results, dict) and "error" in results:
         raise HTTPException(status_code=500, detail=results["error"])
     return {"status": "success", "count": len(results), "data": results}
 
 @app.get("/api/sppg/search")
-async def find_nearest_sppg(request: Request, lat: float, long: float):
+async def find_nearest_sppg(
+    request: Request,
+    lat: float,
+    long: float,
+    k: int = Query(10, ge=1, le=100, description="Jumlah SPPG terdekat"),
+    radius_km: Optional[float] = Query(None, gt=0, description="Batas jarak pencarian (km)")
+):
     """
     Vendor mencari lokasi Kitchen/SPPG terdekat.
     """
-    results = search_nearest_sppg(lat, long)
+    results = search_nearest_sppg(lat, long, k=k, radius_km=radius_km)
     return {"status": "success", "data": results}
 
 # --- ANALYTICS ---
@@ -493,6 +675,14 @@ async def vendor_analytics_endpoint(request: Request, current_user: dict = Depen
     if "error" in result: 
         raise HTTPException(status_code=500, detail=result["error"])
     return result
+
+@app.get("/api/ai/metrics")
+async def ai_metrics_endpoint(request: Request, current_user: dict = Depends(get_current_user)):
+    """
+    Kondisi antrian AI: slot aktif, antrian, dan waktu antri/layanan (p50/p95) per jenis panggilan,
+    plus pemakaian ulang snapshot pasar & token yang kena prompt cache provider.
+    """
+    return {**llm_stats(), "market_snapshot": market_snapshot.stats()}
 # ==========================================
 # 📡 BAGIAN 6: IOT & NOTIFIKASI
 # ==========================================
@@ -632,6 +822,8 @@ async def google_login(data: GoogleLoginRequest):
             }
             insert_res = supabase.table("users").insert(new_user_data).execute()
             user = insert_res.data[0]
+            if user['role'] == "vendor":
+                nearest_sppg_table.register_vendor(user['id'], user.get('latitude'), user.get('longitude'))
             
         # 4. Generate Token Aplikasi (Sama seperti login biasa)
         access_token = create_access_token(data={"sub": str(user['id']), "role": user['role']})
@@ -668,7 +860,17 @@ async def chat_chef_endpoint(request: Request, chat_data: ChatRequest, current_u
         
     try:
         # Panggil fungsi chat_with_chef yang baru
-        result = await run_in_threadpool(chat_with_chef, chat_data.message, current_user["user_id"])
+        result = await chat_with_chef_async(chat_data.message, current_user["user_id"])
         return result
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/api/kitchen/chat/stream")
+async def chat_chef_stream_endpoint(request: Request, chat_data: ChatRequest, current_user: dict = Depends(get_current_user)):
+    """
+    Versi SSE /api/kitchen/chat. Event: `token` per potongan balasan, lalu `done` ({"reply": ...}) atau `error`.
+    """
+    if current_user["role"] != "kitchen":
+        raise HTTPException(status_code=403, detail="Akses ditolak")
+
+    return _sse_response(stream_chat_with_chef_async(chat_data.message, current_user["user_id"]))
\ No newline at end of file
@@ -1,5 +1,5 @@
-from pydantic import BaseModel
-from typing import Optional, List
+from pydantic import BaseModel, ConfigDict, Field
+from typing import Optional, List, Union, Annotated
 
 # ==========================================
 # 🔐 1. AUTH MODELS (OTENTIKASI)
@@ -90,4 +90,69 @@ class IoTLogRequest(BaseModel):
 
 class ChatRequest(BaseModel):
     message: str
-    context: Optional[str] = "general" # 'cooking', 'shopping', etc
\ No newline at end of file
+    context: Optional[str] = "general" # 'cooking', 'shopping', etc
+
+# ==========================================
+# 🤖 5. AI OUTPUT MODELS (VALIDASI JAWABAN CLAUDE)
+# ==========================================
+# Dipakai services/llm_json.validate_output. Field tambahan dari AI dibiarkan
+# (extra="allow"), angka boleh dikirim sebagai string ("5" -> 5).
+
+Number = Union[int, float]
+# Angka kalau bisa ("5" -> 5), selain itu teks apa adanya ("1-2")
+NumberOrText = Annotated[Union[int, float, str], Field(union_mode="left_to_right")]
+
+class AINutrition(BaseModel):
+    model_config = ConfigDict(extra="allow")
+    calories: Optional[Union[str, Number]] = None
+    protein: Optional[Union[str, Number]] = None
+    carbs: Optional[Union[str, Number]] = None
+    fats: Optional[Union[str, Number]] = None
+
+class AIInventoryItem(BaseModel):
+    model_config = ConfigDict(extra="allow")
+    name: str
+    qty: Optional[NumberOrText] = None
+    unit: Optional[str] = None
+    freshness: Optional[str] = None
+    expiry_days: Optional[NumberOrText] = None
+    visual_reasoning: Optional[str] = None
+
+class AIInventoryAnalysis(BaseModel):
+    model_config = ConfigDict(extra="allow")
+    items: List[AIInventoryItem] = []
+
+class AIBatchPhoto(BaseModel):
+    model_config = ConfigDict(extra="allow")
+    photo: int
+    items: List[AIInventoryItem] = []
+
+class AIBatchInventoryAnalysis(BaseModel):
+    model_config = ConfigDict(extra="allow")
+    photos: List[AIBatchPhoto]
+
+class AIMenuRecipe(BaseModel):
+    model_config = ConfigDict(extra="allow")
+    menu_name: str
+    description: Optional[str] = None
+    ingredients: List[str] = []
+    ingredients_needed: List[str] = []
+    cooking_steps: List[str] = []
+    nutrition: Optional[AINutrition] = None
+    reason: Optional[str] = None
+
+class AIMealSafety(BaseModel):
+    model_config = ConfigDict(extra="allow")
+    room_temp_hours: Optional[Number] = None
+    fridge_hours: Optional[Number] = None
+    risk_factor: Optional[str] = None
+    storage_tips: Optional[str] = None
+    nutrition: Optional[AINutrition] = None
+
+class AICookedMealAnalysis(BaseModel):
+    model_config = ConfigDict(extra="allow")
+    menu_name: Optional[str] = None
+    is_safe: Optional[bool] = None
+    spoilage_signs: List[str] = []
+    nutrition_estimate: Optional[AINutrition] = None
+    visual_quality: Optional[str] = None
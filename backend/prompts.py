@@ -28,6 +28,42 @@ def get_inventory_analysis_prompt():
     }
     """
 
+def get_batch_inventory_analysis_prompt(photo_count):
+    return f"""
+    Kamu adalah AI Inventory Cerdas untuk pedagang pasar tradisional Indonesia.
+    Kamu menerima {photo_count} FOTO stok dagangan sekaligus (Foto 1 sampai Foto {photo_count}, sesuai urutan gambar).
+    Analisis SETIAP foto secara terpisah dan ekstrak data logistiknya.
+
+    Untuk setiap foto, lakukan langkah berpikir ini:
+    1. IDENTIFIKASI: Barang apa ini? (Gunakan nama lokal Indonesia, misal: Bawang Merah, Cabe Rawit).
+    2. HITUNG (COUNTING): 
+       - Hitung jumlah objek yang terlihat di foto itu saja dengan teliti.
+       - Jika barangnya satuan (seperti Bawang, Telur, Buah), hitung per butir/pcs.
+       - Jika barangnya dalam wadah (seperti Beras dalam karung), hitung wadahnya.
+       - Jika bertumpuk sangat banyak (seperti cabe sekilo), berikan estimasi "1" dengan satuan "Tumpukan/Kg".
+    3. QUALITY CHECK: Lihat warna, tekstur, dan kulit. Apakah segar? Ada busuk?
+    4. EXPIRY PREDICTION: Estimasi sisa hari layak konsumsi di suhu ruang.
+
+    Output HANYA JSON raw (tanpa markdown ```json), satu entri per foto:
+    {{
+        "photos": [
+            {{
+                "photo": (nomor foto, mulai dari 1),
+                "items": [
+                    {{
+                        "name": "Nama Barang",
+                        "qty": (integer),
+                        "unit": "Pcs/Ikat/Karung/Kg",
+                        "freshness": "Sangat Segar/Cukup/Layum/Busuk",
+                        "expiry_days": (integer sisa hari),
+                        "visual_reasoning": "Penjelasan singkat kenapa dinilai segitu"
+                    }}
+                ]
+            }}
+        ]
+    }}
+    """
+
 def get_menu_recommendation_prompt(ingredients_text):
     return f"""
     Kamu adalah Ahli Gizi dan Koki untuk program Makan Bergizi Gratis (MBG).
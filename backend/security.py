@@ -12,6 +12,7 @@ ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 24 # 1 Hari
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/login")
+optional_oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/login", auto_error=False)
 
 def verify_password(plain_password, hashed_password):
     return pwd_context.verify(plain_password, hashed_password)
@@ -43,4 +44,13 @@ async def get_current_user(token: str = Depends(oauth2_scheme)):
         raise credentials_exception
         
     # Opsional: Cek ke DB jika ingin validasi real-time (tapi nambah latensi)
-    return {"user_id": int(user_id), "role": role}
\ No newline at end of file
+    return {"user_id": int(user_id), "role": role}
+
+# Untuk endpoint publik: user yang login (kalau token valid), selain itu None
+async def get_optional_user(token: Optional[str] = Depends(optional_oauth2_scheme)):
+    if not token:
+        return None
+    try:
+        return await get_current_user(token)
+    except HTTPException:
+        return None
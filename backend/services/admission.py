@@ -0,0 +1,313 @@
+import asyncio
+import heapq
+import itertools
+import os
+import random
+import threading
+import time
+from collections import deque
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+import openai
+
+# --- ADMISSION CONTROL PANGGILAN AI ---
+# Semua panggilan ke Claude (sync dari thread maupun async dari event loop)
+# lewat satu antrian: maksimal LLM_MAX_CONCURRENCY yang jalan bersamaan,
+# sisanya antri berdasarkan prioritas (chat/vision/cook di depan, menu
+# penyelamatan dari cron di belakang). Antrian terlalu panjang -> request
+# langsung ditolak (shed) daripada menunggu sampai timeout.
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+LLM_MAX_QUEUE = int(os.getenv("LLM_MAX_QUEUE", "64"))
+# Request background ditolak lebih awal, biar antrian tidak habis untuk cron
+LLM_MAX_QUEUE_BACKGROUND = int(os.getenv("LLM_MAX_QUEUE_BACKGROUND", "8"))
+LLM_QUEUE_TIMEOUT_SECONDS = float(os.getenv("LLM_QUEUE_TIMEOUT_SECONDS", "30"))
+
+# Retry untuk 429 / 5xx / koneksi putus. Jeda = Retry-After dari provider kalau
+# ada, selain itu exponential backoff dengan jitter penuh.
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "3"))
+LLM_RETRY_BASE_SECONDS = float(os.getenv("LLM_RETRY_BASE_SECONDS", "0.5"))
+# Retry-After lebih lama dari ini -> langsung gagal, jangan tahan slot
+LLM_RETRY_MAX_WAIT_SECONDS = float(os.getenv("LLM_RETRY_MAX_WAIT_SECONDS", "20"))
+
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BACKGROUND = 1
+
+METRICS_SAMPLES = 512
+
+class LLMOverloadedError(Exception):
+    """Antrian AI penuh / terlalu lama menunggu: request ditolak."""
+
+class _Waiter:
+    def __init__(self, loop=None):
+        self.granted = False
+        self.cancelled = False
+        self.event = threading.Event()
+        self.loop = loop
+        self.future = loop.create_future() if loop else None
+
+    def grant(self):
+        """Return False kalau penunggu sudah tidak bisa dibangunkan (event loop-nya mati)."""
+        if self.future is not None:
+            try:
+                self.loop.call_soon_threadsafe(self._resolve)
+            except RuntimeError:
+                return False
+        self.granted = True
+        self.event.set()
+        return True
+
+    def _resolve(self):
+        if not self.future.done():
+            self.future.set_result(None)
+
+def _percentiles(samples):
+    if not samples:
+        return {"p50": None, "p95": None, "max": None}
+    ordered = sorted(samples)
+    pick = lambda q: round(ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000, 1)
+    return {"p50": pick(0.5), "p95": pick(0.95), "max": round(ordered[-1] * 1000, 1)}
+
+class LLMMetrics:
+    """
+    Counter + sampel terakhir (waktu antri & waktu layanan) per jenis panggilan
+    (vision, menu, expiry, chat, ...).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._kinds = {}
+
+    def _kind(self, kind):
+        stats = self._kinds.get(kind)
+        if stats is None:
+            stats = self._kinds[kind] = {
+                "requests": 0, "errors": 0, "shed": 0, "retries": 0,
+                "queue_wait": deque(maxlen=METRICS_SAMPLES),
+                "service": deque(maxlen=METRICS_SAMPLES),
+            }
+        return stats
+
+    def admitted(self, kind, wait_seconds):
+        with self._lock:
+            stats = self._kind(kind)
+            stats["requests"] += 1
+            stats["queue_wait"].append(wait_seconds)
+
+    def finished(self, kind, service_seconds, ok):
+        with self._lock:
+            stats = self._kind(kind)
+            stats["service"].append(service_seconds)
+            if not ok:
+                stats["errors"] += 1
+
+    def shed(self, kind):
+        with self._lock:
+            self._kind(kind)["shed"] += 1
+
+    def retried(self, kind):
+        with self._lock:
+            self._kind(kind)["retries"] += 1
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                kind: {
+                    "requests": stats["requests"],
+                    "errors": stats["errors"],
+                    "shed": stats["shed"],
+                    "retries": stats["retries"],
+                    "queue_wait_ms": _percentiles(stats["queue_wait"]),
+                    "service_ms": _percentiles(stats["service"]),
+                }
+                for kind, stats in self._kinds.items()
+            }
+
+def retry_after_seconds(error):
+    """Baca header Retry-After / retry-after-ms dari error provider (detik), None kalau tidak ada."""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    try:
+        if headers.get("retry-after-ms"):
+            return max(0.0, float(headers["retry-after-ms"]) / 1000)
+        value = headers.get("retry-after")
+        if not value:
+            return None
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            # Format HTTP-date: "Wed, 21 Oct 2026 07:28:00 GMT"
+            return max(0.0, (parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return None
+
+def is_retryable(error):
+    if isinstance(error, openai.APIConnectionError):  # termasuk timeout
+        return True
+    if isinstance(error, openai.APIStatusError):
+        return error.status_code in (408, 409, 429) or error.status_code >= 500
+    return False
+
+def backoff_seconds(attempt, error=None, base=None):
+    """Jeda sebelum percobaan ke-(attempt+1): Retry-After (+ jitter kecil) atau full jitter."""
+    base = LLM_RETRY_BASE_SECONDS if base is None else base
+    retry_after = retry_after_seconds(error) if error is not None else None
+    if retry_after is not None:
+        return retry_after + random.uniform(0, base)
+    return random.uniform(0, min(LLM_RETRY_MAX_WAIT_SECONDS, base * (2 ** attempt)))
+
+class AdmissionController:
+    """
+    Semaphore berprioritas yang bisa dipakai bersama dari thread & event loop.
+    Slot dipegang selama panggilan + retry-nya (provider yang kewalahan
+    otomatis mengurangi laju request baru).
+    """
+
+    def __init__(self, max_concurrency=LLM_MAX_CONCURRENCY, max_queue=LLM_MAX_QUEUE,
+                 max_queue_background=LLM_MAX_QUEUE_BACKGROUND, queue_timeout=LLM_QUEUE_TIMEOUT_SECONDS):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.max_queue_background = max_queue_background
+        self.queue_timeout = queue_timeout
+        self.metrics = LLMMetrics()
+        self._lock = threading.Lock()
+        self._active = 0
+        self._waiting = 0
+        self._queue = []  # heap (priority, urutan, waiter)
+        self._order = itertools.count()
+
+    def _enter(self, priority, kind, loop=None):
+        """Return: None kalau langsung dapat slot, atau _Waiter yang harus ditunggu."""
+        with self._lock:
+            if self._active < self.max_concurrency and not self._waiting:
+                self._active += 1
+                return None
+            limit = self.max_queue_background if priority >= PRIORITY_BACKGROUND else self.max_queue
+            if self._waiting >= limit:
+                self.metrics.shed(kind)
+                raise LLMOverloadedError(f"Antrian AI penuh ({self._waiting} menunggu), coba lagi sebentar lagi")
+            waiter = _Waiter(loop)
+            heapq.heappush(self._queue, (priority, next(self._order), waiter))
+            self._waiting += 1
+            return waiter
+
+    def _abandon(self, waiter, kind):
+        """Penunggu menyerah (timeout / dibatalkan). Return True kalau ternyata slot sudah diberikan."""
+        with self._lock:
+            if waiter.granted:
+                return True
+            waiter.cancelled = True
+            self._waiting -= 1
+            return False
+
+    def release(self):
+        with self._lock:
+            # Slot langsung dioper ke penunggu prioritas tertinggi
+            while self._queue:
+                _, _, waiter = heapq.heappop(self._queue)
+                if waiter.cancelled:
+                    continue
+                self._waiting -= 1
+                if waiter.grant():
+                    return
+            self._active -= 1
+
+    def acquire(self, priority=PRIORITY_INTERACTIVE, kind="other"):
+        start = time.perf_counter()
+        waiter = self._enter(priority, kind)
+        if waiter is not None and not waiter.event.wait(self.queue_timeout):
+            if not self._abandon(waiter, kind):
+                self.metrics.shed(kind)
+                raise LLMOverloadedError(f"Menunggu antrian AI lebih dari {self.queue_timeout:.0f} detik")
+        self.metrics.admitted(kind, time.perf_counter() - start)
+
+    async def acquire_async(self, priority=PRIORITY_INTERACTIVE, kind="other"):
+        start = time.perf_counter()
+        waiter = self._enter(priority, kind, loop=asyncio.get_running_loop())
+        if waiter is not None:
+            try:
+                await asyncio.wait_for(asyncio.shield(waiter.future), self.queue_timeout)
+            except asyncio.TimeoutError:
+                if not self._abandon(waiter, kind):
+                    self.metrics.shed(kind)
+                    raise LLMOverloadedError(f"Menunggu antrian AI lebih dari {self.queue_timeout:.0f} detik")
+            except asyncio.CancelledError:
+                # Client putus saat antri: slot yang terlanjur diberikan dikembalikan
+                if self._abandon(waiter, kind):
+                    self.release()
+                raise
+        self.metrics.admitted(kind, time.perf_counter() - start)
+
+    def call(self, fn, priority=PRIORITY_INTERACTIVE, kind="other", admitted=False):
+        """
+        Jalankan fn() (panggilan provider, sync) di dalam slot, dengan retry.
+        admitted=True -> pemanggil sudah memegang slot (dan yang melepasnya).
+        """
+        if not admitted:
+            self.acquire(priority, kind)
+        try:
+            attempt = 0
+            while True:
+                start = time.perf_counter()
+                try:
+                    result = fn()
+                except Exception as e:
+                    self.metrics.finished(kind, time.perf_counter() - start, ok=False)
+                    delay = self._retry_delay(e, attempt, kind)
+                    if delay is None:
+                        raise
+                    time.sleep(delay)
+                    attempt += 1
+                    continue
+                self.metrics.finished(kind, time.perf_counter() - start, ok=True)
+                return result
+        finally:
+            if not admitted:
+                self.release()
+
+    async def call_async(self, fn, priority=PRIORITY_INTERACTIVE, kind="other", admitted=False):
+        """Versi async call(): fn() mengembalikan coroutine."""
+        if not admitted:
+            await self.acquire_async(priority, kind)
+        try:
+            attempt = 0
+            while True:
+                start = time.perf_counter()
+                try:
+                    result = await fn()
+                except Exception as e:
+                    self.metrics.finished(kind, time.perf_counter() - start, ok=False)
+                    delay = self._retry_delay(e, attempt, kind)
+                    if delay is None:
+                        raise
+                    await asyncio.sleep(delay)
+                    attempt += 1
+                    continue
+                self.metrics.finished(kind, time.perf_counter() - start, ok=True)
+                return result
+        finally:
+            if not admitted:
+                self.release()
+
+    def _retry_delay(self, error, attempt, kind):
+        if attempt >= LLM_MAX_RETRIES or not is_retryable(error):
+            return None
+        delay = backoff_seconds(attempt, error)
+        if delay > LLM_RETRY_MAX_WAIT_SECONDS:
+            print(f"⚠️ Provider AI minta tunggu {delay:.0f} detik, request dihentikan")
+            return None
+        self.metrics.retried(kind)
+        print(f"🔁 Retry AI ({kind}) ke-{attempt + 1} dalam {delay:.2f} detik: {type(error).__name__}")
+        return delay
+
+    def stats(self):
+        with self._lock:
+            state = {
+                "active": self._active,
+                "waiting": self._waiting,
+                "max_concurrency": self.max_concurrency,
+                "max_queue": self.max_queue,
+                "max_queue_background": self.max_queue_background,
+            }
+        return {**state, "kinds": self.metrics.snapshot()}
+
+llm_admission = AdmissionController()
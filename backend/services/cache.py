@@ -0,0 +1,132 @@
+import copy
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+# --- CACHE HASIL AI (MEMORI + DISK OPSIONAL) ---
+# Tier 1: LRU di memori (per proses). Tier 2: file JSON per key di folder
+# cache, supaya hasil tetap ada setelah restart / dibagi antar worker.
+
+def content_hash(*parts) -> str:
+    """
+    SHA-256 dari gabungan beberapa bagian (bytes / str).
+    Dipakai sebagai key cache: gambar + versi prompt + model, dst.
+    """
+    digest = hashlib.sha256()
+    for part in parts:
+        if part is None:
+            part = b""
+        elif isinstance(part, str):
+            part = part.encode("utf-8")
+        digest.update(hashlib.sha256(part).digest())
+    return digest.hexdigest()
+
+class ResultCache:
+    """
+    Cache hasil (dict/list yang bisa di-JSON) dengan eviction LRU.
+    disk_dir=None -> hanya memori.
+    ttl_seconds=None -> tidak kadaluarsa; selain itu entri lebih tua dari TTL
+    dianggap miss (umur file di disk dihitung dari mtime).
+    """
+
+    def __init__(self, name, max_entries=256, disk_dir=None, ttl_seconds=None):
+        self.name = name
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.disk_dir = Path(disk_dir) / name if disk_dir else None
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _disk_path(self, key):
+        # Dibagi per 2 karakter awal biar satu folder tidak berisi ribuan file
+        return self.disk_dir / key[:2] / f"{key}.json"
+
+    def _expired(self, stored_at):
+        return self.ttl_seconds is not None and time.time() - stored_at > self.ttl_seconds
+
+    def _remember(self, key, value, stored_at):
+        self._entries[key] = (value, stored_at)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def get(self, key):
+        """
+        Return salinan nilai yang tersimpan, atau None kalau tidak ada.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if not self._expired(entry[1]):
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return copy.deepcopy(entry[0])
+                del self._entries[key]
+
+        value, stored_at = self._read_disk(key)
+        with self._lock:
+            if value is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._remember(key, value, stored_at)
+        return copy.deepcopy(value)
+
+    def set(self, key, value):
+        value = copy.deepcopy(value)
+        with self._lock:
+            self._remember(key, value, time.time())
+        self._write_disk(key, value)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        return {
+            "name": self.name,
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "ttl_seconds": self.ttl_seconds,
+            "disk": str(self.disk_dir) if self.disk_dir else None,
+        }
+
+    def _read_disk(self, key):
+        """Return: (nilai, waktu simpan) atau (None, None) kalau tidak ada / sudah kadaluarsa."""
+        if self.disk_dir is None:
+            return None, None
+        try:
+            with open(self._disk_path(key), encoding="utf-8") as f:
+                stored_at = os.fstat(f.fileno()).st_mtime
+                if self._expired(stored_at):
+                    return None, None
+                return json.load(f), stored_at
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None, None
+        except OSError as e:
+            print(f"⚠️ Gagal baca cache {self.name}: {e}")
+            return None, None
+
+    def _write_disk(self, key, value):
+        if self.disk_dir is None:
+            return
+        path = self._disk_path(key)
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            # Tulis ke file sementara lalu rename (atomic) biar file tidak korup
+            tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(value, f, ensure_ascii=False)
+            os.replace(tmp_path, path)
+        except (OSError, TypeError, ValueError) as e:
+            print(f"⚠️ Gagal simpan cache {self.name}: {e}")
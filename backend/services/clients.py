@@ -1,14 +1,46 @@
 import os
 from pathlib import Path
+import httpx
 from dotenv import load_dotenv
-from openai import OpenAI
+from openai import OpenAI, AsyncOpenAI
 from database import supabase
 
 # Explicitly load .env from the backend directory (parent of services)
 load_dotenv(Path(__file__).parent.parent / ".env")
 
+# --- POOL KONEKSI KE KOLOSAL ---
+# Koneksi HTTP dipakai ulang (keep-alive) supaya tiap panggilan AI tidak
+# bayar handshake TLS lagi. Batas koneksi = batas request AI yang in-flight.
+KOLOSAL_MAX_CONNECTIONS = int(os.getenv("KOLOSAL_MAX_CONNECTIONS", "100"))
+KOLOSAL_MAX_KEEPALIVE = int(os.getenv("KOLOSAL_MAX_KEEPALIVE", "20"))
+KOLOSAL_KEEPALIVE_SECONDS = float(os.getenv("KOLOSAL_KEEPALIVE_SECONDS", "60"))
+KOLOSAL_TIMEOUT_SECONDS = float(os.getenv("KOLOSAL_TIMEOUT_SECONDS", "120"))
+
+def _kolosal_limits():
+    return httpx.Limits(
+        max_connections=KOLOSAL_MAX_CONNECTIONS,
+        max_keepalive_connections=KOLOSAL_MAX_KEEPALIVE,
+        keepalive_expiry=KOLOSAL_KEEPALIVE_SECONDS
+    )
+
+def _kolosal_timeout():
+    return httpx.Timeout(KOLOSAL_TIMEOUT_SECONDS, connect=10.0)
+
 # --- SETUP CLIENTS ---
+# max_retries=0: retry (backoff + Retry-After) diatur services/admission.py,
+# supaya tidak dobel dengan retry bawaan SDK
+# Sync: dipakai script & job background (notifikasi, check_models.py)
 kolosal_client = OpenAI(
     api_key=os.getenv("KOLOSAL_API_KEY"),
-    base_url=os.getenv("KOLOSAL_BASE_URL")
+    base_url=os.getenv("KOLOSAL_BASE_URL"),
+    max_retries=0,
+    http_client=httpx.Client(limits=_kolosal_limits(), timeout=_kolosal_timeout())
+)
+
+# Async: dipakai endpoint FastAPI (tidak makan slot threadpool selama menunggu AI)
+kolosal_async_client = AsyncOpenAI(
+    api_key=os.getenv("KOLOSAL_API_KEY"),
+    base_url=os.getenv("KOLOSAL_BASE_URL"),
+    max_retries=0,
+    http_client=httpx.AsyncClient(limits=_kolosal_limits(), timeout=_kolosal_timeout())
 )
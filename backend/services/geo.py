@@ -0,0 +1,46 @@
+import math
+import numpy as np
+
+EARTH_RADIUS_KM = 6371  # Radius bumi dalam km
+KM_PER_DEGREE = EARTH_RADIUS_KM * math.pi / 180  # ~111.19 km per derajat lintang
+
+def haversine_distance(lat1, lon1, lat2, lon2):
+    """
+    Hitung jarak antara dua titik koordinat (km)
+    """
+    dlat = math.radians(lat2 - lat1)
+    dlon = math.radians(lon2 - lon1)
+    a = math.sin(dlat / 2) * math.sin(dlat / 2) + math.cos(math.radians(lat1)) \
+        * math.cos(math.radians(lat2)) * math.sin(dlon / 2) * math.sin(dlon / 2)
+    c = 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
+    return EARTH_RADIUS_KM * c
+
+def haversine_batch(lat, lon, lats, lons):
+    """
+    Versi vektor (NumPy) dari haversine_distance.
+    Hitung jarak dari SATU titik asal ke banyak titik sekaligus (km).
+    Return: np.ndarray dengan panjang sama seperti `lats`.
+    """
+    lats = np.radians(np.asarray(lats, dtype=np.float64))
+    lons = np.radians(np.asarray(lons, dtype=np.float64))
+    lat0 = math.radians(lat)
+    lon0 = math.radians(lon)
+
+    sin_dlat = np.sin((lats - lat0) / 2)
+    sin_dlon = np.sin((lons - lon0) / 2)
+    a = sin_dlat * sin_dlat + math.cos(lat0) * np.cos(lats) * sin_dlon * sin_dlon
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+def haversine_matrix(lats, lons):
+    """
+    Matriks jarak semua-ke-semua (km) untuk daftar titik, dihitung sekaligus.
+    Return: np.ndarray ukuran (n, n).
+    """
+    lats = np.radians(np.asarray(lats, dtype=np.float64))
+    lons = np.radians(np.asarray(lons, dtype=np.float64))
+
+    sin_dlat = np.sin((lats[:, None] - lats[None, :]) / 2)
+    sin_dlon = np.sin((lons[:, None] - lons[None, :]) / 2)
+    cos_lat = np.cos(lats)
+    a = sin_dlat * sin_dlat + cos_lat[:, None] * cos_lat[None, :] * sin_dlon * sin_dlon
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
@@ -0,0 +1,175 @@
+import atexit
+import json
+import os
+import re
+import threading
+from pathlib import Path
+from .clients import supabase
+
+# Gazetteer lokal: centroid kota/kecamatan/kelurahan DKI Jakarta
+GAZETTEER_PATH = Path(__file__).parent.parent / "data" / "jakarta_gazetteer.json"
+# Cache persisten hasil geocoding (alamat ter-normalisasi -> koordinat)
+GEOCODE_CACHE_PATH = Path(os.getenv(
+    "GEOCODE_CACHE_PATH",
+    str(Path(__file__).parent.parent / ".cache" / "geocode_cache.json")
+))
+
+# Makin spesifik wilayahnya, makin diprioritaskan
+LEVEL_PRIORITY = {"kelurahan": 3, "kecamatan": 2, "kota": 1}
+BACKFILL_PAGE_SIZE = 1000  # Batas default PostgREST per request
+# Entri cache baru ditulis ke disk paling cepat sekali per interval ini (debounce)
+GEOCODE_CACHE_FLUSH_SECONDS = float(os.getenv("GEOCODE_CACHE_FLUSH_SECONDS", "5"))
+
+# Singkatan umum di alamat yang diisi vendor
+_ABBREVIATIONS = {
+    "jkt": "jakarta",
+    "jak": "jakarta",
+    "jl": "",
+    "jln": "",
+    "kec": "",
+    "kel": "",
+    "kecamatan": "",
+    "kelurahan": "",
+}
+
+_LOCK = threading.Lock()
+_WRITE_LOCK = threading.Lock()  # satu penulis file cache sekaligus
+_STATE = {"gazetteer": None, "cache": None, "dirty": False, "timer": None}
+
+def normalize_address(text) -> str:
+    """
+    Normalisasi alamat: huruf kecil, tanpa tanda baca, singkatan dibuang/diperluas.
+    Contoh: "Jl. Kebon Kacang, Kec. Tanah Abang, JKT Pusat" -> "kebon kacang tanah abang jakarta pusat"
+    """
+    if not text:
+        return ""
+    tokens = re.sub(r"[^a-z0-9]+", " ", str(text).lower()).split()
+    tokens = [_ABBREVIATIONS.get(t, t) for t in tokens]
+    return " ".join(t for t in tokens if t)
+
+def _load_gazetteer():
+    if _STATE["gazetteer"] is None:
+        with open(GAZETTEER_PATH, encoding="utf-8") as f:
+            data = json.load(f)
+        patterns = []
+        for entry in data["entries"]:
+            for name in [entry["name"], *entry.get("aliases", [])]:
+                patterns.append((normalize_address(name), entry))
+        # Cocokkan yang paling spesifik dulu, lalu nama terpanjang
+        patterns.sort(key=lambda p: (-LEVEL_PRIORITY.get(p[1]["level"], 0), -len(p[0])))
+        _STATE["gazetteer"] = {"default": data["default"], "patterns": patterns}
+    return _STATE["gazetteer"]
+
+def _load_cache():
+    if _STATE["cache"] is None:
+        try:
+            with open(GEOCODE_CACHE_PATH, encoding="utf-8") as f:
+                _STATE["cache"] = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            _STATE["cache"] = {}
+    return _STATE["cache"]
+
+def _save_cache(cache):
+    # Tulis ke file sementara lalu rename (atomic) biar file tidak korup
+    GEOCODE_CACHE_PATH.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = GEOCODE_CACHE_PATH.with_suffix(".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(cache, f, ensure_ascii=False, sort_keys=True)
+    os.replace(tmp_path, GEOCODE_CACHE_PATH)
+
+def flush_geocode_cache():
+    """
+    Tulis cache ke disk kalau ada entri baru. Dipanggil timer debounce,
+    setelah rebuild index / backfill, dan saat proses keluar.
+    """
+    with _WRITE_LOCK:
+        with _LOCK:
+            _STATE["timer"] = None
+            if not _STATE["dirty"]:
+                return
+            snapshot = dict(_STATE["cache"])
+            _STATE["dirty"] = False
+        # I/O di luar _LOCK: geocode_address tetap jalan selama file ditulis
+        try:
+            _save_cache(snapshot)
+        except OSError as e:
+            print(f"⚠️ Gagal simpan geocode cache: {e}")
+            with _LOCK:
+                _STATE["dirty"] = True
+
+def _schedule_flush():
+    # Dipanggil dengan _LOCK dipegang
+    _STATE["dirty"] = True
+    if _STATE["timer"] is None:
+        timer = threading.Timer(GEOCODE_CACHE_FLUSH_SECONDS, flush_geocode_cache)
+        timer.daemon = True
+        _STATE["timer"] = timer
+        timer.start()
+
+atexit.register(flush_geocode_cache)
+
+def _resolve(normalized: str) -> dict:
+    gazetteer = _load_gazetteer()
+    padded = f" {normalized} "
+    for pattern, entry in gazetteer["patterns"]:
+        if pattern and f" {pattern} " in padded:
+            return {"lat": entry["lat"], "lon": entry["lon"], "level": entry["level"], "match": entry["name"]}
+
+    default = gazetteer["default"]
+    return {"lat": default["lat"], "lon": default["lon"], "level": "default", "match": default["name"]}
+
+def geocode_address(address) -> dict:
+    """
+    Alamat -> koordinat (deterministik). Hasil disimpan di cache persisten,
+    jadi alamat yang sama selalu dapat titik yang sama. Entri baru ditulis ke
+    disk secara berkala (GEOCODE_CACHE_FLUSH_SECONDS), bukan per panggilan.
+    Return: {"lat", "lon", "level", "match"}
+    """
+    normalized = normalize_address(address)
+    with _LOCK:
+        cache = _load_cache()
+        result = cache.get(normalized)
+        if result is None:
+            result = _resolve(normalized)
+            cache[normalized] = result
+            _schedule_flush()
+        return result
+
+def backfill_missing_coordinates(table: str = "supplies", address_field: str = "location", dry_run: bool = False):
+    """
+    Isi latitude/longitude yang masih kosong memakai geocode_address (sekali jalan).
+    Baris dikelompokkan per koordinat hasil geocoding supaya update-nya sedikit.
+    """
+    # Baca semua halaman dulu baru update: baris yang sudah di-update keluar dari
+    # filter "latitude is null", jadi offset halaman akan bergeser kalau dicampur
+    rows = []
+    start = 0
+    while True:
+        batch = supabase.table(table)\
+            .select(f"id, {address_field}")\
+            .is_("latitude", "null")\
+            .order("id")\
+            .range(start, start + BACKFILL_PAGE_SIZE - 1)\
+            .execute().data or []
+        rows.extend(batch)
+        if len(batch) < BACKFILL_PAGE_SIZE:
+            break
+        start += BACKFILL_PAGE_SIZE
+
+    groups = {}
+    for row in rows:
+        point = geocode_address(row.get(address_field))
+        groups.setdefault((point["lat"], point["lon"]), []).append(row["id"])
+    flush_geocode_cache()
+
+    print(f"📍 {table}: {len(rows)} baris tanpa GPS -> {len(groups)} titik")
+    if not dry_run:
+        for (lat, lon), ids in groups.items():
+            # in_() dipecah supaya URL request tidak kepanjangan
+            for i in range(0, len(ids), BACKFILL_PAGE_SIZE):
+                supabase.table(table)\
+                    .update({"latitude": lat, "longitude": lon})\
+                    .in_("id", ids[i:i + BACKFILL_PAGE_SIZE])\
+                    .execute()
+
+    return {"table": table, "rows": len(rows), "points": len(groups)}
@@ -1,11 +1,9 @@
 from datetime import datetime, timedelta
 from database import supabase
-from .logistics import haversine_distance
+from .proximity import nearest_sppg_table
+from .admission import PRIORITY_BACKGROUND
 from .kitchen import generate_menu_recommendation
 
-# Global Cache untuk Resep Penyelamatan (Reset saat restart server)
-_RESCUE_MENU_CACHE = {"hash": "", "menu": None}
-
 def calculate_expiry_date(days: int) -> str:
     """
     Menghitung tanggal kadaluarsa berdasarkan jumlah hari dari sekarang.
@@ -44,20 +42,21 @@ def check_expiry_and_notify():
             vendor_groups[uid] = []
         vendor_groups[uid].append(item)
         
-    # Lokasi SPPG (Monas - Jakarta Pusat)
-    sppg_lat = -6.175392
-    sppg_long = 106.827153
-    
+    # 1. Ambil Data User (Vendor) dari Database sekaligus (satu query)
+    vendor_users = {}
+    try:
+        if vendor_groups:
+            users_res = supabase.table("users")\
+                .select("id, full_name, phone_number, latitude, longitude")\
+                .in_("id", list(vendor_groups.keys()))\
+                .execute()
+            vendor_users = {u['id']: u for u in (users_res.data or [])}
+    except Exception as e:
+        print(f"⚠️ Gagal ambil data user vendor: {e}")
+
     # Loop setiap Vendor untuk kirim notifikasi personal
     for uid, items in vendor_groups.items():
-        # 1. Ambil Data User (Vendor) dari Database
-        try:
-            user_res = supabase.table("users").select("full_name, phone_number, latitude, longitude").eq("id", uid).single().execute()
-            vendor_user = user_res.data
-        except Exception as e:
-            print(f"⚠️ Gagal ambil data user {uid}: {e}")
-            continue
-
+        vendor_user = vendor_users.get(uid)
         if not vendor_user:
             continue
 
@@ -66,14 +65,15 @@ def check_expiry_and_notify():
         phone = vendor_user.get('phone_number', '-')
         item_names = ", ".join([f"{i['item_name']} ({i['quantity']} {i['unit']})" for i in items])
         
-        # Hitung jarak vendor ke SPPG (Jika vendor punya GPS)
+        # SPPG terdekat dari vendor (Jika vendor punya GPS): lookup tabel jarak precomputed
         v_lat = vendor_user.get('latitude')
         v_long = vendor_user.get('longitude')
-        
+        nearest = nearest_sppg_table.lookup_vendor(uid, v_lat, v_long, 1) if v_lat and v_long else []
+
         dist_info = ""
-        if v_lat and v_long:
-            dist = haversine_distance(v_lat, v_long, sppg_lat, sppg_long)
-            dist_info = f"Lokasi SPPG terdekat berjarak {dist:.1f} km dari titik Anda."
+        if nearest:
+            sppg = nearest[0]
+            dist_info = f"Lokasi SPPG terdekat ({sppg['name']}) berjarak {sppg['distance_km']:.1f} km dari titik Anda."
         else:
             dist_info = "Segera tawarkan ke SPPG terdekat."
             
@@ -104,33 +104,20 @@ def check_expiry_and_notify():
             "rescue_menu": None
         }
 
-    items_hash = ",".join(all_expiring_names)
-    
-    global _RESCUE_MENU_CACHE
+    # Minta AI buatkan resep penyelamatan. Hasilnya di-cache per himpunan bahan
+    # (kitchen.menu_cache), jadi cron yang jalan lagi dengan stok sama tidak tanya AI lagi.
+    rescue_menu_data = generate_menu_recommendation(all_expiring_names, priority=PRIORITY_BACKGROUND)
     
-    # Cek Cache: Jika daftar bahannya sama persis, jangan tanya AI lagi (Hemat Biaya)
-    if _RESCUE_MENU_CACHE["hash"] == items_hash and _RESCUE_MENU_CACHE["menu"]:
-        print("⚡ Using Cached Rescue Menu (Saving AI Tokens)")
-        rescue_menu = _RESCUE_MENU_CACHE["menu"]
+    # Normalisasi struktur data dari AI (kadang return list, kadang dict)
+    if isinstance(rescue_menu_data, dict) and rescue_menu_data.get("recommendations"):
+         rescue_menu = rescue_menu_data["recommendations"][0]
+    elif isinstance(rescue_menu_data, list) and len(rescue_menu_data) > 0:
+        rescue_menu = rescue_menu_data[0]
+    elif isinstance(rescue_menu_data, dict) and "menu_name" in rescue_menu_data:
+         rescue_menu = rescue_menu_data
     else:
-        print("🤖 Generating New Rescue Menu via AI...")
-        # Minta AI buatkan resep penyelamatan
-        rescue_menu_data = generate_menu_recommendation(all_expiring_names)
-        
-        # Normalisasi struktur data dari AI (kadang return list, kadang dict)
-        if isinstance(rescue_menu_data, dict) and "recommendations" in rescue_menu_data:
-             rescue_menu = rescue_menu_data["recommendations"][0]
-        elif isinstance(rescue_menu_data, list) and len(rescue_menu_data) > 0:
-            rescue_menu = rescue_menu_data[0]
-        elif isinstance(rescue_menu_data, dict) and "menu_name" in rescue_menu_data:
-             rescue_menu = rescue_menu_data
-        else:
-            print(f"⚠️ Invalid Rescue Menu Data: {rescue_menu_data}")
-            rescue_menu = None
-            
-        # Simpan ke cache
-        if rescue_menu:
-            _RESCUE_MENU_CACHE = {"hash": items_hash, "menu": rescue_menu}
+        print(f"⚠️ Invalid Rescue Menu Data: {rescue_menu_data}")
+        rescue_menu = None
     
     if rescue_menu:
         menu_name = rescue_menu.get("menu_name", "Tumis Campur Darurat")
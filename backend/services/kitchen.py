@@ -1,88 +1,359 @@
-import json
+import asyncio
+import copy
+import os
+import threading
+from collections import Counter
 from datetime import datetime, timedelta
-from .clients import kolosal_client, supabase
-from .logistics import haversine_distance
+from .cache import ResultCache, content_hash
+from .clients import supabase
+from .logistics import unindex_supplies, relevant_suppliers, nearest_supplies
+from .market_snapshot import market_snapshot
+from .shelf_life import shelf_life_store, menu_key
+from .admission import PRIORITY_INTERACTIVE, PRIORITY_BACKGROUND
+from .llm import complete, complete_async, stream_async
+from .llm_json import JsonStreamExtractor, LLMOutputError, extract_json, validate_output
+from .text_search import normalize_ingredient
+from models import AIMenuRecipe, AIMealSafety
 from prompts import (
     get_menu_recommendation_prompt,
     get_meal_expiry_prompt
 )
 
-def generate_menu_recommendation(ingredients_list):
+MENU_MODEL = "Claude Sonnet 4.5"
+
+# --- CACHE REKOMENDASI MENU ---
+# Dipakai bersama oleh /api/recommend-menu dan resep penyelamatan di cron expiry.
+# Key = himpunan bahan ter-normalisasi, jadi ["Cabe", "bayam", "Bayam"] dan
+# ["Bayam", "Cabai"] dapat menu yang sama. MENU_CACHE_DIR diisi -> tahan restart.
+MENU_CACHE_MAX_ENTRIES = int(os.getenv("MENU_CACHE_MAX_ENTRIES", "128"))
+MENU_CACHE_TTL_SECONDS = float(os.getenv("MENU_CACHE_TTL_SECONDS", str(6 * 3600)))
+MENU_CACHE_DIR = os.getenv("MENU_CACHE_DIR") or None
+
+menu_cache = ResultCache(
+    "menu", max_entries=MENU_CACHE_MAX_ENTRIES, disk_dir=MENU_CACHE_DIR, ttl_seconds=MENU_CACHE_TTL_SECONDS
+)
+
+def canonical_ingredients(ingredients_list):
+    """
+    Bahan di-normalisasi (huruf kecil, sinonim -> nama baku), dibuang duplikat
+    & diurutkan: ["Cabe", "bayam", "Bayam"] -> ["bayam", "cabai"].
     """
-    Fungsi untuk minta ide menu ke Claude berdasarkan stok
+    return sorted({normalize_ingredient(name) for name in ingredients_list} - {""})
+
+def menu_cache_key(ingredients_list) -> str:
+    """
+    Key cache menu dari canonical_ingredients. Template prompt + model ikut
+    di-hash supaya cache otomatis basi kalau prompt diubah.
+    """
+    names = canonical_ingredients(ingredients_list)
+    return content_hash(get_menu_recommendation_prompt(""), MENU_MODEL, "\n".join(names))
+
+def _cached_menu(ingredients_list):
+    """Return: (key, hasil cache atau None)."""
+    key = menu_cache_key(ingredients_list)
+    cached = menu_cache.get(key)
+    if cached is not None:
+        print(f"⚡ Menu cache hit untuk: {ingredients_list}")
+    return key, cached
+
+def _remember_menu(key, result):
+    # Jangan simpan error / output AI yang gagal di-parse
+    if not (isinstance(result, dict) and "error" in result):
+        menu_cache.set(key, result)
+
+def _market_prefix():
     """
+    Snapshot katalog pasar (services/market_snapshot.py) untuk awal prompt.
+    String kosong kalau katalog tidak bisa dibaca, AI tetap jalan tanpa data pasar.
+    """
+    try:
+        text, _ = market_snapshot.get()
+        return text
+    except Exception as e:
+        print(f"⚠️ Snapshot pasar tidak tersedia: {e}")
+        return ""
+
+def _menu_request(ingredients_list):
     print(f"👨‍🍳 Mengirim request menu ke Claude untuk: {ingredients_list}")
     
-    ingredients_text = ", ".join(ingredients_list)
+    # Teks bahan dibuat kanonik: himpunan bahan yang sama -> prompt yang sama persis,
+    # jadi request bersamaan bisa digabung (services/llm.py) dan hasilnya konsisten dengan cache
+    ingredients_text = ", ".join(name.title() for name in canonical_ingredients(ingredients_list))
     
-    # Prompt Menu
+    # Prompt Menu. Snapshot pasar jadi awalan (sama dengan chat chef) supaya
+    # bisa kena prompt caching provider; tidak ikut key menu_cache.
     prompt = get_menu_recommendation_prompt(ingredients_text)
-    
+    messages = [{"role": "user", "content": prompt}]
+    market_prefix = _market_prefix()
+    if market_prefix:
+        messages.insert(0, {"role": "system", "content": market_prefix})
+    return dict(
+        model=MENU_MODEL,
+        messages=messages,
+        max_tokens=1500
+    )
+
+def _menu_result(response):
+    return _parse_menu_content(response.choices[0].message.content)
+
+def _parse_menu_content(content):
+    print(f"🤖 Raw AI Response: {content}") # Debug print
     try:
-        response = kolosal_client.chat.completions.create(
-            model="Claude Sonnet 4.5",
-            messages=[{"role": "user", "content": prompt}],
-            max_tokens=1500
-        )
-        
-        content = response.choices[0].message.content
-        print(f"🤖 Raw AI Response: {content}") # Debug print
-        
-        # Robust JSON Extraction
-        import re
-        json_match = re.search(r'\{.*\}|\[.*\]', content, re.DOTALL)
-        if json_match:
-            cleaned_content = json_match.group(0)
-            return json.loads(cleaned_content)
-        else:
-            # Fallback if no JSON found
-            return {"error": "AI did not return valid JSON", "raw": content}
-        
+        return _validate_menu(extract_json(content))
+    except LLMOutputError as e:
+        print(f"⚠️ {e}")
+        return {"error": "AI did not return valid JSON", "raw": content}
+
+def _valid_recipes(recipes):
+    # Resep yang tidak sesuai format dibuang satu-satu, sisanya tetap dipakai
+    valid = []
+    for recipe in recipes:
+        try:
+            valid.append(validate_output(recipe, AIMenuRecipe))
+        except LLMOutputError as e:
+            print(f"⚠️ Resep dibuang: {e}")
+    return valid
+
+def _validate_menu(data):
+    """
+    Bentuk output dibiarkan seperti dari AI ({"recommendations": [...]}, list resep,
+    atau satu resep), tapi tiap resep divalidasi dengan AIMenuRecipe.
+    """
+    if isinstance(data, list):
+        recipes = _valid_recipes(data)
+        if not recipes:
+            raise LLMOutputError("Tidak ada resep valid dari AI")
+        return recipes
+    if isinstance(data, dict) and isinstance(data.get("recommendations"), list):
+        recipes = _valid_recipes(data["recommendations"])
+        if not recipes:
+            raise LLMOutputError("Tidak ada resep valid dari AI")
+        return {**data, "recommendations": recipes}
+    return validate_output(data, AIMenuRecipe)
+
+def generate_menu_recommendation(ingredients_list, priority=PRIORITY_INTERACTIVE):
+    """
+    Fungsi untuk minta ide menu ke Claude berdasarkan stok.
+    priority=PRIORITY_BACKGROUND untuk pemanggil non-interaktif (cron expiry).
+    """
+    key, cached = _cached_menu(ingredients_list)
+    if cached is not None:
+        return cached
+    try:
+        response = complete(_menu_request(ingredients_list), priority=priority, kind="menu")
+        result = _menu_result(response)
+        _remember_menu(key, result)
+        return result
     except Exception as e:
         print(f"❌ Error Menu AI: {e}")
         return {"error": f"Gagal membuat menu: {str(e)}"}
 
-def calculate_meal_expiry(menu_name: str) -> dict:
+async def generate_menu_recommendation_async(ingredients_list):
     """
-    Tanya Claude: Analisis umur simpan & Tips penyimpanan.
-    Output: Dictionary lengkap (bukan cuma int).
+    Versi async generate_menu_recommendation (dipakai endpoint FastAPI).
+    """
+    key, cached = _cached_menu(ingredients_list)
+    if cached is not None:
+        return cached
+    try:
+        # _menu_request bisa membangun ulang snapshot pasar (query DB) -> jangan di event loop
+        request = await asyncio.to_thread(_menu_request, ingredients_list)
+        response = await complete_async(request, kind="menu")
+        result = _menu_result(response)
+        _remember_menu(key, result)
+        return result
+    except Exception as e:
+        print(f"❌ Error Menu AI: {e}")
+        return {"error": f"Gagal membuat menu: {str(e)}"}
+
+async def stream_menu_recommendation_async(ingredients_list):
+    """
+    Versi streaming generate_menu_recommendation.
+    Yield tuple (event, data):
+      ("token", str)   -> potongan teks mentah dari Claude
+      ("recipe", dict) -> satu resep yang sudah lengkap (dikirim sebelum JSON selesai)
+      ("done", dict)   -> hasil akhir, sama dengan generate_menu_recommendation
+      ("error", dict)  -> {"error": ...}
     """
+    key, cached = _cached_menu(ingredients_list)
+    if cached is not None:
+        # Cache hit: tidak ada token, langsung kirim resep + hasil akhir
+        recipes = cached.get("recommendations", []) if isinstance(cached, dict) else cached
+        for recipe in recipes if isinstance(recipes, list) else []:
+            yield "recipe", recipe
+        yield "done", cached
+        return
+
+    extractor = JsonStreamExtractor()
+    try:
+        request = await asyncio.to_thread(_menu_request, ingredients_list)
+        async for delta in stream_async(request, kind="menu"):
+            yield "token", delta
+            for recipe in _valid_recipes(extractor.feed(delta)):
+                yield "recipe", recipe
+        content = extractor.text()
+        print(f"🤖 Raw AI Response: {content}")
+        try:
+            result = _validate_menu(extractor.result())
+        except LLMOutputError as e:
+            print(f"⚠️ {e}")
+            result = {"error": "AI did not return valid JSON", "raw": content}
+    except Exception as e:
+        print(f"❌ Error Menu AI (stream): {e}")
+        yield "error", {"error": f"Gagal membuat menu: {str(e)}"}
+        return
+
+    if isinstance(result, dict) and "error" in result:
+        yield "error", result
+    else:
+        _remember_menu(key, result)
+        yield "done", result
+
+# Default fallback yang aman kalau AI gagal
+DEFAULT_MEAL_EXPIRY = {
+    "room_temp_hours": 4,
+    "fridge_hours": 12,
+    "risk_factor": "Unknown",
+    "storage_tips": "Segera konsumsi. Simpan di tempat sejuk dan tertutup.",
+    "nutrition": {"calories": "N/A", "protein": "N/A", "carbs": "N/A", "fats": "N/A"}
+}
+
+def _meal_expiry_request(menu_name):
     print(f"🕒 Analisis Safety Food untuk: {menu_name}")
     
     prompt = get_meal_expiry_prompt(menu_name)
+    return dict(
+        model="Claude Sonnet 4.5",
+        messages=[{"role": "user", "content": prompt}],
+        max_tokens=300,
+        temperature=0.2
+    )
+
+def _meal_expiry_result(response):
+    content = response.choices[0].message.content
+    data = validate_output(extract_json(content), AIMealSafety)
     
+    print(f"✅ Analisis Selesai: {data.get('risk_factor')}")
+    return data
+
+# --- TABEL UMUR SIMPAN (services/shelf_life.py) ---
+# Menu yang pernah dimasak dijawab dari tabel, tanpa menunggu Claude.
+# Saat startup, menu paling sering di meal_productions diisi duluan (0 = matikan).
+MEAL_EXPIRY_WARM_ROWS = int(os.getenv("MEAL_EXPIRY_WARM_ROWS", "1000"))
+MEAL_EXPIRY_WARM_LIMIT = int(os.getenv("MEAL_EXPIRY_WARM_LIMIT", "50"))
+
+_REFRESHING = set()
+_REFRESH_LOCK = threading.Lock()
+
+def _fetch_meal_expiry(menu_name, priority=PRIORITY_INTERACTIVE):
+    # Panggil Claude lalu simpan ke tabel. Error dilempar ke pemanggil (default TIDAK disimpan)
+    response = complete(_meal_expiry_request(menu_name), priority=priority, kind="expiry")
+    data = _meal_expiry_result(response)
+    shelf_life_store.put(menu_name, data)
+    return data
+
+def _refresh_in_background(menu_name):
+    key = menu_key(menu_name)
+    with _REFRESH_LOCK:
+        if key in _REFRESHING:
+            return
+        _REFRESHING.add(key)
+
+    def run():
+        try:
+            _fetch_meal_expiry(menu_name, priority=PRIORITY_BACKGROUND)
+        except Exception as e:
+            print(f"⚠️ Gagal refresh umur simpan {menu_name}: {e}")
+        finally:
+            with _REFRESH_LOCK:
+                _REFRESHING.discard(key)
+
+    threading.Thread(target=run, daemon=True).start()
+
+def _stored_meal_expiry(menu_name):
+    """
+    Ambil analisis dari tabel. Entri basi (lewat TTL) tetap dipakai,
+    sementara versi barunya diminta ke Claude di background.
+    """
+    analysis, fresh = shelf_life_store.get(menu_name)
+    if analysis is not None:
+        print(f"⚡ Umur simpan {menu_name} dari tabel{'' if fresh else ' (basi, refresh di background)'}")
+        if not fresh:
+            _refresh_in_background(menu_name)
+    return analysis
+
+def calculate_meal_expiry(menu_name: str) -> dict:
+    """
+    Tanya Claude: Analisis umur simpan & Tips penyimpanan.
+    Output: Dictionary lengkap (bukan cuma int).
+    """
+    stored = _stored_meal_expiry(menu_name)
+    if stored is not None:
+        return stored
     try:
-        response = kolosal_client.chat.completions.create(
-            model="Claude Sonnet 4.5",
-            messages=[{"role": "user", "content": prompt}],
-            max_tokens=300,
-            temperature=0.2
-        )
-        
-        content = response.choices[0].message.content
-        cleaned_content = content.replace("```json", "").replace("```", "").strip()
-        data = json.loads(cleaned_content)
-        
-        print(f"✅ Analisis Selesai: {data.get('risk_factor')}")
-        return data
+        return _fetch_meal_expiry(menu_name)
+    except Exception as e:
+        print(f"⚠️ Gagal hitung expiry: {e}")
+        return copy.deepcopy(DEFAULT_MEAL_EXPIRY)
 
+async def calculate_meal_expiry_async(menu_name: str) -> dict:
+    """
+    Versi async calculate_meal_expiry.
+    """
+    stored = _stored_meal_expiry(menu_name)
+    if stored is not None:
+        return stored
+    try:
+        response = await complete_async(_meal_expiry_request(menu_name), kind="expiry")
+        data = _meal_expiry_result(response)
+        await asyncio.to_thread(shelf_life_store.put, menu_name, data)
+        return data
     except Exception as e:
         print(f"⚠️ Gagal hitung expiry: {e}")
-        # Default fallback yang aman
-        return {
-            "room_temp_hours": 4,
-            "fridge_hours": 12,
-            "risk_factor": "Unknown",
-            "storage_tips": "Segera konsumsi. Simpan di tempat sejuk dan tertutup.",
-            "nutrition": {"calories": "N/A", "protein": "N/A", "carbs": "N/A", "fats": "N/A"}
-        }
+        return copy.deepcopy(DEFAULT_MEAL_EXPIRY)
 
-def cook_meal(menu_name: str, qty_produced: int, ingredients_ids: list):
+def warm_meal_expiry_store(max_rows=MEAL_EXPIRY_WARM_ROWS, limit=MEAL_EXPIRY_WARM_LIMIT):
     """
-    Catat produksi masakan:
-    1. Kurangi stok bahan baku (deduct stock).
-    2. Estimasi nutrisi menu tersebut pakai AI.
+    Isi tabel umur simpan dari riwayat produksi: menu yang paling sering dimasak
+    (dari `max_rows` baris meal_productions terakhir) dan belum ada / sudah basi
+    di tabel ditanyakan ke Claude satu per satu. Dipanggil di background saat startup.
     """
+    if limit <= 0:
+        return {"menus": 0, "fetched": 0}
+    try:
+        res = supabase.table("meal_productions")\
+            .select("menu_name")\
+            .order("created_at", desc=True)\
+            .limit(max_rows)\
+            .execute()
+    except Exception as e:
+        print(f"⚠️ Gagal ambil riwayat produksi untuk warming: {e}")
+        return {"error": str(e)}
+
+    counts = Counter()
+    display_names = {}
+    for row in res.data or []:
+        key = menu_key(row.get("menu_name"))
+        if key:
+            counts[key] += 1
+            display_names.setdefault(key, row["menu_name"])
+
+    menus = [display_names[key] for key, _ in counts.most_common(limit)]
+    fetched = 0
+    for menu_name in menus:
+        if shelf_life_store.is_fresh(menu_name):
+            continue
+        try:
+            _fetch_meal_expiry(menu_name, priority=PRIORITY_BACKGROUND)
+            fetched += 1
+        except Exception as e:
+            print(f"⚠️ Gagal warming umur simpan {menu_name}: {e}")
+
+    shelf_life_store.flush()
+    print(f"🔥 Tabel umur simpan siap: {len(menus)} menu riwayat, {fetched} baru ditanyakan ke Claude")
+    return {"menus": len(menus), "fetched": fetched}
+
+def _consume_ingredients(menu_name, qty_produced, ingredients_ids):
     print(f"🍳 Memasak {menu_name} ({qty_produced} porsi)...")
     
     # 1. Kurangi Stok (Simulasi: Hapus item dari DB)
@@ -90,15 +361,14 @@ def cook_meal(menu_name: str, qty_produced: int, ingredients_ids: list):
     if ingredients_ids:
         try:
             supabase.table("supplies").delete().in_("id", ingredients_ids).execute()
+            unindex_supplies(ingredients_ids)
             print(f"✅ Bahan baku {ingredients_ids} telah digunakan.")
         except Exception as e:
             print(f"❌ Gagal update stok: {e}")
             return {"error": "Gagal update stok"}
-            
-    # 2. Estimasi Nutrisi & Safety pakai AI (Reuse calculate_meal_expiry)
-    # Ini lebih efisien karena satu kali panggil dapet expiry + nutrition
-    analysis_result = calculate_meal_expiry(menu_name)
-    
+    return None
+
+def _record_production(menu_name, qty_produced, analysis_result):
     # Ambil data nutrisi dari hasil analisis
     nutrition_data = analysis_result.get("nutrition", {"calories": "N/A", "protein": "N/A"})
 
@@ -128,6 +398,32 @@ def cook_meal(menu_name: str, qty_produced: int, ingredients_ids: list):
         "safety_analysis": analysis_result
     }
 
+def cook_meal(menu_name: str, qty_produced: int, ingredients_ids: list):
+    """
+    Catat produksi masakan:
+    1. Kurangi stok bahan baku (deduct stock).
+    2. Estimasi nutrisi menu tersebut pakai AI.
+    """
+    error = _consume_ingredients(menu_name, qty_produced, ingredients_ids)
+    if error:
+        return error
+            
+    # 2. Estimasi Nutrisi & Safety pakai AI (Reuse calculate_meal_expiry)
+    # Ini lebih efisien karena satu kali panggil dapet expiry + nutrition
+    analysis_result = calculate_meal_expiry(menu_name)
+    return _record_production(menu_name, qty_produced, analysis_result)
+
+async def cook_meal_async(menu_name: str, qty_produced: int, ingredients_ids: list):
+    """
+    Versi async cook_meal: query DB (sync client) di thread, panggilan AI di event loop.
+    """
+    error = await asyncio.to_thread(_consume_ingredients, menu_name, qty_produced, ingredients_ids)
+    if error:
+        return error
+
+    analysis_result = await calculate_meal_expiry_async(menu_name)
+    return await asyncio.to_thread(_record_production, menu_name, qty_produced, analysis_result)
+
 def mark_meal_as_served(meal_id: int):
     """
     Tandai masakan sebagai 'served' (Telah Disajikan).
@@ -143,6 +439,146 @@ def mark_meal_as_served(meal_id: int):
 
 # backend/services/kitchen.py
 
+# --- KONTEKS CHAT CHEF ---
+# System prompt hanya memuat stok & vendor yang relevan dengan pesan user
+# (bahan yang disebut + vendor terdekat per bahan), dibatasi anggaran token,
+# jadi ukuran prompt (dan latency chat) tidak ikut membesar bersama katalog.
+CHEF_CONTEXT_MAX_TOKENS = int(os.getenv("CHEF_CONTEXT_MAX_TOKENS", "1200"))
+CHEF_CONTEXT_VENDORS_PER_ITEM = int(os.getenv("CHEF_CONTEXT_VENDORS_PER_ITEM", "3"))
+CHEF_CONTEXT_MAX_ITEMS = int(os.getenv("CHEF_CONTEXT_MAX_ITEMS", "8"))
+CHEF_STOCK_ROWS = 50
+CHARS_PER_TOKEN = 4  # Perkiraan kasar, cukup untuk anggaran (bukan tokenizer asli)
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // CHARS_PER_TOKEN + 1
+
+def _take_within_budget(lines, max_tokens):
+    """
+    Ambil baris dari depan selama muat di anggaran. Sisanya diringkas jadi satu baris.
+    Return: (baris terpilih, token terpakai)
+    """
+    taken, used = [], 0
+    for line in lines:
+        cost = estimate_tokens(line)
+        if used + cost > max_tokens:
+            break
+        taken.append(line)
+        used += cost
+    skipped = len(lines) - len(taken)
+    if skipped:
+        taken.append(f"- ... dan {skipped} data lain (tanyakan lebih spesifik)")
+        used += estimate_tokens(taken[-1])
+    return taken, used
+
+def _stock_lines(stock_rows, scores):
+    # Bahan yang disebut user duluan, sisanya tetap urut dari stok terbaru
+    ranked = sorted(
+        enumerate(stock_rows),
+        key=lambda pair: (-scores.get(normalize_ingredient(pair[1].get('item_name')), 0), pair[0])
+    )
+    lines = []
+    for _, item in ranked:
+        quality = item.get('quality_status', 'N/A')
+        freshness = item.get('freshness', quality)  # Fallback to quality_status
+        lines.append(
+            f"- **{item['item_name']}**: {item['quantity']} {item['unit']} "
+            f"(Kualitas: {freshness}, Supplier: {item['owner_name']})"
+        )
+    return lines
+
+def _market_lines(hits):
+    # Format: "Bawang Merah: Tersedia di Pak Asep (Jarak: 2.5 km)"
+    return [
+        f"- {item['item_name']}: Tersedia di {item['owner_name']} (Jarak: {dist:.1f} km)"
+        for dist, item in hits
+    ]
+
+def _chef_context(user_id: int, user_message: str):
+    """
+    Ambil data stok dapur & pasar yang relevan untuk pesan ini (query DB, sync).
+    Return: (my_stock_text, market_text)
+    """
+    # --- LANGKAH 1: AMBIL DATA LOKASI KITCHEN ---
+    user_res = supabase.table("users").select("latitude, longitude").eq("id", user_id).single().execute()
+    kitchen_loc = user_res.data or {}
+    # Kitchen tanpa GPS menyimpan NULL, jadi default Monas dipakai lewat `or`
+    k_lat = kitchen_loc.get('latitude') or -6.175392
+    k_long = kitchen_loc.get('longitude') or 106.827153
+
+    # --- LANGKAH 2: CARI BAHAN YANG DISEBUT + VENDOR TERDEKATNYA ---
+    relevant = relevant_suppliers(
+        user_message or "", k_lat, k_long,
+        per_item=CHEF_CONTEXT_VENDORS_PER_ITEM, max_items=CHEF_CONTEXT_MAX_ITEMS
+    )
+    scores = {name: score for name, score, _ in relevant}
+
+    # --- LANGKAH 3: AMBIL 'MY STOCK' (GLOBAL INVENTORY VIEW) ---
+    # Stok terbaru di gudang (supplies table) - sama seperti dashboard overview
+    my_stock_res = supabase.table("supplies")\
+        .select("*")\
+        .order("created_at", desc=True)\
+        .limit(CHEF_STOCK_ROWS)\
+        .execute()
+    stock_lines, stock_tokens = _take_within_budget(
+        _stock_lines(my_stock_res.data or [], scores), CHEF_CONTEXT_MAX_TOKENS // 2
+    )
+    my_stock_text = "\n".join(stock_lines) if stock_lines else "- Tidak ada stok (Gudang Kosong)"
+
+    # --- LANGKAH 4: 'MARKET STOCK' (APA YG BISA DIBELI) ---
+    # Pesan tidak menyebut bahan apa pun -> tampilkan barang terdekat saja
+    market_hits = [hit for _, _, hits in relevant for hit in hits]
+    if not market_hits:
+        market_hits = nearest_supplies(k_lat, k_long, k=CHEF_CONTEXT_MAX_ITEMS * CHEF_CONTEXT_VENDORS_PER_ITEM)
+    market_lines, _ = _take_within_budget(_market_lines(market_hits), CHEF_CONTEXT_MAX_TOKENS - stock_tokens)
+    market_text = "\n".join(market_lines) if market_lines else "- Pasar sedang kosong"
+
+    return my_stock_text, market_text
+
+# Instruksi tetap Chef Bekal. Sengaja diletakkan SEBELUM data per request
+# (stok, jarak vendor) supaya snapshot pasar + instruksi jadi awalan yang sama persis.
+CHEF_INSTRUCTIONS = """
+    Kamu adalah "Chef Bekal", asisten dapur AI yang ahli manajemen logistik.
+
+    TUGAS KAMU:
+    1. Saat user minta resep, PERTAMA-TAMA: List dulu bahan apa saja yang SUDAH ADA di dapur saya beserta kualitasnya.
+    2. KEDUA: Jika ada bahan yang kurang, cari di DATA PASAR (vendor terdekat) atau KATALOG PASAR di atas.
+       - Jika ada vendor yg jual: Tulis "Bisa beli [Nama Barang] di [Nama Vendor] (Jaraknya [X] km)".
+       - Prioritaskan vendor dengan jarak TERDEKAT.
+       - Jika tidak ada di DATA PASAR dan tidak tercantum di KATALOG PASAR: Tulis "Barang ini belum ditemukan di vendor mitra".
+         (KATALOG PASAR bisa terpotong, jadi jangan bilang barang pasti tidak tersedia hanya karena tidak ada di katalog.)
+    3. KETIGA: Berikan resep masakan lengkapnya.
+
+    Gaya bahasa: Ramah, profesional, dan sangat membantu secara operasional.
+"""
+
+def _chef_system_prompt(user_id: int, user_message: str = "") -> str:
+    """
+    Rakit system prompt Chef Bekal: snapshot pasar + instruksi (awalan stabil),
+    lalu data stok dapur & pasar untuk pesan ini (query DB, sync).
+    """
+    my_stock_text, market_text = _chef_context(user_id, user_message)
+
+    # --- LANGKAH 5: RAKIT SYSTEM PROMPT ---
+    system_prompt = _market_prefix() + CHEF_INSTRUCTIONS + f"""
+    DATA INVENTARIS DAPUR SAYA (Gunakan ini dulu):
+    {my_stock_text}
+    
+    DATA PASAR & VENDOR TERDEKAT (Gunakan ini jika stok dapur kurang):
+    {market_text}
+    """
+
+    return system_prompt
+
+def _chef_request(system_prompt, user_message):
+    return dict(
+        model="Claude Sonnet 4.5",
+        messages=[
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_message}
+        ],
+        max_tokens=1500
+    )
+
 def chat_with_chef(user_message: str, user_id: int):
     """
     Chatbot Koki Pintar (Logistik Edition).
@@ -151,83 +587,47 @@ def chat_with_chef(user_message: str, user_id: int):
     2. Stok Pasar (Barang vendor + Jarak).
     """
     try:
-        # --- LANGKAH 1: AMBIL DATA LOKASI KITCHEN ---
-        user_res = supabase.table("users").select("latitude, longitude").eq("id", user_id).single().execute()
-        kitchen_loc = user_res.data
-        k_lat = kitchen_loc.get('latitude', -6.175392)
-        k_long = kitchen_loc.get('longitude', 106.827153)
-
-        # --- LANGKAH 2: AMBIL 'MY STOCK' (GLOBAL INVENTORY VIEW) ---
-        # Mengambil SEMUA stok di gudang (supplies table) - sama seperti dashboard overview
-        my_stock_res = supabase.table("supplies")\
-            .select("*")\
-            .order("created_at", desc=True)\
-            .limit(50)\
-            .execute()
-        
-        my_stock_list = []
-        if my_stock_res.data:
-            for item in my_stock_res.data:
-                quality = item.get('quality_status', 'N/A')
-                freshness = item.get('freshness', quality)  # Fallback to quality_status
-                my_stock_list.append(
-                    f"- **{item['item_name']}**: {item['quantity']} {item['unit']} "
-                    f"(Kualitas: {freshness}, Supplier: {item['owner_name']})"
-                )
-        
-        my_stock_text = "\n".join(my_stock_list) if my_stock_list else "- Tidak ada stok (Gudang Kosong)"
+        system_prompt = _chef_system_prompt(user_id, user_message)
 
-        # --- LANGKAH 3: AMBIL 'MARKET STOCK' (APA YG BISA DIBELI) ---
-        # Ambil semua supply dari vendor
-        market_res = supabase.table("supplies").select("*").execute()
-        market_list = []
-        
-        if market_res.data:
-            for item in market_res.data:
-                # Hitung Jarak
-                dist = 0
-                if item.get('latitude') and item.get('longitude'):
-                    dist = haversine_distance(k_lat, k_long, item['latitude'], item['longitude'])
-                
-                # Format: "Bawang Merah (Pak Asep - 2.5km)"
-                market_list.append(f"- {item['item_name']}: Tersedia di {item['owner_name']} (Jarak: {dist:.1f} km)")
-
-        market_text = "\n".join(market_list) if market_list else "- Pasar sedang kosong"
-
-        # --- LANGKAH 4: RAKIT SYSTEM PROMPT ---
-        system_prompt = f"""
-        Kamu adalah "Chef Bekal", asisten dapur AI yang ahli manajemen logistik.
-        
-        DATA INVENTARIS DAPUR SAYA (Gunakan ini dulu):
-        {my_stock_text}
-        
-        DATA PASAR & VENDOR TERDEKAT (Gunakan ini jika stok dapur kurang):
-        {market_text}
-        
-        TUGAS KAMU:
-        1. Saat user minta resep, PERTAMA-TAMA: List dulu bahan apa saja yang SUDAH ADA di dapur saya beserta kualitasnya.
-        2. KEDUA: Jika ada bahan yang kurang, cari di DATA PASAR.
-           - Jika ada vendor yg jual: Tulis "Bisa beli [Nama Barang] di [Nama Vendor] (Jaraknya [X] km)".
-           - Prioritaskan vendor dengan jarak TERDEKAT.
-           - Jika tidak ada di pasar: Tulis "Barang ini sedang tidak tersedia di vendor mitra".
-        3. KETIGA: Berikan resep masakan lengkapnya.
-        
-        Gaya bahasa: Ramah, profesional, dan sangat membantu secara operasional.
-        """
-
-        # --- LANGKAH 5: KIRIM KE CLAUDE ---
-        response = kolosal_client.chat.completions.create(
-            model="Claude Sonnet 4.5",
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_message}
-            ],
-            max_tokens=1500
-        )
+        # --- LANGKAH 6: KIRIM KE CLAUDE ---
+        response = complete(_chef_request(system_prompt, user_message), kind="chat")
         
         ai_reply = response.choices[0].message.content
         return {"reply": ai_reply}
 
     except Exception as e:
         print(f"Chat Error: {e}")
-        return {"error": "Maaf, Chef sedang mengecek gudang. Coba lagi nanti."}
\ No newline at end of file
+        return {"error": "Maaf, Chef sedang mengecek gudang. Coba lagi nanti."}
+
+async def chat_with_chef_async(user_message: str, user_id: int):
+    """
+    Versi async chat_with_chef: konteks DB dirakit di thread, panggilan AI di event loop.
+    """
+    try:
+        system_prompt = await asyncio.to_thread(_chef_system_prompt, user_id, user_message)
+        response = await complete_async(_chef_request(system_prompt, user_message), kind="chat")
+
+        ai_reply = response.choices[0].message.content
+        return {"reply": ai_reply}
+
+    except Exception as e:
+        print(f"Chat Error: {e}")
+        return {"error": "Maaf, Chef sedang mengecek gudang. Coba lagi nanti."}
+
+async def stream_chat_with_chef_async(user_message: str, user_id: int):
+    """
+    Versi streaming chat_with_chef. Yield tuple (event, data):
+    ("token", str) per potongan balasan, lalu ("done", {"reply": ...}) atau ("error", {...}).
+    """
+    chunks = []
+    try:
+        system_prompt = await asyncio.to_thread(_chef_system_prompt, user_id, user_message)
+        async for delta in stream_async(_chef_request(system_prompt, user_message), kind="chat"):
+            chunks.append(delta)
+            yield "token", delta
+    except Exception as e:
+        print(f"Chat Error (stream): {e}")
+        yield "error", {"error": "Maaf, Chef sedang mengecek gudang. Coba lagi nanti."}
+        return
+
+    yield "done", {"reply": "".join(chunks)}
@@ -0,0 +1,238 @@
+import asyncio
+import json
+import os
+import threading
+from .admission import llm_admission, PRIORITY_INTERACTIVE
+from .cache import content_hash
+from .clients import kolosal_client, kolosal_async_client
+
+# --- PINTU TUNGGAL PANGGILAN AI (KOLOSAL) ---
+# Semua service memanggil Claude lewat complete() / complete_async() di sini,
+# bukan langsung ke kolosal_client. Request yang identik (model + messages +
+# parameter sama) dan sedang berjalan bersamaan digabung (singleflight): hanya
+# satu yang benar-benar dikirim, sisanya menunggu dan menerima hasil yang sama.
+# Contoh: beberapa admin SPPG membuka dashboard bersamaan. Prioritas ikut key,
+# jadi request interaktif tidak pernah menumpang panggilan background (cron)
+# yang antri di belakang dan bisa ditolak saat antrian background penuh.
+# Setelah itu panggilan masuk antrian berprioritas (services/admission.py).
+# priority: PRIORITY_INTERACTIVE (user menunggu) / PRIORITY_BACKGROUND (cron, warming).
+# kind: label metrik ("vision", "menu", "expiry", "chat").
+LLM_SINGLEFLIGHT_ENABLED = os.getenv("LLM_SINGLEFLIGHT_ENABLED", "1") != "0"
+
+def request_key(request, priority=PRIORITY_INTERACTIVE) -> str:
+    """Key request: hash dari prioritas + seluruh parameter (termasuk gambar base64)."""
+    return content_hash(str(priority), json.dumps(request, sort_keys=True, ensure_ascii=False, default=str))
+
+class _Flight:
+    """Satu panggilan yang sedang berjalan + hasilnya untuk para penunggu."""
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.task = None  # asyncio.Task kalau pemimpinnya async
+        self.result = None
+        self.error = None
+
+    def finish(self, result=None, error=None):
+        self.result = result
+        self.error = error
+        self.event.set()
+
+    def outcome(self):
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+class SingleFlight:
+    """
+    Penggabung panggilan identik yang sedang berjalan. Bisa dipakai dari thread
+    (do) maupun event loop (do_async); keduanya berbagi tabel yang sama, jadi
+    panggilan sync dan async dengan key sama juga digabung.
+    Hasil tidak disimpan setelah selesai (itu tugas cache, bukan singleflight).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flights = {}
+        self.calls = 0
+        self.shared = 0
+
+    def _join(self, key):
+        """Return: (flight, True kalau pemanggil ini yang harus mengeksekusi)."""
+        with self._lock:
+            flight = self._flights.get(key)
+            if flight is not None:
+                self.shared += 1
+                return flight, False
+            flight = _Flight()
+            self._flights[key] = flight
+            self.calls += 1
+            return flight, True
+
+    def _leave(self, key, flight):
+        with self._lock:
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+
+    def do(self, key, fn):
+        flight, leader = self._join(key)
+        if not leader:
+            flight.event.wait()
+            return flight.outcome()
+        try:
+            result = fn()
+        except BaseException as e:
+            flight.finish(error=e)
+            raise
+        else:
+            flight.finish(result=result)
+            return result
+        finally:
+            self._leave(key, flight)
+
+    async def do_async(self, key, fn):
+        """fn: fungsi tanpa argumen yang mengembalikan coroutine."""
+        flight, leader = self._join(key)
+        if not leader:
+            task = flight.task
+            if task is not None and task.get_loop() is asyncio.get_running_loop():
+                await asyncio.shield(task)
+            else:
+                # Pemimpinnya thread lain (panggilan sync / event loop lain)
+                await asyncio.to_thread(flight.event.wait)
+            return flight.outcome()
+
+        # Dijalankan sebagai task terpisah: kalau request pemimpin dibatalkan
+        # (client putus), panggilan tetap jalan untuk para penunggu
+        task = asyncio.ensure_future(fn())
+        flight.task = task
+
+        def done(t):
+            if t.cancelled():
+                flight.finish(error=asyncio.CancelledError())
+            else:
+                flight.finish(result=t.result() if t.exception() is None else None, error=t.exception())
+            self._leave(key, flight)
+
+        task.add_done_callback(done)
+        return await asyncio.shield(task)
+
+    def stats(self):
+        with self._lock:
+            in_flight = len(self._flights)
+        return {"calls": self.calls, "shared": self.shared, "in_flight": in_flight}
+
+llm_singleflight = SingleFlight()
+
+class PromptCacheStats:
+    """
+    Berapa token prompt yang dilayani dari prompt cache provider, dibaca dari
+    usage tiap respons (OpenAI: prompt_tokens_details.cached_tokens,
+    gaya Anthropic: cache_read_input_tokens). Respons streaming tidak dihitung.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.responses = 0
+        self.hits = 0
+        self.prompt_tokens = 0
+        self.cached_tokens = 0
+
+    def record(self, response):
+        usage = getattr(response, "usage", None)
+        if usage is None:
+            return
+        details = getattr(usage, "prompt_tokens_details", None)
+        cached = getattr(details, "cached_tokens", None) or getattr(usage, "cache_read_input_tokens", None) or 0
+        with self._lock:
+            self.responses += 1
+            self.prompt_tokens += getattr(usage, "prompt_tokens", None) or 0
+            self.cached_tokens += cached
+            if cached:
+                self.hits += 1
+
+    def stats(self):
+        with self._lock:
+            ratio = self.cached_tokens / self.prompt_tokens if self.prompt_tokens else None
+            return {
+                "responses": self.responses,
+                "hits": self.hits,
+                "prompt_tokens": self.prompt_tokens,
+                "cached_tokens": self.cached_tokens,
+                "cached_ratio": None if ratio is None else round(ratio, 3),
+            }
+
+prompt_cache_stats = PromptCacheStats()
+
+def complete(request, priority=PRIORITY_INTERACTIVE, kind="other"):
+    """
+    Panggil chat completion (sync). request: dict parameter create(), mis. dari _menu_request().
+    Raise LLMOverloadedError kalau antrian AI penuh.
+    """
+    def call():
+        response = llm_admission.call(
+            lambda: kolosal_client.chat.completions.create(**request), priority=priority, kind=kind
+        )
+        prompt_cache_stats.record(response)
+        return response
+
+    if not LLM_SINGLEFLIGHT_ENABLED:
+        return call()
+    return llm_singleflight.do(request_key(request, priority), call)
+
+async def complete_async(request, priority=PRIORITY_INTERACTIVE, kind="other"):
+    """
+    Versi async complete() (dipakai endpoint FastAPI).
+    """
+    async def call():
+        response = await llm_admission.call_async(
+            lambda: kolosal_async_client.chat.completions.create(**request), priority=priority, kind=kind
+        )
+        prompt_cache_stats.record(response)
+        return response
+
+    if not LLM_SINGLEFLIGHT_ENABLED:
+        return await call()
+    return await llm_singleflight.do_async(request_key(request, priority), call)
+
+async def stream_async(request, priority=PRIORITY_INTERACTIVE, kind="other"):
+    """
+    Chat completion dengan stream=True. Yield: potongan teks (delta) sesuai urutan datang.
+    Stream hanya bisa dibaca sekali, jadi tidak digabung dengan request lain;
+    slot antrian dipegang sampai stream selesai dibaca (retry hanya saat membuka stream).
+    """
+    async def open_stream():
+        await llm_admission.acquire_async(priority, kind)
+        try:
+            return await llm_admission.call_async(
+                lambda: kolosal_async_client.chat.completions.create(**request, stream=True),
+                priority=priority, kind=kind, admitted=True
+            )
+        except BaseException:
+            llm_admission.release()
+            raise
+
+    stream = await open_stream()
+    try:
+        async for chunk in stream:
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta.content
+            if delta:
+                yield delta
+    finally:
+        # Tutup koneksi upstream dulu (client putus / generator dibuang di tengah
+        # jalan), baru lepas slot; kalau tidak, Kolosal tetap men-generate token
+        try:
+            await stream.close()
+        except Exception as e:
+            print(f"⚠️ Gagal menutup stream Kolosal: {e}")
+        finally:
+            llm_admission.release()
+
+def llm_stats():
+    """Ringkasan untuk endpoint metrik: antrian, waktu antri/layanan per jenis, singleflight, prompt cache."""
+    return {
+        **llm_admission.stats(),
+        "singleflight": llm_singleflight.stats(),
+        "prompt_cache": prompt_cache_stats.stats(),
+    }
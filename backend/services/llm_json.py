@@ -0,0 +1,182 @@
+import bisect
+import json
+import re
+from pydantic import ValidationError
+
+# --- EKSTRAKSI JSON DARI OUTPUT CLAUDE ---
+# Satu parser untuk semua service: output boleh dibungkus ```json ... ``` atau
+# kalimat pembuka/penutup. Teks dibaca sekali dari depan (bisa per token saat
+# streaming): objek di dalam array teratas langsung bisa dipakai begitu
+# lengkap, dan output yang terpotong (max_tokens) tetap bisa diambil sebagian.
+
+_ROOT_START = re.compile(r"[{\[]")
+_STRUCTURAL = re.compile(r'[{}\[\]",]')
+_STRING_SPECIAL = re.compile(r'["\\]')
+_CLOSERS = {"{": "}", "[": "]"}
+_DECODER = json.JSONDecoder()
+# Induk "item": array di root ([{..}, ..]) atau array di dalam objek root ({"recommendations": [{..}]})
+_ITEM_PARENTS = (["["], ["{", "["])
+
+class LLMOutputError(ValueError):
+    """Output AI tidak berisi JSON yang valid / tidak sesuai skema."""
+
+class JsonStreamExtractor:
+    """
+    Parser JSON inkremental. Panggil feed() per potongan teks; nilai JSON
+    pertama ({...} atau [...]) yang ditemukan dianggap jawaban, teks di luarnya diabaikan.
+    """
+
+    def __init__(self):
+        self._parts = []
+        self._part_starts = []
+        self._length = 0
+        self._stack = []
+        self._in_string = False
+        self._escape = False
+        self._root_start = None
+        self._root_end = None
+        self._item_start = None
+        self._safe_point = None  # (posisi, kedalaman) terakhir yang aman untuk dipotong
+
+    @property
+    def done(self):
+        """True kalau nilai JSON root sudah tertutup."""
+        return self._root_end is not None
+
+    def _slice(self, start, end):
+        first = bisect.bisect_right(self._part_starts, start) - 1
+        last = bisect.bisect_right(self._part_starts, end - 1) - 1
+        text = "".join(self._parts[first:last + 1])
+        offset = self._part_starts[first]
+        return text[start - offset:end - offset]
+
+    def text(self):
+        return "".join(self._parts)
+
+    def feed(self, text):
+        """
+        Tambah potongan teks. Return: list objek item (elemen array teratas)
+        yang baru lengkap di potongan ini.
+        """
+        if not text:
+            return []
+        offset = self._length
+        self._parts.append(text)
+        self._part_starts.append(offset)
+        self._length += len(text)
+
+        completed = []
+        i, n = 0, len(text)
+        while i < n and not self.done:
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                    i += 1
+                    continue
+                match = _STRING_SPECIAL.search(text, i)
+                if match is None:
+                    break
+                i = match.start()
+                if text[i] == "\\":
+                    self._escape = True
+                else:
+                    self._in_string = False
+                i += 1
+                continue
+
+            # Sebelum root: lompati ```json, kalimat pembuka, dst.
+            pattern = _STRUCTURAL if self._stack else _ROOT_START
+            match = pattern.search(text, i)
+            if match is None:
+                break
+            i = match.start()
+            ch = text[i]
+            pos = offset + i
+
+            if ch == '"':
+                self._in_string = True
+            elif ch in "{[":
+                if self._root_start is None:
+                    self._root_start = pos
+                if ch == "{" and self._stack in _ITEM_PARENTS:
+                    self._item_start = pos
+                self._stack.append(ch)
+                self._safe_point = (pos + 1, len(self._stack))
+            elif ch in "}]":
+                self._stack.pop()
+                if ch == "}" and self._item_start is not None and self._stack in _ITEM_PARENTS:
+                    try:
+                        completed.append(json.loads(self._slice(self._item_start, pos + 1)))
+                    except json.JSONDecodeError:
+                        pass
+                    self._item_start = None
+                self._safe_point = (pos + 1, len(self._stack))
+                if not self._stack:
+                    self._root_end = pos + 1
+            else:  # ","
+                self._safe_point = (pos, len(self._stack))
+            i += 1
+        return completed
+
+    def result(self):
+        """Nilai JSON root yang sudah lengkap. Raise LLMOutputError kalau belum/tidak valid."""
+        if self._root_start is None:
+            raise LLMOutputError("AI did not return valid JSON")
+        if not self.done:
+            raise LLMOutputError("JSON dari AI terpotong (belum ditutup)")
+        try:
+            return json.loads(self._slice(self._root_start, self._root_end))
+        except json.JSONDecodeError as e:
+            raise LLMOutputError(f"JSON dari AI tidak valid: {e}") from e
+
+    def partial(self):
+        """
+        Versi terbaik dari JSON yang belum selesai: dipotong di elemen lengkap
+        terakhir lalu semua kurung yang masih terbuka ditutup. None kalau tidak bisa.
+        """
+        if self.done:
+            try:
+                return self.result()
+            except LLMOutputError:
+                return None
+        if self._safe_point is None:
+            return None
+        end, depth = self._safe_point
+        closers = "".join(_CLOSERS[ch] for ch in reversed(self._stack[:depth]))
+        try:
+            return json.loads(self._slice(self._root_start, end) + closers)
+        except json.JSONDecodeError:
+            return None
+
+def extract_json(text, allow_partial=False):
+    """
+    Ambil JSON dari output AI (boleh ada markdown / kalimat di sekitarnya).
+    allow_partial=True -> output terpotong dikembalikan sebagian (lihat partial()).
+    """
+    text = text or ""
+    # Jalur cepat (teks sudah lengkap): raw_decode membaca tepat satu nilai JSON
+    # mulai dari kurung pertama, teks sesudahnya (``` / penutup) diabaikan
+    match = _ROOT_START.search(text)
+    if match is not None:
+        try:
+            return _DECODER.raw_decode(text, match.start())[0]
+        except json.JSONDecodeError:
+            pass
+
+    extractor = JsonStreamExtractor()
+    extractor.feed(text)
+    if allow_partial and not extractor.done:
+        data = extractor.partial()
+        if data is not None:
+            return data
+    return extractor.result()
+
+def validate_output(data, model):
+    """
+    Validasi data dengan model pydantic. Return: dict berisi field yang dikirim
+    AI saja (termasuk field tambahan), sudah dikonversi ke tipe di model.
+    """
+    try:
+        return model.model_validate(data).model_dump(exclude_unset=True)
+    except ValidationError as e:
+        raise LLMOutputError(f"Output AI tidak sesuai format {model.__name__}: {e.error_count()} field salah") from e
@@ -1,88 +1,463 @@
+import base64
+import bisect
+import heapq
+import json
 import math
-import random
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from .cache import content_hash
 from .clients import supabase
+from .geo import haversine_batch, KM_PER_DEGREE
+from .geocoding import geocode_address, flush_geocode_cache
+from .spatial import GridIndex
+from .proximity import nearest_sppg_table
+from .text_search import NameIndex, normalize_ingredient, query_phrases
 
-# --- DATA SPPG (HARDCODED NETWORK) ---
-SPPG_LOCATIONS = [
-    {"id": 1, "name": "SPPG Jakarta Pusat (Monas)", "address": "Jl. Medan Merdeka Barat, Gambir", "lat": -6.175392, "long": 106.827153, "phone": "0812-3456-7890"},
-    {"id": 2, "name": "SPPG Jakarta Selatan (Blok M)", "address": "Jl. Melawai Raya, Kebayoran Baru", "lat": -6.244223, "long": 106.801782, "phone": "0812-9876-5432"},
-    {"id": 3, "name": "SPPG Jakarta Barat (Grogol)", "address": "Jl. Kyai Tapa, Grogol Petamburan", "lat": -6.167570, "long": 106.790960, "phone": "0812-1122-3344"},
-    {"id": 4, "name": "SPPG Jakarta Timur (Jatinegara)", "address": "Jl. Matraman Raya, Jatinegara", "lat": -6.215116, "long": 106.870434, "phone": "0812-5566-7788"},
-    {"id": 5, "name": "SPPG Jakarta Utara (Kelapa Gading)", "address": "Jl. Boulevard Raya, Kelapa Gading", "lat": -6.162331, "long": 106.900220, "phone": "0812-9988-7766"}
-]
+# --- SPATIAL INDEX SUPPLIES (IN-PROCESS) ---
+# Index dibangun sekali dari tabel supplies, lalu disinkronkan saat insert/delete.
+# Rebuild berkala tetap dilakukan supaya perubahan dari worker lain ikut masuk.
+# SUPPLY_INDEX_ENABLED=0 -> selalu pakai query DB (bounding box) tanpa index in-process
+SUPPLY_INDEX_ENABLED = os.getenv("SUPPLY_INDEX_ENABLED", "1") != "0"
+SUPPLY_INDEX_TTL_SECONDS = int(os.getenv("SUPPLY_INDEX_TTL_SECONDS", "300"))
+SUPPLY_INDEX_PAGE_SIZE = 1000  # Batas default PostgREST per request
+# Skor minimum trigram supaya nama barang dianggap cocok dengan keyword (0-1)
+SUPPLY_FUZZY_THRESHOLD = float(os.getenv("SUPPLY_FUZZY_THRESHOLD", "0.6"))
 
-def haversine_distance(lat1, lon1, lat2, lon2):
+_SUPPLY_INDEX = GridIndex(cell_deg=0.01)  # ~1.1 km per sel
+_SUPPLY_NAMES = NameIndex()               # trigram index nama barang (fuzzy + sinonim)
+# version naik setiap isi katalog (mungkin) berubah: rebuild, insert, delete
+_SUPPLY_INDEX_STATE = {"built_at": None, "version": 0}
+_SUPPLY_INDEX_LOCK = threading.RLock()
+# Satu rebuild sekaligus; selama rebuild berkala berjalan, index lama tetap dipakai
+_SUPPLY_REBUILD_LOCK = threading.Lock()
+
+# --- SNAPSHOT HASIL PENCARIAN (UNTUK PAGINATION) ---
+# Hasil urut satu query disimpan sebentar, jadi halaman 2 dst cukup dipotong
+# dari snapshot (tidak hitung & sort ulang) dan tetap konsisten walau ada stok baru.
+SEARCH_SNAPSHOT_TTL_SECONDS = int(os.getenv("SEARCH_SNAPSHOT_TTL_SECONDS", "120"))
+SEARCH_SNAPSHOT_MAX_RESULTS = int(os.getenv("SEARCH_SNAPSHOT_MAX_RESULTS", "500"))
+SEARCH_SNAPSHOT_MAX_ENTRIES = 256
+
+_SEARCH_SNAPSHOTS = OrderedDict()  # snapshot_id -> snapshot
+_SEARCH_SNAPSHOTS_LOCK = threading.Lock()
+
+def _resolve_item_location(item):
+    """
+    Ambil koordinat item. Jika data GPS kosong (None), pakai geocoding alamat
+    vendor (gazetteer lokal + cache) supaya titiknya tetap sama di setiap request.
+    """
+    item_lat = item.get('latitude')
+    item_long = item.get('longitude')
+    if item_lat is None or item_long is None:
+        point = geocode_address(item.get('location'))
+        item_lat, item_long = point['lat'], point['lon']
+    return item_lat, item_long
+
+def _index_row(item, grid, names):
+    item_lat, item_long = _resolve_item_location(item)
+    row = dict(item)
+    row['location_lat'] = item_lat
+    row['location_long'] = item_long
+    grid.insert(item['id'], item_lat, item_long, row)
+    names.add(item['id'], item.get('item_name'))
+
+def _fetch_all_supplies():
+    rows = []
+    start = 0
+    while True:
+        response = supabase.table("supplies")\
+            .select("*")\
+            .order("id")\
+            .range(start, start + SUPPLY_INDEX_PAGE_SIZE - 1)\
+            .execute()
+        batch = response.data or []
+        rows.extend(batch)
+        if len(batch) < SUPPLY_INDEX_PAGE_SIZE:
+            return rows
+        start += SUPPLY_INDEX_PAGE_SIZE
+
+def rebuild_supply_index():
+    """
+    Bangun ulang spatial index dari seluruh tabel supplies.
+    """
+    global _SUPPLY_INDEX, _SUPPLY_NAMES
+    rows = _fetch_all_supplies()
+    # Index baru dirakit di luar lock (geocoding bisa lambat), lalu ditukar sekaligus
+    grid, names = GridIndex(cell_deg=0.01), NameIndex()
+    for item in rows:
+        _index_row(item, grid, names)
+    flush_geocode_cache()  # alamat baru hasil geocoding ditulis sekali per rebuild
+    with _SUPPLY_INDEX_LOCK:
+        _SUPPLY_INDEX, _SUPPLY_NAMES = grid, names
+        _SUPPLY_INDEX_STATE["built_at"] = time.monotonic()
+        _SUPPLY_INDEX_STATE["version"] += 1
+    print(f"🗺️ Supply index dibangun: {len(rows)} item")
+
+def _rebuild_in_background():
+    try:
+        rebuild_supply_index()
+    except Exception as e:
+        # Index lama tetap dipakai; coba lagi setelah TTL berikutnya
+        print(f"⚠️ Rebuild supply index gagal, pakai index lama: {e}")
+        _SUPPLY_INDEX_STATE["built_at"] = time.monotonic()
+    finally:
+        _SUPPLY_REBUILD_LOCK.release()
+
+def ensure_supply_index():
+    """
+    Build pertama dilakukan langsung (belum ada index untuk dipakai).
+    Setelah itu rebuild berkala jalan di thread terpisah, request tidak menunggu.
+    """
+    if _SUPPLY_INDEX_STATE["built_at"] is None:
+        with _SUPPLY_REBUILD_LOCK:
+            if _SUPPLY_INDEX_STATE["built_at"] is None:
+                rebuild_supply_index()
+        return
+    if time.monotonic() - _SUPPLY_INDEX_STATE["built_at"] <= SUPPLY_INDEX_TTL_SECONDS:
+        return
+    if _SUPPLY_REBUILD_LOCK.acquire(blocking=False):
+        threading.Thread(target=_rebuild_in_background, name="supply-index-rebuild", daemon=True).start()
+
+def index_supplies(rows):
+    """
+    Sinkronkan index setelah insert supplies (dipanggil dari endpoint upload stok).
+    Jika index belum pernah dibangun, cukup dilewati (nanti dibangun lengkap).
+    """
+    with _SUPPLY_INDEX_LOCK:
+        _SUPPLY_INDEX_STATE["version"] += 1
+        if _SUPPLY_INDEX_STATE["built_at"] is None:
+            return
+        for item in rows or []:
+            if item.get('id') is not None:
+                _index_row(item, _SUPPLY_INDEX, _SUPPLY_NAMES)
+
+def unindex_supplies(ids):
+    """
+    Sinkronkan index setelah supplies dihapus (misal dipakai masak).
+    """
+    with _SUPPLY_INDEX_LOCK:
+        _SUPPLY_INDEX_STATE["version"] += 1
+        for supply_id in ids or []:
+            _SUPPLY_INDEX.remove(supply_id)
+            _SUPPLY_NAMES.remove(supply_id)
+
+def supply_catalog_version() -> int:
+    """Counter perubahan katalog di proses ini (bukan jaminan isi berubah)."""
+    return _SUPPLY_INDEX_STATE["version"]
+
+def _vendor_key(item):
+    return item.get('user_id', item.get('owner_name'))
+
+def supply_item_vendor_counts():
+    """
+    Nama barang unik (ter-normalisasi) di katalog -> jumlah vendor berbeda yang menjualnya.
+    """
+    if SUPPLY_INDEX_ENABLED:
+        try:
+            ensure_supply_index()
+            with _SUPPLY_INDEX_LOCK:
+                return {
+                    name: len({_vendor_key(_SUPPLY_INDEX.get(item_id) or {}) for item_id in _SUPPLY_NAMES.ids_of(name)})
+                    for name in _SUPPLY_NAMES.names()
+                }
+        except Exception as e:
+            print(f"⚠️ Supply index tidak tersedia, fallback ke query DB: {e}")
+    vendors = {}
+    for item in _fetch_all_supplies():
+        name = normalize_ingredient(item.get('item_name'))
+        if name:
+            vendors.setdefault(name, set()).add(_vendor_key(item))
+    return {name: len(ids) for name, ids in vendors.items()}
+
+def bounding_box(lat, lon, radius_km):
+    """
+    Kotak lat/long yang pasti memuat semua titik dalam radius_km dari (lat, lon).
+    Return: (min_lat, max_lat, min_lon, max_lon)
+    """
+    dlat = radius_km / KM_PER_DEGREE
+    # Pakai lintang terjauh dari ekuator di dalam kotak supaya tetap konservatif
+    worst_lat = min(90.0, abs(lat) + dlat)
+    cos_lat = math.cos(math.radians(worst_lat))
+    dlon = 180.0 if cos_lat <= 1e-9 else min(180.0, radius_km / (KM_PER_DEGREE * cos_lat))
+    return lat - dlat, lat + dlat, lon - dlon, lon + dlon
+
+def _search_suppliers_db(keyword, user_lat, user_long, limit=None, radius_km=None):
+    """
+    Jalur query DB langsung (tanpa index in-process).
+    Jika radius_km diisi, filter bounding box ikut dikirim ke Supabase
+    sehingga hanya baris di sekitar user yang ditransfer. Baris tanpa GPS
+    diambil terpisah lalu di-geocode, sama seperti jalur tanpa radius.
+    """
+    def matching():
+        return supabase.table("supplies")\
+            .select("*")\
+            .ilike("item_name", f"%{keyword.strip()}%")
+
+    if radius_km is None:
+        items = matching().execute().data or []
+    else:
+        min_lat, max_lat, min_lon, max_lon = bounding_box(user_lat, user_long, radius_km)
+        items = matching()\
+            .gte("latitude", min_lat).lte("latitude", max_lat)\
+            .gte("longitude", min_lon).lte("longitude", max_lon)\
+            .execute().data or []
+        # Filter jarak di bawah yang memutuskan baris ini masuk atau tidak
+        items += matching().is_("latitude", "null").execute().data or []
+    locations = [_resolve_item_location(item) for item in items]
+    dists = haversine_batch(
+        user_lat, user_long,
+        [loc[0] for loc in locations],
+        [loc[1] for loc in locations]
+    )
+
+    candidates = [
+        (dist, idx)
+        for idx, dist in enumerate(dists.tolist())
+        if radius_km is None or dist <= radius_km
+    ]
+    # Top-k pakai heap terbatas (O(n log k)), bukan sort seluruh hasil
+    if limit is not None:
+        candidates = heapq.nsmallest(limit, candidates)
+    else:
+        candidates.sort()
+
+    results_with_distance = []
+    for dist, idx in candidates:
+        item = items[idx]
+        item_lat, item_long = locations[idx]
+        # Tambahkan info jarak ke item
+        item['distance_km'] = round(dist, 1)
+        item['location_lat'] = item_lat
+        item['location_long'] = item_long
+        results_with_distance.append((dist, item))
+
+    return results_with_distance
+
+def _ranked_suppliers(keyword, user_lat, user_long, limit=None, radius_km=None):
     """
-    Hitung jarak antara dua titik koordinat (km)
+    Return: list (jarak_km_presisi, item) urut dari yang terdekat.
     """
-    R = 6371  # Radius bumi dalam km
-    dlat = math.radians(lat2 - lat1)
-    dlon = math.radians(lon2 - lon1)
-    a = math.sin(dlat / 2) * math.sin(dlat / 2) + math.cos(math.radians(lat1)) \
-        * math.cos(math.radians(lat2)) * math.sin(dlon / 2) * math.sin(dlon / 2)
-    c = 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
-    return R * c
+    if not SUPPLY_INDEX_ENABLED:
+        return _search_suppliers_db(keyword, user_lat, user_long, limit, radius_km)
+
+    try:
+        ensure_supply_index()
+    except Exception as e:
+        print(f"⚠️ Supply index tidak tersedia, fallback ke query DB: {e}")
+        return _search_suppliers_db(keyword, user_lat, user_long, limit, radius_km)
 
-def search_suppliers(keyword: str, user_lat: float = -6.175392, user_long: float = 106.827153):
+    with _SUPPLY_INDEX_LOCK:
+        if not keyword.strip():
+            # Tanpa keyword = seluruh katalog (setara ilike '%%' di jalur DB)
+            hits = _SUPPLY_INDEX.nearest(user_lat, user_long, k=limit, radius_km=radius_km)
+            matched = [(dist, row, 1.0) for dist, _, row in hits]
+        else:
+            # Cocokkan nama dulu lewat trigram index (fuzzy + sinonim, tanpa scan katalog)
+            scores = _SUPPLY_NAMES.match(keyword, SUPPLY_FUZZY_THRESHOLD)
+            if not scores:
+                return []
+            hits = _SUPPLY_INDEX.nearest(
+                user_lat, user_long,
+                k=limit, radius_km=radius_km,
+                predicate=lambda row: _SUPPLY_NAMES.name_of(row['id']) in scores
+            )
+            # Skor dibaca selagi lock dipegang: unindex_supplies di thread lain
+            # bisa menghapus nama barang begitu lock dilepas
+            matched = [(dist, row, scores[_SUPPLY_NAMES.name_of(row['id'])]) for dist, _, row in hits]
+
+    results = []
+    for dist, row, score in matched:
+        item = dict(row)
+        item['distance_km'] = round(dist, 1)
+        item['match_score'] = round(score, 2)
+        results.append((dist, item))
+    return results
+
+def search_suppliers(keyword: str, user_lat: float = -6.175392, user_long: float = 106.827153,
+                     limit: int = None, radius_km: float = None):
     """
     Cari supplier dan urutkan berdasarkan JARAK TERDEKAT.
     Default User Location: Monas (Jakarta Pusat).
+    Opsional: `limit` (N terdekat) dan `radius_km` (batas jarak).
     """
     print(f"🔍 Mencari supplier '{keyword}' dekat {user_lat}, {user_long}")
-    
+
     try:
-        # 1. Ambil data dari DB (Filter nama dulu)
-        response = supabase.table("supplies")\
-            .select("*")\
-            .ilike("item_name", f"%{keyword}%")\
-            .execute()
-            
-        items = response.data
-        
-        # 2. Inject Dummy Location & Hitung Jarak
-        # (Karena data DB belum ada lat/long beneran, kita simulasi di sini biar demo lancar)
-        
-        results_with_distance = []
-        for item in items:
-            # 1. Coba ambil Real GPS dari Database
-            item_lat = item.get('latitude')
-            item_long = item.get('longitude')
-            
-            # 2. Fallback ke Simulasi jika data GPS kosong (None)
-            if item_lat is None or item_long is None:
-                # Simulasi koordinat random sekitar Jakarta (± 0.05 derajat)
-                item_lat = -6.175392 + random.uniform(-0.05, 0.05)
-                item_long = 106.827153 + random.uniform(-0.05, 0.05)
-            
-            dist = haversine_distance(user_lat, user_long, item_lat, item_long)
-            
-            # Tambahkan info jarak ke item
-            item['distance_km'] = round(dist, 1)
-            item['location_lat'] = item_lat
-            item['location_long'] = item_long
-            
-            results_with_distance.append(item)
-            
-        # 3. Urutkan berdasarkan jarak terdekat (Ascending)
-        results_with_distance.sort(key=lambda x: x['distance_km'])
-        
-        return results_with_distance
-        
+        ranked = _ranked_suppliers(keyword, user_lat, user_long, limit, radius_km)
+        return [item for _, item in ranked]
+
     except Exception as e:
         print(f"❌ Error DB Search: {e}")
         return {"error": "Gagal mencari data"}
 
-def search_nearest_sppg(user_lat: float, user_long: float):
+def _distinct_vendors(hits, per_item):
+    # Satu baris per vendor (vendor yang sama bisa punya beberapa stok barang yang sama)
+    seen, picked = set(), []
+    for dist, item in hits:
+        vendor = _vendor_key(item)
+        if vendor in seen:
+            continue
+        seen.add(vendor)
+        picked.append((dist, item))
+        if len(picked) == per_item:
+            break
+    return picked
+
+def relevant_suppliers(text: str, user_lat: float, user_long: float, per_item: int = 3, max_items: int = 8):
+    """
+    Barang katalog yang disebut di teks bebas (mis. pesan chat), masing-masing
+    dengan `per_item` vendor (berbeda) terdekat. Dipakai untuk merakit konteks prompt AI
+    tanpa membaca seluruh tabel supplies.
+    Return: list (nama_normal, skor, [(jarak_km, item), ...]) urut dari skor tertinggi.
+    """
+    if SUPPLY_INDEX_ENABLED:
+        try:
+            ensure_supply_index()
+            with _SUPPLY_INDEX_LOCK:
+                scores = _SUPPLY_NAMES.match_text(text, SUPPLY_FUZZY_THRESHOLD)
+                names = sorted(scores, key=lambda name: (-scores[name], name))[:max_items]
+                results = []
+                for name in names:
+                    hits = _SUPPLY_INDEX.nearest(
+                        user_lat, user_long, k=per_item * 4,
+                        predicate=lambda row, name=name: _SUPPLY_NAMES.name_of(row['id']) == name
+                    )
+                    hits = _distinct_vendors([(dist, dict(row)) for dist, _, row in hits], per_item)
+                    results.append((name, scores[name], hits))
+            return results
+        except Exception as e:
+            print(f"⚠️ Supply index tidak tersedia, fallback ke query DB: {e}")
+
+    # Tanpa index: tiap frasa jadi satu query ilike (dibatasi max_items query)
+    groups = {}
+    seen_ids = set()
+    for phrase in query_phrases(text)[:max_items]:
+        for dist, item in _search_suppliers_db(phrase, user_lat, user_long, limit=per_item * 4):
+            if item.get('id') in seen_ids:
+                continue
+            seen_ids.add(item.get('id'))
+            groups.setdefault(normalize_ingredient(item.get('item_name')), []).append((dist, item))
+    return [(name, 1.0, _distinct_vendors(hits, per_item)) for name, hits in groups.items()]
+
+def nearest_supplies(user_lat: float, user_long: float, k: int, radius_km: float = 25.0):
+    """
+    k barang terdekat apa pun namanya (konteks pasar kalau pesan tidak menyebut bahan).
+    Return: list (jarak_km, item).
+    """
+    if SUPPLY_INDEX_ENABLED:
+        try:
+            ensure_supply_index()
+            with _SUPPLY_INDEX_LOCK:
+                hits = _SUPPLY_INDEX.nearest(user_lat, user_long, k=k)
+            return [(dist, dict(row)) for dist, _, row in hits]
+        except Exception as e:
+            print(f"⚠️ Supply index tidak tersedia, fallback ke query DB: {e}")
+    return _search_suppliers_db("", user_lat, user_long, limit=k, radius_km=radius_km)
+
+def _query_hash(params):
+    # Cursor diikat ke query (q, lat, long, radius_km) tanpa perlu snapshot masih ada
+    return content_hash(json.dumps(params))[:16]
+
+def _encode_cursor(snapshot_id, query_hash, offset, dist, item_id):
+    raw = json.dumps({"s": snapshot_id, "q": query_hash, "o": offset, "d": dist, "i": item_id}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+def _decode_cursor(cursor):
+    """Return: (snapshot_id, query_hash, offset, jarak, id) dari cursor."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return data["s"], data["q"], int(data["o"]), float(data["d"]), data["i"]
+    except Exception:
+        raise ValueError("Cursor tidak valid")
+
+def _page_key(dist, item):
+    # Urutan stabil: jarak, lalu id (tie-breaker)
+    return (dist, str(item.get('id')))
+
+def _store_snapshot(ranked, complete, offset):
+    """offset: jumlah hasil query sebelum elemen pertama snapshot ini."""
+    ranked = sorted(ranked, key=lambda r: _page_key(*r))
+    snapshot = {
+        "created_at": time.monotonic(),
+        "keys": [_page_key(dist, item) for dist, item in ranked],
+        "results": ranked,
+        "complete": complete,
+        "offset": offset,
+    }
+    snapshot_id = uuid.uuid4().hex
+    with _SEARCH_SNAPSHOTS_LOCK:
+        _SEARCH_SNAPSHOTS[snapshot_id] = snapshot
+        while len(_SEARCH_SNAPSHOTS) > SEARCH_SNAPSHOT_MAX_ENTRIES:
+            _SEARCH_SNAPSHOTS.popitem(last=False)
+    return snapshot_id, snapshot
+
+def _get_snapshot(snapshot_id):
+    with _SEARCH_SNAPSHOTS_LOCK:
+        snapshot = _SEARCH_SNAPSHOTS.get(snapshot_id)
+        if snapshot and time.monotonic() - snapshot["created_at"] > SEARCH_SNAPSHOT_TTL_SECONDS:
+            del _SEARCH_SNAPSHOTS[snapshot_id]
+            snapshot = None
+        return snapshot
+
+def search_suppliers_page(keyword: str, user_lat: float, user_long: float, page_size: int,
+                          radius_km: float = None, cursor: str = None):
+    """
+    Versi pagination dari search_suppliers (cursor di atas (jarak, id)).
+    - Halaman pertama: hitung hasil urut sekali lalu simpan sebagai snapshot.
+    - Halaman berikutnya: potong dari snapshot mulai setelah posisi cursor.
+    - Snapshot kadaluarsa / habis: query ulang dan lanjut dari (jarak, id) cursor.
+    Return: {"data": [...], "next_cursor": str | None}
+    Raise ValueError jika cursor tidak valid / beda query.
+    """
+    query_hash = _query_hash([keyword, user_lat, user_long, radius_km])
+    after = None
+    offset = 0
+    snapshot_id, snapshot = None, None
+
+    if cursor:
+        snapshot_id, cursor_hash, offset, last_dist, last_id = _decode_cursor(cursor)
+        # Dicek di setiap request, tidak tergantung snapshot masih ada atau tidak
+        if cursor_hash != query_hash:
+            raise ValueError("Cursor bukan milik query ini")
+        after = (last_dist, str(last_id))
+        snapshot = _get_snapshot(snapshot_id)
+
+    if snapshot is not None:
+        start = bisect.bisect_right(snapshot["keys"], after)
+        if start + page_size > len(snapshot["keys"]) and not snapshot["complete"]:
+            # Snapshot terpotong (maks SEARCH_SNAPSHOT_MAX_RESULTS): lanjutkan dengan query baru
+            snapshot = None
+
+    if snapshot is None:
+        print(f"🔍 Snapshot baru untuk '{keyword}' dekat {user_lat}, {user_long}")
+        # Cukup ambil sampai melewati posisi cursor + satu snapshot penuh
+        fetch = offset + SEARCH_SNAPSHOT_MAX_RESULTS
+        ranked = _ranked_suppliers(keyword, user_lat, user_long, fetch, radius_km)
+        complete = len(ranked) < fetch
+        if after is not None:
+            ranked = [r for r in ranked if _page_key(*r) > after]
+        complete = complete and len(ranked) <= SEARCH_SNAPSHOT_MAX_RESULTS
+        snapshot_id, snapshot = _store_snapshot(ranked[:SEARCH_SNAPSHOT_MAX_RESULTS], complete, offset)
+        start = 0
+
+    page = snapshot["results"][start:start + page_size]
+    has_more = start + page_size < len(snapshot["results"]) or not snapshot["complete"]
+
+    next_cursor = None
+    if page and has_more:
+        last_dist, last_item = page[-1]
+        next_offset = snapshot["offset"] + start + len(page)
+        next_cursor = _encode_cursor(snapshot_id, query_hash, next_offset, last_dist, last_item.get('id'))
+
+    return {"data": [item for _, item in page], "next_cursor": next_cursor}
+
+def search_nearest_sppg(user_lat: float, user_long: float, k: int = 10, radius_km: float = None):
     """
     Cari SPPG terdekat dari lokasi user (Vendor).
+    Lookup ke tabel jarak vendor-SPPG (precomputed, fallback KD-tree registry).
     """
-    results = []
-    for sppg in SPPG_LOCATIONS:
-        dist = haversine_distance(user_lat, user_long, sppg['lat'], sppg['long'])
-        sppg_copy = sppg.copy()
-        sppg_copy['distance_km'] = round(dist, 2)
-        results.append(sppg_copy)
-    
-    # Urutkan dari yang terdekat
-    results.sort(key=lambda x: x['distance_km'])
-    return results
+    return nearest_sppg_table.lookup(user_lat, user_long, k=k, radius_km=radius_km)
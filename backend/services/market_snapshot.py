@@ -0,0 +1,139 @@
+import os
+import threading
+import time
+from .cache import content_hash
+from .logistics import supply_catalog_version, supply_item_vendor_counts
+
+# --- SNAPSHOT KATALOG PASAR UNTUK PROMPT ---
+# Daftar barang yang dijual vendor mitra, dirakit sekali lalu dipakai ulang
+# sebagai AWAL prompt chat chef & rekomendasi menu. Teksnya byte-stabil (urut
+# abjad, tanpa jarak/jumlah/waktu), jadi selama katalog tidak berubah awalan
+# prompt selalu sama dan bisa kena prompt caching di sisi provider.
+# Kalau barang lebih dari MARKET_SNAPSHOT_MAX_ITEMS, yang masuk adalah barang
+# yang dijual paling banyak vendor, dan prompt diberi tahu daftarnya terpotong.
+# Dibangun ulang tiap MARKET_SNAPSHOT_TTL_SECONDS, atau saat katalog berubah
+# (paling cepat tiap MARKET_SNAPSHOT_MIN_INTERVAL_SECONDS supaya tidak bolak-balik).
+MARKET_SNAPSHOT_TTL_SECONDS = float(os.getenv("MARKET_SNAPSHOT_TTL_SECONDS", "600"))
+MARKET_SNAPSHOT_MIN_INTERVAL_SECONDS = float(os.getenv("MARKET_SNAPSHOT_MIN_INTERVAL_SECONDS", "60"))
+MARKET_SNAPSHOT_MAX_ITEMS = int(os.getenv("MARKET_SNAPSHOT_MAX_ITEMS", "200"))
+
+def render_snapshot(names, version, truncated=False):
+    items = ", ".join(name.title() for name in names) or "(kosong)"
+    note = (
+        f"Daftar ini hanya {len(names)} barang yang dijual paling banyak vendor; "
+        "barang yang tidak tercantum BELUM TENTU tidak tersedia.\n"
+    ) if truncated else ""
+    return (
+        f"KATALOG PASAR VENDOR MITRA BEKAL BANGSA (versi {version}):\n"
+        f"Barang yang saat ini dijual vendor mitra: {items}.\n"
+        f"{note}"
+        "Jarak dan vendor terdekat untuk bahan tertentu diberikan terpisah jika relevan.\n"
+    )
+
+def top_items(vendor_counts, max_items):
+    """
+    Pilih max_items barang dengan vendor terbanyak (seri -> abjad), lalu urutkan
+    abjad supaya teksnya tidak ikut berubah saat jumlah vendor bergeser.
+    Return: (nama barang, True kalau ada barang yang tidak masuk)
+    """
+    ranked = sorted(vendor_counts.items(), key=lambda kv: (-kv[1], kv[0]))
+    return sorted(name for name, _ in ranked[:max_items]), len(ranked) > max_items
+
+class MarketSnapshot:
+    """
+    Teks katalog pasar yang dipakai ulang antar request. Versi = hash isi,
+    jadi rebuild tanpa perubahan katalog menghasilkan teks & versi yang sama.
+    """
+
+    def __init__(self, ttl_seconds=MARKET_SNAPSHOT_TTL_SECONDS,
+                 min_interval_seconds=MARKET_SNAPSHOT_MIN_INTERVAL_SECONDS, max_items=MARKET_SNAPSHOT_MAX_ITEMS):
+        self.ttl_seconds = ttl_seconds
+        self.min_interval_seconds = min_interval_seconds
+        self.max_items = max_items
+        self._lock = threading.Lock()
+        self._built = threading.Condition(self._lock)
+        self._building = False  # satu thread yang merakit ulang, sisanya pakai teks lama
+        self._text = None
+        self._version = None
+        self._built_at = None
+        self._catalog_version = None
+        self.hits = 0      # request yang memakai snapshot yang sudah ada
+        self.builds = 0    # snapshot dirakit ulang
+        self.changes = 0   # rakit ulang yang menghasilkan versi baru
+
+    def _stale(self, now):
+        if self._text is None:
+            return True
+        age = now - self._built_at
+        if age >= self.ttl_seconds:
+            return True
+        return age >= self.min_interval_seconds and supply_catalog_version() != self._catalog_version
+
+    def _build(self):
+        """Rakit snapshot dari katalog (bisa query DB). Dipanggil TANPA lock."""
+        catalog_version = supply_catalog_version()
+        vendor_counts = supply_item_vendor_counts()
+        names, truncated = top_items(vendor_counts, self.max_items)
+        version = content_hash("\n".join(names) + ("\n..." if truncated else ""))[:12]
+        return catalog_version, names, truncated, version, len(vendor_counts)
+
+    def _apply(self, now, built):
+        catalog_version, names, truncated, version, total = built
+        self.builds += 1
+        if version != self._version:
+            self.changes += 1
+            self._text = render_snapshot(names, version, truncated)
+            self._version = version
+            print(f"🧾 Snapshot pasar versi {version}: {len(names)} dari {total} barang")
+        self._built_at = now
+        self._catalog_version = catalog_version
+
+    def get(self):
+        """
+        Return: (teks snapshot, versi). Rebuild dilakukan di luar lock oleh satu
+        thread; request lain tetap dapat snapshot lama (hanya request pertama
+        sebelum ada snapshot sama sekali yang menunggu). Kalau rebuild gagal,
+        snapshot lama tetap dipakai.
+        """
+        with self._lock:
+            while True:
+                if not self._stale(time.monotonic()):
+                    self.hits += 1
+                    return self._text, self._version
+                if not self._building:
+                    self._building = True
+                    break
+                if self._text is not None:
+                    self.hits += 1
+                    return self._text, self._version
+                self._built.wait()
+
+        try:
+            built = self._build()
+        except Exception as e:
+            with self._lock:
+                self._building = False
+                self._built.notify_all()
+                if self._text is None:
+                    raise
+                print(f"⚠️ Gagal rebuild snapshot pasar, pakai versi {self._version}: {e}")
+                self._built_at = time.monotonic()
+                return self._text, self._version
+
+        with self._lock:
+            self._apply(time.monotonic(), built)
+            self._building = False
+            self._built.notify_all()
+            return self._text, self._version
+
+    def stats(self):
+        with self._lock:
+            return {
+                "version": self._version,
+                "age_seconds": None if self._built_at is None else round(time.monotonic() - self._built_at, 1),
+                "hits": self.hits,
+                "builds": self.builds,
+                "changes": self.changes,
+            }
+
+market_snapshot = MarketSnapshot()
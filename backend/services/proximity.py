@@ -0,0 +1,167 @@
+import os
+import threading
+from collections import OrderedDict
+from .geo import haversine_batch
+from .sppg import sppg_registry
+
+# --- TABEL JARAK VENDOR -> SPPG (SPARSE NEAREST-K) ---
+# Untuk setiap lokasi vendor disimpan K SPPG terdekat beserta jaraknya.
+# Notifikasi & pencarian SPPG cukup lookup ke tabel ini; tabel diupdate
+# inkremental saat vendor daftar/pindah lokasi atau jaringan SPPG berubah.
+PROXIMITY_K = int(os.getenv("SPPG_PROXIMITY_K", "10"))
+PROXIMITY_MAX_ENTRIES = int(os.getenv("SPPG_PROXIMITY_MAX_ENTRIES", "50000"))
+
+def location_key(lat, lon):
+    # Dibulatkan 4 desimal (~11 m) supaya lokasi yang sama berbagi satu baris
+    return (round(float(lat), 4), round(float(lon), 4))
+
+class NearestSppgTable:
+
+    def __init__(self, registry, k=PROXIMITY_K, max_entries=PROXIMITY_MAX_ENTRIES):
+        self.registry = registry
+        self.k = k
+        self.max_entries = max_entries
+        self._lock = threading.RLock()
+        self._entries = OrderedDict()  # location_key -> [(distance_km, sppg_id), ...]
+        self._vendor_keys = {}         # vendor_id -> location_key
+        self._registry_version = registry.version  # versi registry yang sudah tercermin di tabel
+        registry.add_listener(self.on_sppg_change)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _compute(self, key):
+        hits = self.registry.raw_nearest(key[0], key[1], self.k)
+        return [(dist, sppg_id) for dist, sppg_id, _ in hits]
+
+    def _store(self, key, hits):
+        with self._lock:
+            self._entries[key] = hits
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _sync(self):
+        """
+        Jalankan hot reload registry (sekali per reload_interval). Perubahan
+        masuk lewat on_sppg_change; kalau versi registry tetap beda (listener
+        gagal), seluruh tabel dibuang supaya tidak ada baris basi.
+        """
+        self.registry.maybe_reload()
+        version = self.registry.version
+        if version != self._registry_version:
+            with self._lock:
+                self._entries.clear()
+                self._registry_version = version
+
+    def _entry(self, key):
+        with self._lock:
+            hits = self._entries.get(key)
+            if hits is not None:
+                self._entries.move_to_end(key)
+                return hits
+        # Miss: hitung via KD-tree (di luar lock, registry bisa reload)
+        hits = self._compute(key)
+        self._store(key, hits)
+        return hits
+
+    def register_vendor(self, vendor_id, lat, lon):
+        """
+        Dipanggil saat vendor daftar / ganti lokasi: hitung baris vendor sekarang.
+        """
+        if lat is None or lon is None:
+            return
+        key = location_key(lat, lon)
+        with self._lock:
+            self._vendor_keys[vendor_id] = key
+        self._entry(key)
+
+    def lookup(self, lat, lon, k=None, radius_km=None):
+        """
+        SPPG terdekat dari (lat, lon) dari tabel (maks self.k).
+        Return: list dict SPPG + distance_km, urut dari yang terdekat.
+        """
+        self._sync()
+        k = self.k if k is None else k
+        if k > self.k:
+            # Lebih dari yang disimpan tabel: tanya KD-tree langsung
+            if radius_km is not None:
+                return self.registry.within(lat, lon, radius_km, k)
+            return self.registry.nearest(lat, lon, k)
+
+        hits = self._entry(location_key(lat, lon))
+        if radius_km is not None:
+            hits = [h for h in hits if h[0] <= radius_km]
+        return self._format(hits[:k])
+
+    def lookup_vendor(self, vendor_id, lat, lon, k=1):
+        """
+        Lookup untuk vendor tertentu. Jika koordinat vendor berbeda dari yang
+        tercatat (vendor pindah lokasi), barisnya diupdate dulu.
+        """
+        if lat is None or lon is None:
+            return []
+        self._sync()
+        key = location_key(lat, lon)
+        with self._lock:
+            moved = self._vendor_keys.get(vendor_id) != key
+        if moved:
+            self.register_vendor(vendor_id, lat, lon)
+        return self.lookup(lat, lon, k)
+
+    def _format(self, hits):
+        results = []
+        for dist, sppg_id in hits:
+            site = self.registry.get(sppg_id)
+            if site is None:
+                continue
+            site_copy = dict(site)
+            site_copy['distance_km'] = round(dist, 2)
+            results.append(site_copy)
+        return results
+
+    def on_sppg_change(self, old_sites, new_sites):
+        """
+        Update inkremental saat jaringan SPPG berubah:
+        - SPPG baru: jaraknya ke semua lokasi dihitung sekaligus (vektor) lalu
+          di-merge ke top-K masing-masing baris.
+        - SPPG dihapus / pindah: hanya baris yang memuat SPPG itu dihitung ulang.
+        """
+        def moved(sid):
+            old, new = old_sites[sid], new_sites[sid]
+            return (old.get("lat"), old.get("long")) != (new.get("lat"), new.get("long"))
+
+        removed = {sid for sid in old_sites if sid not in new_sites or moved(sid)}
+        added = [sid for sid in new_sites if sid not in old_sites or moved(sid)]
+
+        with self._lock:
+            keys = list(self._entries.keys())
+            stale = []
+            for key in keys:
+                hits = self._entries[key]
+                if removed and any(sppg_id in removed for _, sppg_id in hits):
+                    stale.append(key)
+
+            if added and keys:
+                lats = [key[0] for key in keys]
+                longs = [key[1] for key in keys]
+                for sid in added:
+                    site = new_sites[sid]
+                    dists = haversine_batch(site["lat"], site["long"], lats, longs).tolist()
+                    for key, dist in zip(keys, dists):
+                        hits = self._entries[key]
+                        if len(hits) < self.k or dist < hits[-1][0]:
+                            merged = sorted(hits + [(dist, sid)])[:self.k]
+                            self._entries[key] = merged
+
+            for key in stale:
+                del self._entries[key]
+
+        # Baris yang memuat SPPG terhapus dihitung ulang (di luar lock)
+        for key in stale:
+            self._store(key, self._compute(key))
+        self._registry_version = self.registry.version
+
+        print(f"📐 Tabel jarak vendor-SPPG diupdate: +{len(added)} / -{len(removed)} SPPG, {len(stale)} baris dihitung ulang")
+
+nearest_sppg_table = NearestSppgTable(sppg_registry)
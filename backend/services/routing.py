@@ -0,0 +1,185 @@
+import os
+import threading
+import numpy as np
+import time
+from collections import OrderedDict
+from .clients import supabase
+from .geo import haversine_matrix
+from .geocoding import geocode_address
+from .proximity import location_key
+
+# --- PERENCANAAN RUTE PICKUP KITCHEN ---
+# Nearest-neighbour untuk tur awal, lalu diperbaiki dengan 2-opt (kandidat
+# dibatasi ke K tetangga terdekat tiap titik) dalam batas waktu tertentu.
+ROUTE_TIME_BUDGET_SECONDS = float(os.getenv("ROUTE_TIME_BUDGET_SECONDS", "0.3"))
+ROUTE_NEIGHBOURS = 12
+ROUTE_MATRIX_CACHE_SIZE = 128
+
+_MATRIX_CACHE = OrderedDict()  # tuple(location_key) -> (matriks jarak, daftar tetangga)
+_MATRIX_CACHE_LOCK = threading.Lock()
+
+def distance_matrix(keys, neighbours=ROUTE_NEIGHBOURS):
+    """
+    Matriks jarak antar lokasi (list of list km) + K tetangga terdekat tiap titik,
+    di-cache per himpunan lokasi supaya membuka halaman order berkali-kali
+    tidak menghitung ulang.
+    Return: (dist, near)
+    """
+    cache_key = (tuple(keys), neighbours)
+    with _MATRIX_CACHE_LOCK:
+        cached = _MATRIX_CACHE.get(cache_key)
+        if cached is not None:
+            _MATRIX_CACHE.move_to_end(cache_key)
+            return cached
+
+    matrix = haversine_matrix([k[0] for k in keys], [k[1] for k in keys])
+    # Diagonal ditutup dulu: dengan titik kembar (jarak 0) titik itu sendiri
+    # belum tentu ada di kolom 0 hasil argsort
+    masked = matrix.copy()
+    np.fill_diagonal(masked, np.inf)
+    order = np.argsort(masked, axis=1, kind="stable")[:, :min(neighbours, len(keys) - 1)]
+    cached = (matrix.tolist(), order.tolist())
+    with _MATRIX_CACHE_LOCK:
+        _MATRIX_CACHE[cache_key] = cached
+        while len(_MATRIX_CACHE) > ROUTE_MATRIX_CACHE_SIZE:
+            _MATRIX_CACHE.popitem(last=False)
+    return cached
+
+def tour_length(tour, dist):
+    return sum(dist[tour[i]][tour[i + 1]] for i in range(len(tour) - 1))
+
+def nearest_neighbour_tour(dist, start=0):
+    """Tur tertutup: mulai & selesai di `start`, selalu ke titik terdekat berikutnya."""
+    n = len(dist)
+    unvisited = set(range(n)) - {start}
+    tour = [start]
+    current = start
+    while unvisited:
+        row = dist[current]
+        current = min(unvisited, key=row.__getitem__)
+        unvisited.remove(current)
+        tour.append(current)
+    tour.append(start)
+    return tour
+
+def two_opt(tour, dist, near, time_budget=ROUTE_TIME_BUDGET_SECONDS):
+    """
+    Perbaiki tur tertutup dengan 2-opt. Pasangan sisi yang dicoba hanya
+    yang menghubungkan titik ke salah satu tetangga terdekatnya (`near`).
+    Berhenti saat tidak ada perbaikan lagi atau batas waktu habis.
+    """
+    n = len(tour) - 1  # titik unik (titik awal muncul lagi di ujung)
+    if n < 4:
+        return tour
+
+    tour = list(tour)
+    pos = {node: idx for idx, node in enumerate(tour[:-1])}
+    deadline = time.perf_counter() + time_budget
+
+    improved = True
+    while improved and time.perf_counter() < deadline:
+        improved = False
+        for i in range(n):
+            a, b = tour[i], tour[i + 1]
+            d_ab = dist[a][b]
+            for c in near[a]:
+                if c == a:
+                    continue
+                d_ac = dist[a][c]
+                if d_ac >= d_ab:
+                    break  # tetangga berikutnya pasti lebih jauh
+                j = pos[c]
+                d = tour[j + 1]
+                if c == b or d == a:
+                    continue
+                # Ganti sisi (a,b) & (c,d) dengan (a,c) & (b,d)
+                if d_ac + dist[b][d] - d_ab - dist[c][d] < -1e-9:
+                    lo, hi = (i + 1, j) if i < j else (j + 1, i)
+                    tour[lo:hi + 1] = tour[lo:hi + 1][::-1]
+                    for idx in range(lo, hi + 1):
+                        pos[tour[idx]] = idx
+                    improved = True
+                    break
+            if time.perf_counter() >= deadline:
+                break
+    return tour
+
+def plan_tour(points, start_index=0, time_budget=ROUTE_TIME_BUDGET_SECONDS):
+    """
+    points: list (lat, lon). Return: (urutan index tur tertutup, total km).
+    """
+    keys = [location_key(lat, lon) for lat, lon in points]
+    dist, near = distance_matrix(keys)
+    tour = nearest_neighbour_tour(dist, start_index)
+    tour = two_opt(tour, dist, near, time_budget)
+    return tour, tour_length(tour, dist), dist
+
+def plan_pickup_route(kitchen_id: int):
+    """
+    Rute pickup untuk semua order 'confirmed' milik kitchen:
+    order dikelompokkan per lokasi vendor, lalu disusun jadi satu tur
+    (Dapur -> vendor-vendor -> kembali ke Dapur).
+    """
+    started = time.perf_counter()
+    try:
+        user_res = supabase.table("users").select("latitude, longitude").eq("id", kitchen_id).single().execute()
+        kitchen = user_res.data or {}
+        k_lat = kitchen.get('latitude') or -6.175392
+        k_long = kitchen.get('longitude') or 106.827153
+
+        orders_res = supabase.table("orders")\
+            .select("id, qty_ordered, status, seller_id, supply_id, supplies(item_name, unit, owner_name, location, latitude, longitude)")\
+            .eq("buyer_id", kitchen_id)\
+            .eq("status", "confirmed")\
+            .execute()
+        orders = orders_res.data or []
+    except Exception as e:
+        print(f"❌ Error ambil data rute: {e}")
+        return {"error": "Gagal mengambil data order"}
+
+    # Kelompokkan order per lokasi vendor (satu stop per titik)
+    stops = OrderedDict()
+    for order in orders:
+        supply = order.get('supplies') or {}
+        lat, lon = supply.get('latitude'), supply.get('longitude')
+        if lat is None or lon is None:
+            point = geocode_address(supply.get('location'))
+            lat, lon = point['lat'], point['lon']
+        key = location_key(lat, lon)
+        stop = stops.setdefault(key, {
+            "lat": lat,
+            "long": lon,
+            "vendor": supply.get('owner_name'),
+            "address": supply.get('location'),
+            "orders": []
+        })
+        stop["orders"].append({
+            "order_id": order['id'],
+            "item_name": supply.get('item_name'),
+            "qty": order.get('qty_ordered'),
+            "unit": supply.get('unit')
+        })
+
+    start = {"lat": k_lat, "long": k_long}
+    if not stops:
+        return {"status": "success", "start": start, "stops": [], "total_km": 0, "planning_ms": 0}
+
+    stop_list = list(stops.values())
+    points = [(k_lat, k_long)] + [(s["lat"], s["long"]) for s in stop_list]
+    tour, total_km, dist = plan_tour(points)
+
+    route = []
+    for seq, (prev, node) in enumerate(zip(tour[:-2], tour[1:-1]), start=1):
+        stop = dict(stop_list[node - 1])
+        stop["sequence"] = seq
+        stop["leg_km"] = round(dist[prev][node], 2)
+        route.append(stop)
+
+    return {
+        "status": "success",
+        "start": start,
+        "stops": route,
+        "return_leg_km": round(dist[tour[-2]][tour[-1]], 2),
+        "total_km": round(total_km, 2),
+        "planning_ms": round((time.perf_counter() - started) * 1000, 1)
+    }
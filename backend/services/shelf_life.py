@@ -0,0 +1,142 @@
+import atexit
+import copy
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+# --- TABEL UMUR SIMPAN MASAKAN (PERSISTEN) ---
+# Nama menu ter-normalisasi -> hasil analisis safety (room_temp_hours, fridge_hours,
+# storage_tips, nutrition). Diisi dari Claude saat menu pertama kali dimasak,
+# disimpan ke file JSON supaya tahan restart.
+MEAL_EXPIRY_STORE_PATH = Path(os.getenv(
+    "MEAL_EXPIRY_STORE_PATH",
+    str(Path(__file__).parent.parent / ".cache" / "meal_expiry.json")
+))
+# Setelah TTL, entri masih dipakai (stale) tapi di-refresh di background
+MEAL_EXPIRY_TTL_SECONDS = float(os.getenv("MEAL_EXPIRY_TTL_SECONDS", str(30 * 24 * 3600)))
+# Entri baru ditulis ke file paling cepat sekali per interval ini (debounce)
+MEAL_EXPIRY_FLUSH_SECONDS = float(os.getenv("MEAL_EXPIRY_FLUSH_SECONDS", "5"))
+
+def menu_key(menu_name) -> str:
+    """
+    Key tabel: "Sayur Asem " dan "sayur  ASEM" dianggap menu yang sama.
+    Hanya huruf kecil + spasi dirapikan: sinonim bahan (normalize_ingredient)
+    sengaja tidak dipakai supaya menu yang berbeda tidak jatuh ke key yang sama.
+    """
+    return " ".join(str(menu_name or "").lower().split())
+
+class ShelfLifeStore:
+    """
+    Tabel menu -> analisis safety, dengan TTL dan file JSON sebagai penyimpanan.
+    """
+
+    def __init__(self, path=MEAL_EXPIRY_STORE_PATH, ttl_seconds=MEAL_EXPIRY_TTL_SECONDS):
+        self.path = Path(path)
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()  # satu penulis file sekaligus
+        self._entries = None  # key -> {"menu_name", "analysis", "updated_at"}
+        self._dirty = False
+        self._timer = None
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._load())
+
+    def _load(self):
+        if self._entries is None:
+            try:
+                with open(self.path, encoding="utf-8") as f:
+                    # Key dihitung ulang dari nama menu (file lama memakai normalize_ingredient)
+                    self._entries = {menu_key(e["menu_name"]): e for e in json.load(f).values()}
+            except (FileNotFoundError, json.JSONDecodeError):
+                self._entries = {}
+            except OSError as e:
+                print(f"⚠️ Gagal baca tabel umur simpan: {e}")
+                self._entries = {}
+        return self._entries
+
+    def _save(self, entries):
+        # Tulis ke file sementara lalu rename (atomic) biar file tidak korup
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(f".{os.getpid()}.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(entries, f, ensure_ascii=False, sort_keys=True)
+        os.replace(tmp_path, self.path)
+
+    def flush(self):
+        """
+        Tulis tabel ke file kalau ada perubahan. Dipanggil timer debounce,
+        setelah warming, dan saat proses keluar.
+        """
+        with self._write_lock:
+            with self._lock:
+                self._timer = None
+                if not self._dirty:
+                    return
+                entries = dict(self._entries)
+                self._dirty = False
+            # I/O di luar _lock: get/put tetap jalan selama file ditulis
+            try:
+                self._save(entries)
+            except OSError as e:
+                print(f"⚠️ Gagal simpan tabel umur simpan: {e}")
+                with self._lock:
+                    self._dirty = True
+
+    def _schedule_flush(self):
+        # Dipanggil dengan _lock dipegang
+        self._dirty = True
+        if self._timer is None:
+            self._timer = threading.Timer(MEAL_EXPIRY_FLUSH_SECONDS, self.flush)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def is_fresh(self, menu_name) -> bool:
+        with self._lock:
+            entry = self._load().get(menu_key(menu_name))
+            return entry is not None and time.time() - entry["updated_at"] <= self.ttl_seconds
+
+    def get(self, menu_name):
+        """
+        Return: (analisis atau None, fresh: bool).
+        Entri yang lewat TTL tetap dikembalikan dengan fresh=False.
+        """
+        with self._lock:
+            entry = self._load().get(menu_key(menu_name))
+            if entry is None:
+                self.misses += 1
+                return None, False
+            fresh = time.time() - entry["updated_at"] <= self.ttl_seconds
+            if fresh:
+                self.hits += 1
+            else:
+                self.stale_hits += 1
+            return copy.deepcopy(entry["analysis"]), fresh
+
+    def put(self, menu_name, analysis):
+        with self._lock:
+            self._load()[menu_key(menu_name)] = {
+                "menu_name": menu_name,
+                "analysis": copy.deepcopy(analysis),
+                "updated_at": time.time(),
+            }
+            self._schedule_flush()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._load()),
+                "hits": self.hits,
+                "stale_hits": self.stale_hits,
+                "misses": self.misses,
+                "ttl_seconds": self.ttl_seconds,
+                "path": str(self.path),
+            }
+
+shelf_life_store = ShelfLifeStore()
+atexit.register(shelf_life_store.flush)
@@ -0,0 +1,243 @@
+import heapq
+import math
+from .geo import haversine_batch, EARTH_RADIUS_KM, KM_PER_DEGREE
+
+class GridIndex:
+    """
+    Spatial index sederhana berbasis grid (bucket per sel lat/long).
+    Setiap titik dimasukkan ke sel ukuran `cell_deg` derajat, lalu query
+    "N terdekat dalam R km" cukup memeriksa sel dari ring terdalam ke luar
+    dan berhenti begitu ring berikutnya pasti lebih jauh dari hasil ke-N.
+    """
+
+    def __init__(self, cell_deg: float = 0.01):
+        self.cell_deg = cell_deg
+        self._cells = {}    # (ix, iy) -> set(key)
+        self._points = {}   # key -> (lat, lon, cell, payload)
+
+    def __len__(self):
+        return len(self._points)
+
+    def __contains__(self, key):
+        return key in self._points
+
+    def _cell_of(self, lat, lon):
+        return (math.floor(lat / self.cell_deg), math.floor(lon / self.cell_deg))
+
+    def insert(self, key, lat, lon, payload=None):
+        """Tambah / update titik. Key yang sama akan dipindah ke sel barunya."""
+        if key in self._points:
+            self.remove(key)
+        cell = self._cell_of(lat, lon)
+        self._cells.setdefault(cell, set()).add(key)
+        self._points[key] = (lat, lon, cell, payload)
+
+    def remove(self, key):
+        entry = self._points.pop(key, None)
+        if entry is None:
+            return False
+        cell = entry[2]
+        bucket = self._cells.get(cell)
+        if bucket is not None:
+            bucket.discard(key)
+            if not bucket:
+                del self._cells[cell]
+        return True
+
+    def get(self, key):
+        entry = self._points.get(key)
+        return entry[3] if entry else None
+
+    def clear(self):
+        self._cells.clear()
+        self._points.clear()
+
+    def _ring_cells(self, center, r):
+        """Sel-sel yang berjarak Chebyshev tepat `r` dari sel pusat."""
+        cx, cy = center
+        if r == 0:
+            yield center
+            return
+        for dx in range(-r, r + 1):
+            yield (cx + dx, cy - r)
+            yield (cx + dx, cy + r)
+        for dy in range(-r + 1, r):
+            yield (cx - r, cy + dy)
+            yield (cx + r, cy + dy)
+
+    def _ring_lower_bound_km(self, r, lat):
+        """
+        Jarak minimum (km) titik mana pun di ring >= r+1 dari query.
+        Pakai cos lintang paling jauh dari ekuator supaya batasnya konservatif.
+        """
+        if r <= 0:
+            return 0.0
+        worst_lat = min(90.0, abs(lat) + (r + 1) * self.cell_deg)
+        lon_factor = max(math.cos(math.radians(worst_lat)), 0.0)
+        return r * self.cell_deg * KM_PER_DEGREE * lon_factor
+
+    def nearest(self, lat, lon, k=None, radius_km=None, predicate=None):
+        """
+        Cari titik terdekat dari (lat, lon).
+        - k: jumlah hasil maksimum (None = semua)
+        - radius_km: batas jarak (None = tanpa batas)
+        - predicate: filter payload, misal cocok keyword
+        Return: list (distance_km, key, payload) urut dari yang terdekat.
+        """
+        if not self._points or k == 0:
+            return []
+
+        center = self._cell_of(lat, lon)
+        # Max-heap terbatas (pakai jarak negatif) untuk top-k
+        best = []
+        counter = 0
+        visited = 0
+
+        def consider(keys):
+            # Jarak dihitung sekaligus per ring (vektor), bukan per titik
+            nonlocal counter
+            candidates = []
+            for key in keys:
+                payload = self._points[key][3]
+                if predicate is None or predicate(payload):
+                    candidates.append(key)
+            if not candidates:
+                return
+            dists = haversine_batch(
+                lat, lon,
+                [self._points[key][0] for key in candidates],
+                [self._points[key][1] for key in candidates]
+            )
+            for key, dist in zip(candidates, dists.tolist()):
+                if radius_km is not None and dist > radius_km:
+                    continue
+                counter += 1
+                item = (-dist, -counter, key, self._points[key][3])
+                if k is None or len(best) < k:
+                    heapq.heappush(best, item)
+                elif dist < -best[0][0]:
+                    heapq.heapreplace(best, item)
+
+        r = 0
+        while visited < len(self._cells):
+            # Kalau ring sudah lebih besar dari jumlah sel terisi, lebih murah scan sisa sel langsung
+            if 8 * r > len(self._cells):
+                cx, cy = center
+                consider([
+                    key
+                    for cell, bucket in self._cells.items()
+                    if max(abs(cell[0] - cx), abs(cell[1] - cy)) >= r
+                    for key in bucket
+                ])
+                break
+
+            ring_keys = []
+            for cell in self._ring_cells(center, r):
+                bucket = self._cells.get(cell)
+                if bucket:
+                    visited += 1
+                    ring_keys.extend(bucket)
+            consider(ring_keys)
+
+            bound = self._ring_lower_bound_km(r, lat)
+            if radius_km is not None and bound > radius_km:
+                break
+            if k is not None and len(best) >= k and -best[0][0] <= bound:
+                break
+            r += 1
+
+        results = sorted(best, key=lambda x: (-x[0], -x[1]))
+        return [(-neg_dist, key, payload) for neg_dist, _, key, payload in results]
+
+def _to_unit_vector(lat, lon):
+    lat_r = math.radians(lat)
+    lon_r = math.radians(lon)
+    return (
+        math.cos(lat_r) * math.cos(lon_r),
+        math.cos(lat_r) * math.sin(lon_r),
+        math.sin(lat_r),
+    )
+
+def _chord_to_km(chord):
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, chord / 2))
+
+def _km_to_chord(km):
+    return 2 * math.sin(min(math.pi, km / EARTH_RADIUS_KM) / 2)
+
+class KDTree:
+    """
+    KD-tree statis untuk titik lat/long.
+    Titik diubah ke vektor 3D di bola satuan, sehingga jarak Euclid (chord)
+    naik-turun searah dengan jarak great-circle dan pruning tetap benar
+    di dekat meridian 180 / kutub. Dibangun ulang utuh saat data berubah.
+    """
+
+    def __init__(self, points):
+        """points: iterable (key, lat, lon, payload)"""
+        self._items = [
+            (_to_unit_vector(lat, lon), key, payload)
+            for key, lat, lon, payload in points
+        ]
+        # Node: (index item, axis, kiri, kanan)
+        self._root = self._build(list(range(len(self._items))), 0)
+
+    def __len__(self):
+        return len(self._items)
+
+    def _build(self, indices, depth):
+        if not indices:
+            return None
+        axis = depth % 3
+        indices.sort(key=lambda i: self._items[i][0][axis])
+        mid = len(indices) // 2
+        return (
+            indices[mid],
+            axis,
+            self._build(indices[:mid], depth + 1),
+            self._build(indices[mid + 1:], depth + 1),
+        )
+
+    def _search(self, target, k, max_chord):
+        # Max-heap (chord negatif) berisi kandidat terbaik sejauh ini
+        best = []
+
+        def limit():
+            if k is not None and len(best) >= k:
+                return -best[0][0]
+            return max_chord
+
+        def visit(node):
+            if node is None:
+                return
+            idx, axis, left, right = node
+            vec = self._items[idx][0]
+            chord = math.dist(vec, target)
+            if chord <= limit():
+                item = (-chord, -idx)
+                if k is not None and len(best) >= k:
+                    heapq.heapreplace(best, item)
+                else:
+                    heapq.heappush(best, item)
+
+            diff = target[axis] - vec[axis]
+            near, far = (left, right) if diff < 0 else (right, left)
+            visit(near)
+            if abs(diff) <= limit():
+                visit(far)
+
+        visit(self._root)
+        ordered = sorted(best, key=lambda x: (-x[0], -x[1]))
+        return [
+            (_chord_to_km(-neg_chord), self._items[-neg_idx][1], self._items[-neg_idx][2])
+            for neg_chord, neg_idx in ordered
+        ]
+
+    def nearest(self, lat, lon, k=1):
+        """Return: list (distance_km, key, payload) untuk k titik terdekat."""
+        if k is not None and k <= 0:
+            return []
+        return self._search(_to_unit_vector(lat, lon), k, float("inf"))
+
+    def within(self, lat, lon, radius_km, k=None):
+        """Return: semua titik (maks k) dalam radius_km, urut dari yang terdekat."""
+        return self._search(_to_unit_vector(lat, lon), k, _km_to_chord(radius_km))
@@ -0,0 +1,136 @@
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from .clients import supabase
+from .spatial import KDTree
+
+# --- REGISTRY JARINGAN SPPG ---
+# Sumber data: file JSON (default) atau tabel Supabase (SPPG_SOURCE=table).
+# Data dimuat ke KD-tree saat startup dan dimuat ulang otomatis (hot reload)
+# jika file berubah / interval reload terlewati.
+SPPG_SOURCE = os.getenv("SPPG_SOURCE", "file")
+SPPG_DATA_PATH = Path(os.getenv(
+    "SPPG_DATA_PATH",
+    str(Path(__file__).parent.parent / "data" / "sppg_locations.json")
+))
+SPPG_TABLE = os.getenv("SPPG_TABLE", "sppg_locations")
+SPPG_RELOAD_INTERVAL_SECONDS = int(os.getenv("SPPG_RELOAD_INTERVAL_SECONDS", "30"))
+
+class SppgRegistry:
+    """
+    Menyimpan daftar SPPG + KD-tree untuk query k-terdekat dan dalam-radius.
+    """
+
+    def __init__(self, source=SPPG_SOURCE, path=SPPG_DATA_PATH, table=SPPG_TABLE,
+                 reload_interval=SPPG_RELOAD_INTERVAL_SECONDS):
+        self.source = source
+        self.path = Path(path)
+        self.table = table
+        self.reload_interval = reload_interval
+        self._lock = threading.Lock()
+        self._tree = KDTree([])
+        self._sites = {}
+        self._version = 0
+        self._loaded_mtime = None
+        self._checked_at = None
+        self._listeners = []
+
+    @property
+    def version(self):
+        return self._version
+
+    def sites(self):
+        return list(self._sites.values())
+
+    def get(self, sppg_id):
+        return self._sites.get(sppg_id)
+
+    def add_listener(self, callback):
+        """
+        callback(old_sites, new_sites) dipanggil setiap kali data SPPG berubah
+        (dipakai tabel jarak vendor-SPPG untuk update inkremental).
+        """
+        self._listeners.append(callback)
+
+    def _read_source(self):
+        if self.source == "table":
+            response = supabase.table(self.table).select("*").execute()
+            return response.data or []
+        with open(self.path, encoding="utf-8") as f:
+            return json.load(f)
+
+    def load(self):
+        """
+        Muat ulang data SPPG dari sumber dan bangun ulang KD-tree.
+        """
+        mtime = self.path.stat().st_mtime if self.source == "file" else None
+        rows = self._read_source()
+        sites = {
+            row["id"]: row
+            for row in rows
+            if row.get("lat") is not None and row.get("long") is not None
+        }
+        tree = KDTree([(sid, s["lat"], s["long"], s) for sid, s in sites.items()])
+
+        with self._lock:
+            old_sites = self._sites
+            changed = old_sites != sites
+            self._sites = sites
+            self._tree = tree
+            self._loaded_mtime = mtime
+            self._checked_at = time.monotonic()
+            if changed:
+                self._version += 1
+
+        if changed:
+            print(f"🏢 SPPG registry dimuat: {len(sites)} lokasi (v{self._version})")
+            for callback in self._listeners:
+                try:
+                    callback(old_sites, sites)
+                except Exception as e:
+                    print(f"⚠️ SPPG listener error: {e}")
+        return len(sites)
+
+    def maybe_reload(self):
+        """
+        Hot reload: cek sumber paling sering sekali per reload_interval.
+        File hanya dibaca ulang kalau mtime-nya berubah.
+        """
+        if self._checked_at is not None and time.monotonic() - self._checked_at < self.reload_interval:
+            return
+        try:
+            if self.source == "file" and self._checked_at is not None:
+                if self.path.stat().st_mtime == self._loaded_mtime:
+                    self._checked_at = time.monotonic()
+                    return
+            self.load()
+        except Exception as e:
+            # Data lama tetap dipakai kalau reload gagal
+            print(f"⚠️ Gagal reload SPPG registry: {e}")
+            self._checked_at = time.monotonic()
+
+    def nearest(self, lat, lon, k=1):
+        self.maybe_reload()
+        return self._format(self._tree.nearest(lat, lon, k))
+
+    def within(self, lat, lon, radius_km, k=None):
+        self.maybe_reload()
+        return self._format(self._tree.within(lat, lon, radius_km, k))
+
+    def raw_nearest(self, lat, lon, k=1):
+        """Seperti nearest(), tapi return (distance_km, sppg_id, site) apa adanya."""
+        self.maybe_reload()
+        return self._tree.nearest(lat, lon, k)
+
+    @staticmethod
+    def _format(hits):
+        results = []
+        for dist, _, site in hits:
+            site_copy = dict(site)
+            site_copy['distance_km'] = round(dist, 2)
+            results.append(site_copy)
+        return results
+
+sppg_registry = SppgRegistry()
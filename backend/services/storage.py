@@ -6,25 +6,31 @@ async def upload_image_to_supabase(file: UploadFile) -> str:
     """
     Upload file gambar ke Supabase Storage dan kembalikan URL publiknya.
     """
+    # Baca file bytes
+    file_bytes = await file.read()
+    return upload_bytes_to_supabase(file_bytes, file.filename, file.content_type)
+
+def upload_bytes_to_supabase(file_bytes: bytes, original_name: str, content_type: str) -> str:
+    """
+    Versi sinkron untuk bytes yang sudah dibaca (dipakai endpoint upload+analisis,
+    dijalankan di threadpool bersamaan dengan panggilan AI).
+    """
     try:
-        # 1. Baca file bytes
-        file_bytes = await file.read()
-        
-        # 2. Generate nama file unik (timestamp_filename)
+        # 1. Generate nama file unik (timestamp_filename)
         timestamp = int(time.time())
-        filename = f"{timestamp}_{file.filename}"
+        filename = f"{timestamp}_{original_name}"
         
-        # 3. Upload ke Supabase Storage (Bucket: 'supply-photos')
+        # 2. Upload ke Supabase Storage (Bucket: 'supply-photos')
         # Pastikan bucket 'supply-photos' sudah dibuat di Supabase Dashboard!
         bucket_name = "supply-photos"
         
         response = supabase.storage.from_(bucket_name).upload(
             path=filename,
             file=file_bytes,
-            file_options={"content-type": file.content_type}
+            file_options={"content-type": content_type}
         )
         
-        # 4. Ambil Public URL
+        # 3. Ambil Public URL
         public_url = supabase.storage.from_(bucket_name).get_public_url(filename)
         
         return public_url
@@ -0,0 +1,238 @@
+import re
+from collections import defaultdict
+
+# --- SINONIM / EJAAN LOKAL BAHAN MAKANAN ---
+# Varian (kiri) dipetakan ke nama baku (kanan) sebelum di-index / dicari.
+INGREDIENT_SYNONYMS = {
+    "cabe": "cabai",
+    "lombok": "cabai",
+    "brambang": "bawang merah",
+    "bawang abang": "bawang merah",
+    "bawang bombai": "bawang bombay",
+    "telor": "telur",
+    "bayem": "bayam",
+    "toge": "tauge",
+    "taoge": "tauge",
+    "kol": "kubis",
+    "kobis": "kubis",
+    "terong": "terung",
+    "bortel": "wortel",
+    "ketela pohon": "singkong",
+    "ubi kayu": "singkong",
+    "kunir": "kunyit",
+    "laos": "lengkuas",
+    "sereh": "serai",
+    "sledri": "seledri",
+    "jipang": "labu siam",
+    "sawi hijau": "caisim",
+}
+
+# Frasa terpanjang dicocokkan dulu ("bawang abang" sebelum kata tunggal)
+_SYNONYM_PATTERN = re.compile(
+    r"\b(" + "|".join(
+        re.escape(k) for k in sorted(INGREDIENT_SYNONYMS, key=len, reverse=True)
+    ) + r")\b"
+)
+
+def normalize_ingredient(name) -> str:
+    """
+    Normalisasi nama bahan: huruf kecil, tanpa tanda baca, sinonim -> nama baku.
+    Contoh: "Cabe Rawit!" -> "cabai rawit", "Brambang" -> "bawang merah"
+    """
+    if not name:
+        return ""
+    text = " ".join(re.sub(r"[^a-z0-9]+", " ", str(name).lower()).split())
+    return _SYNONYM_PATTERN.sub(lambda m: INGREDIENT_SYNONYMS[m.group(1)], text)
+
+# Kata umum di pesan chat yang bukan nama bahan (tidak dicocokkan ke katalog)
+QUERY_STOPWORDS = {
+    "saya", "aku", "kami", "kita", "mau", "ingin", "pengen", "tolong", "dong", "ya", "sih",
+    "apa", "apakah", "ada", "gak", "tidak", "bisa", "boleh", "bagaimana", "gimana", "cara",
+    "yang", "dan", "atau", "dengan", "pakai", "untuk", "buat", "bikin", "masak", "memasak",
+    "resep", "menu", "chef", "di", "ke", "dari", "ini", "itu", "mana", "dimana", "berapa",
+    "beli", "stok", "sisa", "hari", "besok", "porsi", "kg", "gram", "liter", "biji", "siswa",
+    "sama", "juga", "lagi", "banyak", "enak", "sehat", "makan", "pagi", "siang", "sore",
+}
+
+def query_phrases(text, max_words: int = 3) -> list:
+    """
+    Frasa kandidat nama bahan dari teks bebas (pesan chat): n-gram 1..max_words
+    kata yang sudah dinormalisasi, tanpa frasa yang diawali/diakhiri kata umum.
+    Contoh: "Mau masak sayur bayem" -> ["sayur", "sayur bayam", "bayam"]
+    """
+    words = normalize_ingredient(text).split()
+    phrases = []
+    seen = set()
+    for i in range(len(words)):
+        for j in range(i + 1, min(len(words), i + max_words) + 1):
+            chunk = words[i:j]
+            if any(w in QUERY_STOPWORDS or w.isdigit() for w in (chunk[0], chunk[-1])):
+                continue
+            phrase = " ".join(chunk)
+            if len(phrase) < 3 or phrase in seen:
+                continue
+            seen.add(phrase)
+            phrases.append(phrase)
+    return phrases
+
+def _raw_name(text) -> str:
+    # Huruf kecil + spasi dirapikan saja (tanpa sinonim), untuk cocok substring ala ilike
+    return " ".join(str(text or "").lower().split())
+
+def trigrams(text: str) -> set:
+    """
+    Trigram per kata ala pg_trgm: setiap kata diberi padding "  kata ".
+    """
+    grams = set()
+    for word in text.split():
+        padded = f"  {word} "
+        for i in range(len(padded) - 2):
+            grams.add(padded[i:i + 3])
+    return grams
+
+class TrigramIndex:
+    """
+    Inverted index trigram -> nama (teks ter-normalisasi).
+    Skor = porsi trigram query yang ada di nama (mirip word_similarity pg_trgm),
+    dan 1.0 jika query muncul utuh sebagai substring (setara ilike '%kw%').
+    """
+
+    def __init__(self):
+        self._postings = defaultdict(set)  # trigram -> set(text)
+        self._grams = {}                   # text -> set(trigram)
+
+    def __len__(self):
+        return len(self._grams)
+
+    def add(self, text: str):
+        if not text or text in self._grams:
+            return
+        grams = trigrams(text)
+        self._grams[text] = grams
+        for g in grams:
+            self._postings[g].add(text)
+
+    def remove(self, text: str):
+        grams = self._grams.pop(text, None)
+        if grams is None:
+            return
+        for g in grams:
+            bucket = self._postings.get(g)
+            if bucket is not None:
+                bucket.discard(text)
+                if not bucket:
+                    del self._postings[g]
+
+    def search(self, query: str, threshold: float = 0.5, limit: int = None):
+        """
+        Return: list (skor, text) urut dari skor tertinggi.
+        """
+        query_grams = trigrams(query)
+        if not query_grams:
+            return []
+
+        counts = defaultdict(int)
+        for g in query_grams:
+            for text in self._postings.get(g, ()):
+                counts[text] += 1
+
+        results = []
+        for text, hit in counts.items():
+            score = 1.0 if query in text else hit / len(query_grams)
+            if score >= threshold:
+                results.append((score, text))
+
+        results.sort(key=lambda r: (-r[0], len(r[1]), r[1]))
+        return results[:limit] if limit is not None else results
+
+class NameIndex:
+    """
+    Index fuzzy nama barang -> id barang.
+    Trigram hanya dibangun per NAMA unik (bukan per baris), jadi ukuran index
+    mengikuti jumlah jenis barang, bukan jumlah stok di katalog.
+    """
+
+    def __init__(self):
+        self._trigram = TrigramIndex()
+        self._members = defaultdict(set)  # nama normal -> set(id)
+        self._name_of = {}                # id -> nama normal
+        self._raw = {}                    # nama mentah (huruf kecil) -> [nama normal, jumlah id]
+        self._raw_of = {}                 # id -> nama mentah
+
+    def __len__(self):
+        return len(self._name_of)
+
+    def add(self, item_id, name):
+        self.remove(item_id)
+        normalized = normalize_ingredient(name)
+        if not normalized:
+            return
+        self._name_of[item_id] = normalized
+        self._members[normalized].add(item_id)
+        self._trigram.add(normalized)
+        raw = _raw_name(name)
+        self._raw_of[item_id] = raw
+        self._raw.setdefault(raw, [normalized, 0])[1] += 1
+
+    def remove(self, item_id):
+        normalized = self._name_of.pop(item_id, None)
+        if normalized is None:
+            return
+        raw = self._raw_of.pop(item_id)
+        self._raw[raw][1] -= 1
+        if not self._raw[raw][1]:
+            del self._raw[raw]
+        members = self._members.get(normalized)
+        if members is not None:
+            members.discard(item_id)
+            if not members:
+                del self._members[normalized]
+                self._trigram.remove(normalized)
+
+    def clear(self):
+        self._trigram = TrigramIndex()
+        self._members.clear()
+        self._name_of.clear()
+        self._raw.clear()
+        self._raw_of.clear()
+
+    def name_of(self, item_id):
+        return self._name_of.get(item_id)
+
+    def names(self):
+        """Semua nama unik (ter-normalisasi) yang ada di index."""
+        return list(self._members)
+
+    def ids_of(self, name):
+        """Id item dengan nama (ter-normalisasi) ini."""
+        return set(self._members.get(name, ()))
+
+    def match(self, query, threshold: float = 0.5):
+        """
+        Return: dict nama normal -> skor kecocokan (hanya nama unik, bukan per id).
+        Cek barang dengan `scores.get(index.name_of(item_id))`.
+        Selain trigram (sinonim), query juga dicocokkan apa adanya sebagai
+        substring nama asli, seperti ilike '%kw%': "kol" tetap ketemu "Kolang Kaling".
+        """
+        scores = {
+            name: score
+            for score, name in self._trigram.search(normalize_ingredient(query), threshold)
+        }
+        raw_query = _raw_name(query)
+        if raw_query:
+            for raw, (name, _) in self._raw.items():
+                if raw_query in raw:
+                    scores[name] = 1.0
+        return scores
+
+    def match_text(self, text, threshold: float = 0.5):
+        """
+        Seperti match(), tapi untuk kalimat: tiap frasa (query_phrases) dicocokkan
+        sendiri, skor per nama = skor frasa terbaik.
+        """
+        scores = {}
+        for phrase in query_phrases(text):
+            for score, name in self._trigram.search(phrase, threshold):
+                if score > scores.get(name, 0):
+                    scores[name] = score
+        return scores
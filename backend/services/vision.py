@@ -1,16 +1,231 @@
+import asyncio
 import base64
 import json
-from .clients import kolosal_client
+import os
+import threading
+from collections import OrderedDict
+from typing import NamedTuple
+from .admission import LLMOverloadedError
+from .llm import complete, complete_async
+from .cache import ResultCache, content_hash
+from .llm_json import JsonStreamExtractor, LLMOutputError, extract_json, validate_output
+from .text_search import normalize_ingredient
+from models import AIInventoryAnalysis, AIBatchInventoryAnalysis, AICookedMealAnalysis
 from prompts import (
     get_inventory_analysis_prompt,
+    get_batch_inventory_analysis_prompt,
     get_cooked_meal_analysis_prompt
 )
 
-from PIL import Image
+from PIL import Image, ImageOps
 import io
 
+VISION_MODEL = "Claude Sonnet 4.5"
+
+# --- CACHE HASIL VISION ---
+# Key = SHA-256(gambar hasil resize + teks prompt + model), jadi foto yang sama
+# dikirim ulang (retry / double-post) tidak memanggil Claude lagi, dan cache
+# otomatis basi kalau prompt diubah. Hash file mentah juga dicatat sebagai alias
+# supaya upload ulang file yang persis sama tidak perlu di-resize dulu.
+# VISION_CACHE_DIR diisi -> cache juga disimpan di disk.
+VISION_CACHE_MAX_ENTRIES = int(os.getenv("VISION_CACHE_MAX_ENTRIES", "256"))
+VISION_CACHE_DIR = os.getenv("VISION_CACHE_DIR") or None
+
+vision_cache = ResultCache("vision", max_entries=VISION_CACHE_MAX_ENTRIES, disk_dir=VISION_CACHE_DIR)
+
+# --- DETEKSI FOTO MIRIP (PERCEPTUAL HASH) ---
+# Vendor sering memotret meja lapak yang sama berkali-kali dengan geseran kecil.
+# Hash SHA tidak akan cocok, jadi foto stok juga diberi dHash 64-bit; jika ada
+# foto terbaru DARI VENDOR YANG SAMA dengan jarak Hamming <= VISION_DHASH_MAX_DISTANCE
+# dan warna rata-rata yang mirip, hasilnya dipakai ulang.
+# Foto yang nyaris polos (gelap, over-exposed, latar rata) dHash-nya ~0 untuk
+# gambar apa pun, jadi tidak pernah dicocokkan.
+# VISION_DHASH_MAX_DISTANCE=-1 -> fitur dimatikan.
+VISION_DHASH_MAX_DISTANCE = int(os.getenv("VISION_DHASH_MAX_DISTANCE", "6"))
+VISION_DHASH_MAX_ENTRIES = int(os.getenv("VISION_DHASH_MAX_ENTRIES", "512"))
+# Simpangan baku luma (0-255) minimal supaya foto dianggap punya tekstur
+VISION_DHASH_MIN_STDDEV = float(os.getenv("VISION_DHASH_MIN_STDDEV", "8"))
+# Bit 1 (dan bit 0) minimal di dHash; kurang dari ini polanya terlalu rata
+VISION_DHASH_MIN_BITS = 8
+# Selisih maksimum rata-rata tiap kanal warna (0-255) antar foto yang dianggap sama
+VISION_DHASH_MAX_COLOR_DIFF = float(os.getenv("VISION_DHASH_MAX_COLOR_DIFF", "24"))
+
+class ImageFingerprint(NamedTuple):
+    dhash: int    # difference hash hash_size*hash_size bit
+    color: tuple  # rata-rata (R, G, B)
+
+def image_fingerprint(image_bytes, hash_size=8):
+    """
+    Difference hash: gambar diperkecil jadi (hash_size+1) x hash_size grayscale,
+    lalu tiap bit = apakah piksel lebih terang dari tetangga kanannya.
+    Ditambah warna rata-rata untuk pembanding kedua.
+    Return: ImageFingerprint, atau None kalau gambar tidak bisa dibaca / terlalu polos.
+    """
+    try:
+        image = Image.open(io.BytesIO(image_bytes))
+        # JPEG: decode langsung di skala kecil (jauh lebih murah dari decode penuh)
+        image.draft("RGB", (hash_size * 8, hash_size * 8))
+        small = image.convert("RGB").resize((hash_size + 1, hash_size), Image.Resampling.BILINEAR)
+        pixels = list(small.convert("L").getdata())
+        rgb = list(small.getdata())
+    except Exception as e:
+        print(f"⚠️ dHash gagal ({type(e).__name__}: {e})")
+        return None
+
+    mean = sum(pixels) / len(pixels)
+    stddev = (sum((p - mean) ** 2 for p in pixels) / len(pixels)) ** 0.5
+    if stddev < VISION_DHASH_MIN_STDDEV:
+        return None
+
+    value = 0
+    for row in range(hash_size):
+        offset = row * (hash_size + 1)
+        for col in range(hash_size):
+            value = (value << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+    bits = bin(value).count("1")
+    if min(bits, hash_size * hash_size - bits) < VISION_DHASH_MIN_BITS:
+        return None
+
+    color = tuple(sum(p[c] for p in rgb) / len(rgb) for c in range(3))
+    return ImageFingerprint(value, color)
+
+def fingerprint_distance(a, b, max_distance):
+    """
+    Jarak Hamming dHash kalau kedua foto dianggap sama (jarak <= max_distance
+    dan warna rata-rata mirip), selain itu None.
+    """
+    if a is None or b is None or max_distance < 0:
+        return None
+    distance = bin(a.dhash ^ b.dhash).count("1")
+    if distance > max_distance:
+        return None
+    if max(abs(x - y) for x, y in zip(a.color, b.color)) > VISION_DHASH_MAX_COLOR_DIFF:
+        return None
+    return distance
+
+class NearDuplicateIndex:
+    """
+    Daftar fingerprint foto yang baru dianalisis (LRU) -> hasil analisisnya.
+    Scope = jenis analisis + vendor, jadi hasil tidak pernah bocor antar vendor.
+    Pencarian linear + popcount; ratusan entri cukup < 1 ms.
+    """
+
+    def __init__(self, max_distance=VISION_DHASH_MAX_DISTANCE, max_entries=VISION_DHASH_MAX_ENTRIES):
+        self.max_distance = max_distance
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # (scope, dhash) -> (fingerprint, hasil)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def find(self, scope, fingerprint):
+        """
+        Return: (jarak Hamming, hasil) foto terdekat dalam batas, atau None.
+        """
+        if fingerprint is None or self.max_distance < 0:
+            return None
+        best = None
+        with self._lock:
+            for key, (stored, result) in self._entries.items():
+                if key[0] != scope:
+                    continue
+                distance = fingerprint_distance(stored, fingerprint, self.max_distance)
+                if distance is not None and (best is None or distance < best[0]):
+                    best = (distance, key, result)
+            if best is None:
+                return None
+            self._entries.move_to_end(best[1])
+            return best[0], best[2]
+
+    def add(self, scope, fingerprint, result):
+        if fingerprint is None or self.max_distance < 0:
+            return
+        with self._lock:
+            key = (scope, fingerprint.dhash)
+            self._entries[key] = (fingerprint, result)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+near_duplicate_index = NearDuplicateIndex()
+
+def _vision_cache_key(kind, prompt_text, image_bytes, raw=False):
+    return content_hash("raw" if raw else "resized", kind, VISION_MODEL, prompt_text, image_bytes)
+
+class _VisionLookup:
+    """Hasil cek cache untuk satu gambar (dipakai lagi saat menyimpan hasil AI)."""
+
+    def __init__(self, kind, prompt_text, owner=None):
+        self.scope = content_hash(kind, VISION_MODEL, prompt_text)
+        self.owner = owner  # user_id vendor; None -> foto mirip tidak dicari/disimpan
+        self.cached = None
+        self.resized_bytes = None
+        self.prompt_text = None
+        self.keys = []
+        self.fingerprint = None
+
+    def remember(self, result):
+        for key in self.keys:
+            vision_cache.set(key, result)
+        if self.owner is not None:
+            near_duplicate_index.add((self.scope, self.owner), self.fingerprint, result)
+
+def _cached_vision_result(kind, prompt_text, image_bytes, near_duplicates=False, resized_bytes=None, owner=None):
+    """
+    Cek cache berurutan: hash file mentah -> hash gambar hasil resize ->
+    (opsional) foto mirip via dHash milik vendor `owner`. Return: _VisionLookup.
+    resized_bytes diisi -> pakai hasil resize yang sudah ada (tidak decode ulang).
+    """
+    lookup = _VisionLookup(kind, prompt_text, owner)
+    raw_key = _vision_cache_key(kind, prompt_text, image_bytes, raw=True)
+    lookup.keys = [raw_key]
+    lookup.cached = vision_cache.get(raw_key)
+    if lookup.cached is not None:
+        return lookup
+
+    lookup.resized_bytes = resized_bytes or resize_image(image_bytes)
+    if not lookup.resized_bytes:
+        return lookup
+    lookup.keys.append(_vision_cache_key(kind, prompt_text, lookup.resized_bytes))
+    lookup.cached = vision_cache.get(lookup.keys[-1])
+
+    if lookup.cached is None and near_duplicates:
+        lookup.fingerprint = image_fingerprint(lookup.resized_bytes)
+        match = None
+        if owner is not None:
+            match = near_duplicate_index.find((lookup.scope, owner), lookup.fingerprint)
+        if match is not None:
+            distance, result = match
+            print(f"🪞 Foto mirip foto sebelumnya (jarak dHash {distance}), hasil lama dipakai")
+            lookup.cached = json.loads(json.dumps(result))
+
+    if lookup.cached is not None:
+        for key in lookup.keys:
+            vision_cache.set(key, lookup.cached)
+    return lookup
+
+# --- PREPROCESSING GAMBAR ---
+RESIZE_JPEG_QUALITY = 85
+# Sumber >= faktor ini kali target -> pakai filter murah (BILINEAR + reduce bertahap)
+RESIZE_FAST_FILTER_RATIO = 3.0
+_EXIF_ORIENTATION = 0x0112
+
+def _fit_scale(size, max_size):
+    return min(max_size[0] / size[0], max_size[1] / size[1], 1.0)
+
 def resize_image(image_bytes, max_size=(1024, 1024)):
-    """Resize image to avoid huge payloads"""
+    """
+    Resize image to avoid huge payloads.
+    - JPEG di-decode langsung di skala kecil (draft mode), bukan decode penuh 12 MP.
+    - Orientasi EXIF diterapkan (foto HP portrait tidak jadi miring).
+    - Filter murah dipakai kalau sumber jauh lebih besar dari target.
+    - JPEG yang sudah muat & tegak dikembalikan apa adanya (tanpa encode ulang).
+    """
     try:
         # Check if image_bytes is valid
         if not image_bytes or len(image_bytes) == 0:
@@ -19,15 +234,31 @@ def resize_image(image_bytes, max_size=(1024, 1024)):
             
         print(f"📦 Image size before resize: {len(image_bytes)} bytes")
         image = Image.open(io.BytesIO(image_bytes))
-        
-        # Convert to RGB if RGBA (PNG)
-        if image.mode == 'RGBA':
-            image = image.convert('RGB')
-            
-        image.thumbnail(max_size, Image.Resampling.LANCZOS)
+        orientation = image.getexif().get(_EXIF_ORIENTATION, 1)
+        scale = _fit_scale(image.size, max_size)
+
+        if scale >= 1.0 and image.format == "JPEG" and orientation == 1 and image.mode in ("RGB", "L"):
+            print(f"✅ Image already fits ({image.width}x{image.height}), no re-encode")
+            return image_bytes
+
+        # Decode JPEG di skala 1/2, 1/4, atau 1/8 (tetap >= ukuran target)
+        if image.format == "JPEG" and scale < 1.0:
+            image.draft(image.mode, (max(1, round(image.width * scale)), max(1, round(image.height * scale))))
+
+        # JPEG hanya bisa RGB / L (PNG RGBA, palette, CMYK, dst dikonversi)
+        if image.mode not in ("RGB", "L"):
+            image = image.convert("RGB")
+
+        if _fit_scale(image.size, max_size) * RESIZE_FAST_FILTER_RATIO <= 1.0:
+            image.thumbnail(max_size, Image.Resampling.BILINEAR, reducing_gap=2.0)
+        else:
+            image.thumbnail(max_size, Image.Resampling.LANCZOS)
+
+        # Rotasi setelah diperkecil (jauh lebih murah daripada di resolusi penuh)
+        image = ImageOps.exif_transpose(image)
         
         buffer = io.BytesIO()
-        image.save(buffer, format="JPEG", quality=85)
+        image.save(buffer, format="JPEG", quality=RESIZE_JPEG_QUALITY)
         resized = buffer.getvalue()
         print(f"✅ Image resized: {len(resized)} bytes")
         return resized
@@ -42,150 +273,357 @@ def encode_image_to_base64(image_bytes):
     resized_bytes = resize_image(image_bytes)
     return base64.b64encode(resized_bytes).decode('utf-8')
 
-def analyze_market_inventory(image_bytes):
-    """
-    Claude untuk Deteksi Jenis, Hitung Jumlah, Cek Kualitas.
-    """
-    
+def _image_message(prompt_text, resized_bytes):
+    base64_image = base64.b64encode(resized_bytes).decode('utf-8')
+    return [
+        {
+            "role": "user",
+            "content": [
+                {"type": "text", "text": prompt_text},
+                {
+                    "type": "image_url",
+                    "image_url": {
+                        "url": f"data:image/jpeg;base64,{base64_image}"
+                    }
+                }
+            ]
+        }
+    ]
+
+# --- STOK MENTAH (VENDOR) ---
+
+def _inventory_lookup(image_bytes, resized_bytes=None, owner=None):
+    # 1. Prompt Claude + cek cache (foto yang sama sudah pernah dianalisis)
+    prompt_text = get_inventory_analysis_prompt()
+    lookup = _cached_vision_result(
+        "inventory", prompt_text, image_bytes,
+        near_duplicates=True, resized_bytes=resized_bytes, owner=owner
+    )
+    lookup.prompt_text = prompt_text
+    return lookup
+
+def _inventory_request(lookup):
+    # 2. Siapkan Gambar (Base64 dari hasil resize)
     print("✨ Mengirim gambar ke Claude Sonnet 4.5 (All-in-One Analysis)...")
+    return dict(
+        model=VISION_MODEL, # Pastikan nama model sesuai instruksi Colossal
+        messages=_image_message(lookup.prompt_text, lookup.resized_bytes),
+        max_tokens=1000,
+        temperature=0.1 # Penting! Rendah biar dia teliti ngitung (gak kreatif/halu)
+    )
+
+def _inventory_result(lookup, response):
+    # 4. Parsing Hasil
+    content = response.choices[0].message.content
+    print(f"🤖 Claude Raw Response: {content[:100]}...") # Debug dikit
+
+    parsed_data = validate_output(extract_json(content), AIInventoryAnalysis)
     
-    # 1. Siapkan Gambar (Base64 dengan Resize)
-    base64_image = encode_image_to_base64(image_bytes)
+    # 5. Format Return
+    result = {"status": "success", "items": _format_inventory_items(parsed_data.get("items", []))}
+    lookup.remember(result)
+    return result
 
-    # 2. Prompt Claude
-    prompt_text = get_inventory_analysis_prompt()
+def _format_inventory_items(raw_items):
+    final_data = []
+    for item in raw_items:
+        final_data.append({
+            "name": item.get("name"),
+            "qty": item.get("qty"),
+            "unit": item.get("unit"),
+            "freshness": item.get("freshness"),
+            "expiry_days": item.get("expiry_days"),
+            "note": item.get("visual_reasoning") # Bonus: alesan AI-nya
+        })
+    return final_data
+
+def _inventory_early_return(lookup):
+    if lookup.cached is not None:
+        print("⚡ Hasil analisis stok diambil dari cache")
+        return lookup.cached
+    if not lookup.resized_bytes:
+        return {"error": "Gambar kosong"}
+    return None
+
+def analyze_market_inventory(image_bytes, resized_bytes=None, owner=None):
+    """
+    Claude untuk Deteksi Jenis, Hitung Jumlah, Cek Kualitas.
+    resized_bytes: hasil resize_image(image_bytes) kalau pemanggil sudah punya.
+    owner: user_id vendor yang login (untuk cocokkan foto mirip miliknya sendiri).
+    """
+    lookup = _inventory_lookup(image_bytes, resized_bytes, owner)
+    early = _inventory_early_return(lookup)
+    if early is not None:
+        return early
 
     try:
         # 3. Panggil API Colossal
-        response = kolosal_client.chat.completions.create(
-            model="Claude Sonnet 4.5", # Pastikan nama model sesuai instruksi Colossal
-            messages=[
-                {
-                    "role": "user",
-                    "content": [
-                        {"type": "text", "text": prompt_text},
-                        {
-                            "type": "image_url",
-                            "image_url": {
-                                "url": f"data:image/jpeg;base64,{base64_image}"
-                            }
-                        }
-                    ]
-                }
-            ],
-            max_tokens=1000,
-            temperature=0.1 # Penting! Rendah biar dia teliti ngitung (gak kreatif/halu)
-        )
-        
-        # 4. Parsing Hasil
-        content = response.choices[0].message.content
-        print(f"🤖 Claude Raw Response: {content[:100]}...") # Debug dikit
+        response = complete(_inventory_request(lookup), kind="vision")
+        return _inventory_result(lookup, response)
 
-        # Bersihin markdown kalau ada
-        cleaned_content = content.replace("```json", "").replace("```", "").strip()
-        parsed_data = json.loads(cleaned_content)
-        
-        # 5. Format Return
-        final_data = []
-        for item in parsed_data.get("items", []):
-            final_data.append({
-                "name": item.get("name"),
-                "qty": item.get("qty"),
-                "unit": item.get("unit"),
-                "freshness": item.get("freshness"),
-                "expiry_days": item.get("expiry_days"),
-                "note": item.get("visual_reasoning") # Bonus: alesan AI-nya
-            })
-            
-        return {"status": "success", "items": final_data}
+    except LLMOutputError as e:
+        print(f"❌ Error: Claude tidak mengembalikan JSON valid ({e}).")
+        return {"error": "AI Error (Invalid JSON)"}
+    except Exception as e:
+        print(f"❌ Error API: {e}")
+        return {"error": f"Gagal analisis: {str(e)}"}
+
+async def analyze_market_inventory_async(image_bytes, resized_bytes=None, owner=None):
+    """
+    Versi async analyze_market_inventory (dipakai endpoint FastAPI).
+    Resize & hashing (CPU) jalan di thread, panggilan AI di event loop.
+    """
+    lookup = await asyncio.to_thread(_inventory_lookup, image_bytes, resized_bytes, owner)
+    early = _inventory_early_return(lookup)
+    if early is not None:
+        return early
+    return await _inventory_call_async(lookup)
+
+async def _inventory_call_async(lookup):
+    try:
+        response = await complete_async(_inventory_request(lookup), kind="vision")
+        return _inventory_result(lookup, response)
 
-    except json.JSONDecodeError:
-        print("❌ Error: Claude tidak mengembalikan JSON valid.")
+    except LLMOutputError as e:
+        print(f"❌ Error: Claude tidak mengembalikan JSON valid ({e}).")
         return {"error": "AI Error (Invalid JSON)"}
     except Exception as e:
         print(f"❌ Error API: {e}")
         return {"error": f"Gagal analisis: {str(e)}"}
 
-def analyze_cooked_meal(image_bytes):
+# --- ANALISIS BANYAK FOTO SEKALIGUS (BATCH) ---
+# Foto yang belum ada di cache dipaket beberapa sekaligus dalam satu request
+# multimodal (Claude menerima banyak gambar per pesan). Kalau paket gagal
+# di-parse, foto di paket itu dianalisis satu-satu. Jumlah request AI yang
+# jalan bersamaan dibatasi VISION_BATCH_CONCURRENCY.
+VISION_BATCH_MAX_FILES = int(os.getenv("VISION_BATCH_MAX_FILES", "10"))
+VISION_BATCH_IMAGES_PER_REQUEST = int(os.getenv("VISION_BATCH_IMAGES_PER_REQUEST", "4"))
+VISION_BATCH_CONCURRENCY = int(os.getenv("VISION_BATCH_CONCURRENCY", "3"))
+
+def _batch_request(lookups):
+    print(f"✨ Mengirim {len(lookups)} foto sekaligus ke Claude Sonnet 4.5...")
+    content = [{"type": "text", "text": get_batch_inventory_analysis_prompt(len(lookups))}]
+    for number, lookup in enumerate(lookups, start=1):
+        base64_image = base64.b64encode(lookup.resized_bytes).decode('utf-8')
+        content.append({"type": "text", "text": f"Foto {number}:"})
+        content.append({"type": "image_url", "image_url": {"url": f"data:image/jpeg;base64,{base64_image}"}})
+    return dict(
+        model=VISION_MODEL,
+        messages=[{"role": "user", "content": content}],
+        max_tokens=min(4000, 1000 * len(lookups)),
+        temperature=0.1
+    )
+
+def _batch_results(lookups, response):
+    content = response.choices[0].message.content
+    print(f"🤖 Claude Raw Response (Batch): {content[:100]}...")
+    parsed_data = validate_output(extract_json(content), AIBatchInventoryAnalysis)
+
+    by_photo = {}
+    for photo in parsed_data["photos"]:
+        by_photo[photo["photo"]] = photo.get("items", [])
+    if set(by_photo) != set(range(1, len(lookups) + 1)):
+        raise ValueError(f"AI mengembalikan {len(by_photo)} foto, harusnya {len(lookups)}")
+
+    results = []
+    for number, lookup in enumerate(lookups, start=1):
+        result = {"status": "success", "items": _format_inventory_items(by_photo[number])}
+        # Disimpan per foto, jadi foto ini bisa kena cache di upload berikutnya
+        lookup.remember(result)
+        results.append(result)
+    return results
+
+async def _analyze_pack(lookups, semaphore):
+    if len(lookups) > 1:
+        try:
+            async with semaphore:
+                response = await complete_async(_batch_request(lookups), kind="vision")
+            return _batch_results(lookups, response)
+        except LLMOverloadedError as e:
+            # Antrian AI penuh: jangan pecah jadi lebih banyak request
+            print(f"⚠️ Analisis batch ditolak: {e}")
+            return [{"error": f"Gagal analisis: {str(e)}"} for _ in lookups]
+        except Exception as e:
+            print(f"⚠️ Analisis batch gagal ({type(e).__name__}: {e}), dianalisis per foto")
+
+    async def single(lookup):
+        async with semaphore:
+            return await _inventory_call_async(lookup)
+    return await asyncio.gather(*[single(lookup) for lookup in lookups])
+
+def _same_photo(a, b):
+    if a.keys[0] == b.keys[0]:
+        return True
+    return fingerprint_distance(a.fingerprint, b.fingerprint, near_duplicate_index.max_distance) is not None
+
+def _as_number(value):
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return value
+    try:
+        return float(str(value).replace(",", "."))
+    except (TypeError, ValueError):
+        return None
+
+def merge_inventory_items(results):
     """
-    VISI KOMPUTER UNTUK MAKANAN JADI (QC FINAL)
-    Cek basi/tidak, estimasi gizi visual.
+    Gabungkan item dari beberapa foto: nama (ter-normalisasi) + satuan sama -> satu item,
+    qty dijumlah, sisa umur & kesegaran ambil yang paling pendek (paling aman).
     """
-    import re
-    
+    merged = OrderedDict()
+    for result in results:
+        for item in result.get("items", []):
+            key = (normalize_ingredient(item.get("name")), (item.get("unit") or "").strip().lower())
+            current = merged.get(key)
+            if current is None:
+                merged[key] = dict(item)
+                continue
+
+            qty_a, qty_b = _as_number(current.get("qty")), _as_number(item.get("qty"))
+            if qty_a is not None and qty_b is not None:
+                total = qty_a + qty_b
+                current["qty"] = int(total) if float(total).is_integer() else total
+
+            exp_a, exp_b = _as_number(current.get("expiry_days")), _as_number(item.get("expiry_days"))
+            if exp_b is not None and (exp_a is None or exp_b < exp_a):
+                current["expiry_days"] = item.get("expiry_days")
+                current["freshness"] = item.get("freshness")
+
+            notes = [n for n in (current.get("note"), item.get("note")) if n]
+            current["note"] = " | ".join(dict.fromkeys(notes)) or None
+    return list(merged.values())
+
+async def analyze_market_inventory_batch_async(images, owner=None):
+    """
+    Analisis beberapa foto stok sekaligus.
+    Return: {"status", "items" (gabungan, tanpa duplikat), "photos" (status per foto)}
+    """
+    lookups = await asyncio.gather(*[
+        asyncio.to_thread(_inventory_lookup, image, None, owner) for image in images
+    ])
+    results = [None] * len(lookups)
+    duplicate_of = {}
+
+    # Foto yang sama / hampir sama di dalam satu batch cukup dianalisis (dan dihitung) sekali
+    for i, lookup in enumerate(lookups):
+        for j in range(i):
+            if j not in duplicate_of and _same_photo(lookup, lookups[j]):
+                duplicate_of[i] = j
+                break
+
+    pending = []
+    for i, lookup in enumerate(lookups):
+        if i in duplicate_of:
+            continue
+        early = _inventory_early_return(lookup)
+        if early is not None:
+            results[i] = early
+        else:
+            pending.append(i)
+
+    pack_size = max(1, VISION_BATCH_IMAGES_PER_REQUEST)
+    packs = [pending[k:k + pack_size] for k in range(0, len(pending), pack_size)]
+    semaphore = asyncio.Semaphore(max(1, VISION_BATCH_CONCURRENCY))
+    pack_results = await asyncio.gather(*[
+        _analyze_pack([lookups[i] for i in pack], semaphore) for pack in packs
+    ])
+    for pack, pack_result in zip(packs, pack_results):
+        for i, result in zip(pack, pack_result):
+            results[i] = result
+
+    photos = []
+    for i, result in enumerate(results):
+        if i in duplicate_of:
+            photos.append({"index": i, "status": "duplicate", "duplicate_of": duplicate_of[i]})
+        elif "error" in result:
+            photos.append({"index": i, "status": "error", "error": result["error"]})
+        else:
+            photos.append({"index": i, "status": "success", "count": len(result.get("items", []))})
+
+    succeeded = [r for r in results if r is not None and "error" not in r]
+    if not succeeded:
+        return {"error": "Semua foto gagal dianalisis", "photos": photos}
+    return {"status": "success", "items": merge_inventory_items(succeeded), "photos": photos}
+
+# --- MAKANAN JADI (KITCHEN QC) ---
+
+def _cooked_meal_lookup(image_bytes):
     print("🍱 Menganalisis Makanan Jadi...")
-    base64_image = encode_image_to_base64(image_bytes)
-    
     prompt_text = get_cooked_meal_analysis_prompt()
+    lookup = _cached_vision_result("cooked_meal", prompt_text, image_bytes)
+    lookup.prompt_text = prompt_text
+    return lookup
+
+def _cooked_meal_early_return(lookup):
+    if lookup.cached is not None:
+        print("⚡ Hasil QC makanan diambil dari cache")
+        return lookup.cached
+    if not lookup.resized_bytes:
+        return {"error": "Gambar kosong"}
+    return None
+
+def _cooked_meal_request(lookup):
+    return dict(
+        model=VISION_MODEL,
+        messages=_image_message(lookup.prompt_text, lookup.resized_bytes),
+        max_tokens=600
+    )
+
+def _cooked_meal_result(lookup, response):
+    content = response.choices[0].message.content
+    print(f"🤖 Claude Raw Response (Cooked Meal): {content[:200]}...")
+    
+    # Satu kali baca: JSON lengkap, atau (kalau terpotong max_tokens) bagian yang sudah lengkap
+    extractor = JsonStreamExtractor()
+    extractor.feed(content)
+    complete_json = extractor.done
+    if not complete_json:
+        print("⚠️ Full JSON parse failed, attempting partial extraction...")
+    parsed_data = extractor.partial()
+    if parsed_data is None:
+        raise LLMOutputError("AI did not return valid JSON")
+    parsed_data = validate_output(parsed_data, AICookedMealAnalysis)
+    
+    # Normalize nutrition values (handle both "fat" and "fats")
+    if "nutrition_estimate" in parsed_data:
+        nutr = parsed_data["nutrition_estimate"]
+        if "fat" in nutr and "fats" not in nutr:
+            nutr["fats"] = nutr["fat"]
     
+    print(f"✅ Parsed Data: {parsed_data}")
+    # Hasil ekstraksi parsial tidak di-cache, biar upload ulang dapat kesempatan parse penuh
+    if complete_json:
+        lookup.remember(parsed_data)
+    return parsed_data
+
+def analyze_cooked_meal(image_bytes):
+    """
+    VISI KOMPUTER UNTUK MAKANAN JADI (QC FINAL)
+    Cek basi/tidak, estimasi gizi visual.
+    """
+    lookup = _cooked_meal_lookup(image_bytes)
+    early = _cooked_meal_early_return(lookup)
+    if early is not None:
+        return early
+
     try:
-        response = kolosal_client.chat.completions.create(
-            model="Claude Sonnet 4.5",
-            messages=[
-                {
-                    "role": "user",
-                    "content": [
-                        {"type": "text", "text": prompt_text},
-                        {"type": "image_url", "image_url": {"url": f"data:image/jpeg;base64,{base64_image}"}}
-                    ]
-                }
-            ],
-            max_tokens=600
-        )
-        content = response.choices[0].message.content
-        print(f"🤖 Claude Raw Response (Cooked Meal): {content[:200]}...")
-        
-        # Clean markdown
-        cleaned_content = content.replace("```json", "").replace("```", "").strip()
-        
-        # Try to extract just the main JSON object (ignore extra fields)
-        # Find the first { and try to find the matching }
-        try:
-            parsed_data = json.loads(cleaned_content)
-        except json.JSONDecodeError:
-            # If full parse fails, try to extract just what we need
-            print("⚠️ Full JSON parse failed, attempting partial extraction...")
-            parsed_data = {}
-            
-            # Extract menu_name
-            menu_match = re.search(r'"menu_name"\s*:\s*"([^"]+)"', cleaned_content)
-            if menu_match:
-                parsed_data["menu_name"] = menu_match.group(1)
-            
-            # Extract is_safe
-            safe_match = re.search(r'"is_safe"\s*:\s*(true|false)', cleaned_content)
-            if safe_match:
-                parsed_data["is_safe"] = safe_match.group(1) == "true"
-            
-            # Extract visual_quality
-            quality_match = re.search(r'"visual_quality"\s*:\s*"([^"]+)"', cleaned_content)
-            if quality_match:
-                parsed_data["visual_quality"] = quality_match.group(1)
-            
-            # Extract nutrition values
-            parsed_data["nutrition_estimate"] = {}
-            for nutrient in ["calories", "protein", "carbs", "fats", "fat"]:
-                pattern = f'"{nutrient}"\\s*:\\s*"([^"]+)"'
-                match = re.search(pattern, cleaned_content)
-                if match:
-                    value_str = match.group(1)
-                    # Extract first number from strings like "650-750 kkal" or "25-30 gram"
-                    number_match = re.search(r'(\d+)', value_str)
-                    if number_match:
-                        parsed_data["nutrition_estimate"][nutrient] = number_match.group(1)
-        
-        # Normalize nutrition values (handle both "fat" and "fats")
-        if "nutrition_estimate" in parsed_data:
-            nutr = parsed_data["nutrition_estimate"]
-            if "fat" in nutr and "fats" not in nutr:
-                nutr["fats"] = nutr["fat"]
-        
-        print(f"✅ Parsed Data: {parsed_data}")
-        return parsed_data
-    except json.JSONDecodeError as e:
-        print(f"❌ JSON Decode Error: {e}")
-        print(f"❌ Content was: {content}")
-        return {"error": f"Invalid JSON: {str(e)}"}
+        response = complete(_cooked_meal_request(lookup), kind="vision")
+        return _cooked_meal_result(lookup, response)
+    except Exception as e:
+        print(f"❌ API Error: {e}")
+        return {"error": str(e)}
+
+async def analyze_cooked_meal_async(image_bytes):
+    """
+    Versi async analyze_cooked_meal (dipakai endpoint FastAPI).
+    """
+    lookup = await asyncio.to_thread(_cooked_meal_lookup, image_bytes)
+    early = _cooked_meal_early_return(lookup)
+    if early is not None:
+        return early
+
+    try:
+        response = await complete_async(_cooked_meal_request(lookup), kind="vision")
+        return _cooked_meal_result(lookup, response)
     except Exception as e:
         print(f"❌ API Error: {e}")
-        return {"error": str(e)}
\ No newline at end of file
+        return {"error": str(e)}
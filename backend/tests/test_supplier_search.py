@@ -0,0 +1,49 @@
+"""
+Pencarian supplier lewat index in-process (Supabase diganti benchmarks/fake_supabase.py).
+Jalankan dari folder backend: python -m pytest tests
+"""
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("KOLOSAL_API_KEY", "test")
+os.environ.setdefault("GEOCODE_CACHE_PATH", os.path.join(tempfile.mkdtemp(), "geocode_cache.json"))
+
+from benchmarks.fake_supabase import install
+
+db = install()
+
+import pytest
+from services import logistics
+from services.text_search import NameIndex
+
+SUPPLIES = [
+    {"id": 1, "item_name": "Kolang Kaling", "latitude": -6.20, "longitude": 106.80, "user_id": 10},
+    {"id": 2, "item_name": "Kol", "latitude": -6.21, "longitude": 106.81, "user_id": 11},
+    {"id": 3, "item_name": "Bayam", "latitude": -6.22, "longitude": 106.82, "user_id": 12},
+]
+
+@pytest.fixture(autouse=True)
+def catalog():
+    db.load("supplies", [dict(row) for row in SUPPLIES])
+    logistics.rebuild_supply_index()
+    yield
+
+@pytest.mark.parametrize("keyword", ["", "   "])
+def test_empty_keyword_returns_whole_catalog(keyword):
+    results = logistics.search_suppliers(keyword, -6.2, 106.8)
+    assert [item["id"] for item in results] == [1, 2, 3]
+
+def test_raw_substring_matches_despite_synonym():
+    # "kol" dinormalisasi jadi "kubis", tapi substring aslinya tetap harus cocok
+    ids = {item["id"] for item in logistics.search_suppliers("kol", -6.2, 106.8)}
+    assert ids == {1, 2}
+    assert [item["id"] for item in logistics.search_suppliers("Kolang", -6.2, 106.8)] == [1]
+
+def test_name_index_forgets_raw_names_on_remove():
+    index = NameIndex()
+    index.add(1, "Kolang Kaling")
+    index.remove(1)
+    assert index.match("kolang") == {}
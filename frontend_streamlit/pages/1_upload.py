@@ -75,29 +75,22 @@ if img_file:
     # Tampilkan spinner loading
     with st.spinner("🤖 AI sedang menganalisis gambar & mengupload..."):
         try:
-            # --- STEP A: UPLOAD FOTO KE STORAGE ---
+            # --- STEP A+B: UPLOAD FOTO & ANALISIS AI (SATU REQUEST) ---
+            # Backend upload ke Storage & panggil AI bersamaan, file cukup dikirim sekali
             img_file.seek(0)
             files_upload = {"file": ("upload.jpg", img_file, "image/jpeg")}
-            resp_upload = requests.post(f"{API_URL}/upload", files=files_upload)
-            if resp_upload.status_code != 200:
-                st.error(f"Gagal upload foto: {resp_upload.text}")
+            resp = requests.post(f"{API_URL}/upload-analyze", files=files_upload)
+            if resp.status_code != 200:
+                st.error(f"Gagal upload / analisis AI: {resp.text}")
                 st.stop()
-            photo_url = resp_upload.json().get("url")
-            
-            # --- STEP B: ANALISIS AI (VISION) ---
-            img_file.seek(0)
-            files_analyze = {"file": ("analyze.jpg", img_file, "image/jpeg")}
-            resp_analyze = requests.post(f"{API_URL}/analyze", files=files_analyze)
-            if resp_analyze.status_code != 200:
-                st.error("Gagal analisis AI. Coba foto ulang.")
-                st.stop()
-                
-            ai_result = resp_analyze.json()
+
+            ai_result = resp.json()
+            photo_url = ai_result.get("url")
             if ai_result.get("status") != "success":
                 st.warning("AI tidak menemukan barang. Coba foto lebih jelas.")
                 st.stop()
                 
-            items_data = ai_result.get("data", [])
+            items_data = ai_result.get("items", [])
             if not items_data:
                 st.warning("Tidak ada barang terdeteksi.")
                 st.stop()
@@ -110,14 +103,14 @@ if img_file:
                 st.session_state[f"name_{i}"] = item['name']
                 
                 # FIX: Pastikan qty minimal 1 biar gak crash
-                raw_qty = int(item['qty'])
+                raw_qty = int(item.get('qty') or 0)
                 st.session_state[f"qty_{i}"] = raw_qty if raw_qty > 0 else 1
                 
                 st.session_state[f"unit_{i}"] = item['unit']
                 st.session_state[f"fresh_{i}"] = item['freshness']
                 
                 # FIX: Pastikan expiry minimal 0 (jangan minus)
-                raw_exp = int(item['expiry'])
+                raw_exp = int(item.get('expiry_days') or 0)
                 st.session_state[f"exp_{i}"] = raw_exp if raw_exp >= 0 else 0
 
             st.success("✅ Analisis Selesai!")